@@ -1,503 +1,46 @@
+import asyncio
+import os
+import time
+
 import gradio as gr
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
-# Load CSV
-df = pd.read_csv("predicted_prices.csv")
-
-# Fix Shopify URLs
-def fix_url(url):
-    if isinstance(url, str) and url.startswith("/s/files"):
-        return "https://cdn.shopify.com" + url
-    return url
-
-df["image_url"] = df["image_url"].apply(fix_url)
-
-# Compute best predicted model (closest to actual)
-df["best_predicted_price"] = df[[
-    "predicted_price_elastic_net",
-    "predicted_price_linear_regression",
-    "predicted_price_random_forest"
-]].sub(df["cleaned_price"], axis=0).abs().idxmin(axis=1)
-
-pred_cols = [
-    "predicted_price_elastic_net",
-    "predicted_price_linear_regression",
-    "predicted_price_random_forest"
-]
-
-df["best_predicted_value"] = df.apply(
-    lambda r: r[r["best_predicted_price"]],
-    axis=1
-)
-
-df["deal_label"] = ""
+from catalogue_store import CatalogueManager
+from categories import default_resolver
+from downsample import grid_downsample
+from predictions import PRED_COLS, PREDICTION_STRATEGIES
+from price_service import PriceService
+from prices import parse_prices
+from scrape_jobs import QueueFull, ScrapeJobQueue
+from scraping_engine import create_engine
+from units import normalize_names
 
 # ---------- Sorting Helper ----------
-def apply_sorting(df, sort_by):
-    if sort_by == "Name A-Z":
-        return df.sort_values("cleaned_name")
-    elif sort_by == "Price Low-High":
-        return df.sort_values("cleaned_price")
-    elif sort_by == "Price High-Low":
-        return df.sort_values("cleaned_price", ascending=False)
-    elif sort_by == "Predicted Low-High":
-        return df.sort_values("predicted_price_elastic_net")
-    elif sort_by == "Predicted High-Low":
-        return df.sort_values("predicted_price_elastic_net", ascending=False)
-    return df
-# ---------- Live time scarper ----------
-import random
-import time
-from selenium_stealth import stealth
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.common.keys import Keys
-
-def create_stealth_driver(headless=False):
-    USER_AGENTS = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
-    ]
-    ua = random.choice(USER_AGENTS)
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument(f"--user-agent={ua}")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option("useAutomationExtension", False)
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--window-size=1920,1080")  # ensures elements are visible in headless
-
-    if headless:
-        chrome_options.add_argument("--headless=new")  # modern Chrome headless
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")  # ensures full page renders
-
-    driver = webdriver.Chrome(options=chrome_options)
-
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
-    )
-    return driver
-
-def scrape_al_fateh(driver, word_to_search, wait_time=10):
-    """
-    Scrape Al-Fatah store for products
-    Returns: list of products with store name, or empty list on error
-    """
-    try:
-        store_name = "Al-Fateh"
-        AL_FATEH_GROCERY_URL = f"https://alfatah.pk/search?q={word_to_search}"
-        
-        driver.get(AL_FATEH_GROCERY_URL)
-        wait = WebDriverWait(driver, wait_time)
-        
-        product_cards = wait.until(EC.presence_of_all_elements_located(
-            (By.CSS_SELECTOR, ".col-6.col-sm-4.col-md-3.col-lg-2")
-        ))
-        
-        products_details = []
-        for product in product_cards:
-            try:
-                a_element = product.find_element(By.CSS_SELECTOR, "a[class='product-title-ellipsis']")
-                product_link = a_element.get_attribute("href")
-                product_name = a_element.text
-                product_price= product.find_element(By.CLASS_NAME, "product-price").text
-                image_container=product.find_element(By.CLASS_NAME, "image")
-                image_url=image_container.find_element(By.TAG_NAME, "img").get_attribute("src")
-
-                
-                products_details.append({
-                    "store": store_name,
-                    "name": product_name,
-                    "product-link": product_link,
-                    "price": product_price,
-                    "image_url": image_url
-                })
-            except Exception as e:
-                print(f"[{store_name}] Error extracting product: {str(e)}")
-                continue
-        
-        # Filter for relevance
-        filtered_products = get_filtered_products(products_details, word_to_search)
-        
-        print(f"[{store_name}] Found {len(filtered_products)} relevant products")
-        return filtered_products
-        
-    except Exception as e:
-        print(f"[Al-Fateh] Error during scraping: {str(e)}")
-        return []
-
-
-def scrape_metro(driver, word_to_search, wait_time=10):
-    try:
-        store_name = "Metro"
-        METRO_GROCERY_URL = f"https://www.metro-online.pk/search/{word_to_search}?searchText={word_to_search}"
-        
-        driver.get(METRO_GROCERY_URL)
-        wait = WebDriverWait(driver, wait_time)
-        
-        product_cards = wait.until(EC.presence_of_all_elements_located(
-            (By.CLASS_NAME, "CategoryGrid_product_card__FUMXW")
-        ))
-
-        products_details = []
-
-        for product_card in product_cards:
-            try:
-                product_link=product_card.find_element(By.TAG_NAME, "a").get_attribute("href")
-                name = product_card.find_element(By.CLASS_NAME, "CategoryGrid_product_name__3nYsN").text
-                price = product_card.find_element(By.CLASS_NAME, "CategoryGrid_product_price__Svf8T").text
-                
-                image_container=product_card.find_element(By.CLASS_NAME, "CategoryGrid_productImg_container__Ga1ll")
-                image_url=image_container.find_element(By.TAG_NAME, "img").get_attribute("src")
-                products_details.append({
-                        "store": store_name,
-                        "name": name,
-                        "product-link": product_link,
-                        "price": price,
-                        "image_url": image_url
-                    })
-            except Exception as e:
-                print(f"[{store_name}] Error extracting product details: {str(e)}")
-                continue
-        
-        
-        # Filter for relevance
-        filtered_products = get_filtered_products(products_details, word_to_search)
-
-        print(f"[{store_name}] Found {len(filtered_products)} products")
-        return filtered_products
-
-    except Exception as e:
-        print(f"[Metro] Error during scraping: {str(e)}")
-        return []
-
-
-def scrape_jalalsons(driver, word_to_search, wait_time=10):
-    """
-    Scrape Jalal Sons store for products with name and price
-    Returns: list of products with store name, or empty list on error
-    """
-    try:
-        store_name = "Jalal Sons"
-        JALALSONS_GROCERY_URL = f"https://jalalsons.com.pk/shop?query={word_to_search}"
-        
-        driver.get(JALALSONS_GROCERY_URL)
-        wait = WebDriverWait(driver, wait_time)
-        
-        # Close banner if present
-        try:
-            banner_close_button = wait.until(EC.element_to_be_clickable(
-                (By.CSS_SELECTOR, ".cursor-pointer.ms-auto")
-            ))
-            banner_close_button.click()
-        except TimeoutException:
-            print(f"[{store_name}] No banner appeared")
-        
-        # Select location from dropdown
-        try:
-            from selenium.webdriver.support.ui import Select
-            location_dropdown = wait.until(EC.presence_of_element_located(
-                (By.ID, "selectDeliveryBranch")
-            ))
-            select_object = Select(location_dropdown)
-            all_options = select_object.options
-            
-            enabled_options = [
-                opt for opt in all_options
-                if opt.is_enabled() and opt.get_attribute('value') != ""
-            ]
-            
-            if enabled_options:
-                random_option = random.choice(enabled_options)
-                select_object.select_by_visible_text(random_option.text)
-                
-                try:
-                    submit_button = driver.find_element(By.CLASS_NAME, "current_loc_pop_btn")
-                    submit_button.click()
-                except Exception as e:
-                    print(f"[{store_name}] No button to confirm location selection: {str(e)}")
-        except:
-            print(f"[{store_name}] location box removed or not found")
-        
-        # Get products
-        product_cards = wait.until(EC.presence_of_all_elements_located(
-            (By.CLASS_NAME, "single_product_theme")
-        ))
-
-        products_details = []
-
-        for product_card in product_cards:
-            try:
-                product_link = product_card.find_element(By.TAG_NAME, "a").get_attribute("href")
-                name = product_card.find_element(By.CLASS_NAME, "product_name_theme").text
-                
-                currency = product_card.find_element(By.CLASS_NAME, "item-currency").text
-                value = product_card.find_element(By.CLASS_NAME, "price-value").text
-                price = f"{currency} {value.strip()}"
-                image_url=product_card.find_element(By.TAG_NAME, "img").get_attribute("src")
-                
-                products_details.append({
-                    "store": store_name,
-                    "name": name,
-                    "product-link": product_link,
-                    "price": price,
-                    "image_url":image_url
-                })
-            except Exception as e:
-                print(f"[{store_name}] Error extracting product details: {str(e)}")
-                continue
-        
-        
-        filtered_products = get_filtered_products(products_details, word_to_search)
-        print(f"[{store_name}] Found {len(filtered_products)} products")
-        return filtered_products
-
-    except Exception as e:
-        print(f"[Jalal Sons] Error during scraping: {str(e)}")
-        return []
-
-
-def scrape_carrefour(driver, word_to_search, wait_time=10):
-    """
-    Scrape Carrefour store for products with name, price, and image
-    Returns: list of products with store name, or empty list on error
-    """
-    store_name = "Carrefour"
-    CAREFOUR_GROCERY_URL = f"https://www.carrefour.pk/mafpak/en/search?keyword={word_to_search}"
-    
-    try:
-        driver.get(CAREFOUR_GROCERY_URL)
-        wait = WebDriverWait(driver, 15)
-        
-        # Wait until product grid is visible
-        wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "div.relative")))
-        
-        # Find all product cards
-        product_cards = driver.find_elements(By.CSS_SELECTOR, "div.relative")
-        products_details = []
-        
-        for card in product_cards:
-            try:
-                # Product link
-                link_tag = card.find_element(By.CSS_SELECTOR, "a[href*='/p/']")
-                link_href = link_tag.get_attribute("href")
-                if link_href.startswith("/"):
-                    link = "https://www.carrefour.pk" + link_href
-                else:
-                    link = link_href
-                
-                # Image
-                img_tag = card.find_element(By.TAG_NAME, "img")
-                image_url = img_tag.get_attribute("src")
-                
-                # Name
-                name_span = card.find_element(By.CSS_SELECTOR, "div.line-clamp-2 span")
-                name = name_span.text.strip()
-                
-                # Price (PKR)
-                price_int = card.find_element(By.CSS_SELECTOR, "div.text-lg.font-bold").text
-                price_frac = card.find_element(By.CSS_SELECTOR, "div.text-2xs.font-bold").text
-                price = f"{price_int}.{price_frac} PKR"
-                
-                products_details.append({
-                    "store": store_name,
-                    "name": name,
-                    "product-link": link,
-                    "price": price,
-                    "image_url": image_url
-                })
-            except Exception as e:
-                continue
-        
-        # Filter products for relevance
-        filtered_products = get_filtered_products(products_details, word_to_search)
-        print(f"[{store_name}] Found {len(filtered_products)} products")
-        return filtered_products
-        
-    except Exception as e:
-        print(f"[{store_name}] Error during scraping: {str(e)}")
-        return []
-
-
-def scrape_imtiaz(driver, word_to_search, wait_time=5):
-    """
-    Scrape Imtiaz store for products with pagination
-    Returns: list of products with store name, or empty list on error
-    """
-    try:
-        store_name = "Imtiaz"
-        IMTIAZ_GROCERY_URL = f"https://shop.imtiaz.com.pk/search?q={word_to_search}"
-        driver.get(IMTIAZ_GROCERY_URL)
-        wait = WebDriverWait(driver, wait_time)
-
-        products_details = []
-        
-        # Select location
-        try:
-            area = wait.until(EC.presence_of_element_located(
-                (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/div[3]/div/div/input")
-            ))
-            area.send_keys(Keys.ENTER)
-            area.send_keys(Keys.DOWN)
-            area.send_keys(Keys.DOWN)
-            area.send_keys(Keys.ENTER)
-            
-            submit_button = wait.until(EC.presence_of_element_located(
-                (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/button")
-            ))
-            submit_button.click()
-        except TimeoutException:
-            print(f"[{store_name}] No location box appeared")
-        
-        # Get initial products
-        try:
-            products = wait.until(EC.presence_of_all_elements_located(
-                (By.CLASS_NAME, "hazle-product-item_product_item__FSm1N")
-            ))
-            
-            current_url = driver.current_url
-            
-            # Extract products and handle pagination
-            while True:
-                try:
-                    # Wait for products to load
-                    products = wait.until(EC.presence_of_all_elements_located(
-                        (By.CLASS_NAME, "hazle-product-item_product_item__FSm1N")
-                    ))
-                    time.sleep(5)  # Extra wait to ensure full load
-                    # Extract all products on current page
-                    for product in products:
-                        try:
-                            product_text_container = product.find_element(By.CLASS_NAME, "hazle-product-item_product_item_text_container__Apuq1")
-                            
-                            product_name = product_text_container.find_element(By.CLASS_NAME, "hazle-product-item_product_item_description__ejRDa").text.strip()
-                            product_price = product_text_container.find_element(By.CLASS_NAME, "hazle-product-item_product_item_price_label__ET_we").text.strip()
-                            
-                            product_link_id = product.get_attribute("id")
-                            product_link = f"https://shop.imtiaz.com.pk/product/{product_link_id}"
-                            
-                            image_url = product.find_element(By.TAG_NAME, "img").get_attribute("src")
-                            
-                            products_details.append({
-                                "store": store_name,
-                                "name": product_name,
-                                "product-link": product_link,
-                                "price": product_price,
-                                "image_url": image_url
-                            })
-                        except Exception as e:
-                            print(f"[{store_name}] Error extracting product info: {str(e)}")
-                            continue
-                    
-                    # Try to find and click Next button
-                    try:
-                        button = driver.find_element(By.XPATH, "//button[normalize-space()='Next']")
-                        
-                        if button.get_attribute("disabled"):
-                            print(f"[{store_name}] Reached last page")
-                            break
-                        else:
-                            current_url = driver.current_url
-                            button.click()
-                            time.sleep(10)  # Wait for page to load
-                    except NoSuchElementException:
-                        print(f"[{store_name}] Last page reached")
-                        break
-                        
-                except Exception as e:
-                    print(f"[{store_name}] Error in pagination loop: {str(e)}")
-                    break
-            
-            filtered_products = get_filtered_products(products_details, word_to_search)
-            print(f"[{store_name}] Found {len(filtered_products)} products")
-            return filtered_products
-            
-        except TimeoutException:
-            print(f"[{store_name}] No products found")
-            return []
-        
-    except Exception as e:
-        print(f"[{store_name}] Error during scraping: {str(e)}")
-        return []
-
-
-# ===== MAIN SCRAPING FUNCTION =====
-def scrape_all_stores(driver, word_to_search):
-    """
-    Scrape all 5 stores and combine results into a single list
-    Returns: list of all products from all stores with store names
-    """
-    all_products = []
-    
-    print(f"\n{'='*60}")
-    print(f"Starting scraping for: '{word_to_search}'")
-    print(f"{'='*60}\n")
-    
-    # Scrape each store
-    stores_scrapers = [
-        ("Al-Fateh", scrape_al_fateh),
-        ("Metro", scrape_metro),
-        ("Jalal Sons", scrape_jalalsons),
-        ("Carrefour", scrape_carrefour),
-        ("Imtiaz", scrape_imtiaz),
-    ]
-    
-    for store_label, scraper_func in stores_scrapers:
-        print(f"\n[SCRAPING {store_label.upper()}]")
-        try:
-            products = scraper_func(driver, word_to_search)
-            all_products.extend(products)
-        except Exception as e:
-            print(f"FATAL ERROR for {store_label}: {str(e)}")
-            continue
-    
-    print(f"\n{'='*60}")
-    print(f"Scraping Complete!")
-    print(f"Total products collected: {len(all_products)}")
-    print(f"{'='*60}\n")
-    
-    return all_products
-
-
-def get_filtered_products(products_details, word_to_search):
-    """
-    Filter products for relevance based on search term
-    Returns: list of relevant products
-    """
-    filtered = []
-    search_term_lower = word_to_search.lower()
-    
-    for p in products_details:
-        title_lower = p["name"].lower()
-        if search_term_lower in title_lower:
-            filtered.append(p)
-            
-    return filtered
-
-
-
+# sort mode -> (column, ascending); "Default" keeps the CSV order
+SORT_KEYS = {
+    "Name A-Z": ("cleaned_name", True),
+    "Price Low-High": ("cleaned_price", True),
+    "Price High-Low": ("cleaned_price", False),
+    "Predicted Low-High": ("predicted_price_elastic_net", True),
+    "Predicted High-Low": ("predicted_price_elastic_net", False),
+}
+
+# ---------- Chart Statistics ----------
+CHART_COLS = ["cleaned_price"] + PRED_COLS
+
+# Load the catalogue: "memory" keeps the frame and its indexes in this process (snapshot
+# rebuilt only when the CSV changes), "sqlite" queries catalogue.sqlite3 instead.
+# A new predicted_prices.csv is picked up while the app runs; every request works on
+# the version that was current when it started
+CATALOGUE_BACKEND = os.environ.get("CATALOGUE_BACKEND", "memory")
+catalogue_manager = CatalogueManager("predicted_prices.csv", SORT_KEYS, CHART_COLS, backend=CATALOGUE_BACKEND)
 
 # ---------- Bar Chart: Average Price ----------
-def build_price_chart(df_filtered):
-    if df_filtered.empty:
+def build_price_chart(avg_prices):
+    if avg_prices.empty:
         return go.Figure()
-    
-    avg_prices = df_filtered.groupby("store")[["cleaned_price",
-                                               "predicted_price_elastic_net",
-                                               "predicted_price_linear_regression",
-                                               "predicted_price_random_forest"]].mean().reset_index()
 
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -533,12 +76,11 @@ def build_price_chart(df_filtered):
     return fig
 
 # ---------- Pie Chart: Number of Products ----------
-def build_store_pie_chart(df_filtered):
-    if df_filtered.empty:
+def build_store_pie_chart(store_stats):
+    if store_stats.empty:
         return go.Figure()
     
-    store_counts = df_filtered["store"].value_counts().reset_index()
-    store_counts.columns = ["store", "count"]
+    store_counts = store_stats[["store", "count"]].sort_values("count", ascending=False, kind="stable")
 
     fig = go.Figure(go.Pie(
         labels=store_counts["store"],
@@ -557,48 +99,48 @@ def build_store_pie_chart(df_filtered):
     return fig
 
 # ---------- Scatter: Actual vs All Model Predictions (Normalized) ----------
-def build_actual_vs_best(df_filtered):
+SCATTER_POINT_BUDGET = 1500
+
+def build_actual_vs_best(df_filtered, bounds=None):
     if df_filtered.empty:
         return go.Figure()
 
-    # Select columns to normalize
-    cols = [
-        "cleaned_price",
-        "predicted_price_elastic_net",
-        "predicted_price_linear_regression",
-        "predicted_price_random_forest"
-    ]
-
-    # Min-max normalization
-    df_norm = df_filtered.copy()
-    for col in cols:
-        min_val = df_norm[col].min()
-        max_val = df_norm[col].max()
-        df_norm[col] = (df_norm[col] - min_val) / (max_val - min_val)
-
+    # Min-max normalization, bounds come from the stats cube when available
+    df_norm = {}
+    for col in CHART_COLS:
+        values = df_filtered[col].to_numpy(dtype=float)
+        if bounds is None:
+            min_val, max_val = np.nanmin(values), np.nanmax(values)
+        else:
+            min_val, max_val = bounds[col]
+        df_norm[col] = (values - min_val) / (max_val - min_val)
+
+    # WebGL traces capped at SCATTER_POINT_BUDGET points each, outliers always kept
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_norm["cleaned_price"],
-        y=df_norm["predicted_price_elastic_net"],
-        mode="markers",
-        name="Elastic Net",
-        line=dict(color='white')
-    ))
-    fig.add_trace(go.Scatter(
-        x=df_norm["cleaned_price"],
-        y=df_norm["predicted_price_linear_regression"],
-        mode="markers",
-        name="Linear Regression"
-    ))
-    fig.add_trace(go.Scatter(
-        x=df_norm["cleaned_price"],
-        y=df_norm["predicted_price_random_forest"],
-        mode="markers",
-        name="Random Forest"
-    ))
+    shown = dropped = 0
+    for col, name, line in [
+        ("predicted_price_elastic_net", "Elastic Net", dict(color='white')),
+        ("predicted_price_linear_regression", "Linear Regression", None),
+        ("predicted_price_random_forest", "Random Forest", None)
+    ]:
+        keep = grid_downsample(df_norm["cleaned_price"], df_norm[col], SCATTER_POINT_BUDGET)
+        plottable = np.count_nonzero(np.isfinite(df_norm["cleaned_price"]) & np.isfinite(df_norm[col]))
+        shown += len(keep)
+        dropped += plottable - len(keep)
+        fig.add_trace(go.Scattergl(
+            x=df_norm["cleaned_price"][keep],
+            y=df_norm[col][keep],
+            mode="markers",
+            name=name,
+            line=line
+        ))
+
+    title = "Normalized Comparison: Actual vs Predicted Prices"
+    if dropped:
+        title += f"<br><sup>showing {shown} points, {dropped} dropped by downsampling</sup>"
 
     fig.update_layout(
-        title="Normalized Comparison: Actual vs Predicted Prices",
+        title=title,
         xaxis_title="Actual Price (Normalized)",
         yaxis_title="Predicted Price (Normalized)",
         paper_bgcolor="black",
@@ -609,138 +151,373 @@ def build_actual_vs_best(df_filtered):
     )
     return fig
 
+# ---------- Card Pages ----------
+PAGE_SIZE = 48
+
+def deal_html(label):
+    if not label:
+        return ""
+    return f"<p style='color:red; font-size:14px; font-weight:bold;'>🏷️ {label}</p>"
+
+def cheapest_label(row, offer):
+    if offer is None or offer["n_stores"] < 2:
+        return ""
+    if offer["row"] == row:
+        return f"Cheapest of {offer['n_stores']} stores"
+    return f"Cheaper at {offer['store']}: Rs {offer['price']:g}"
+
+def cheapest_html(label):
+    if not label:
+        return ""
+    return f"<p style='margin:4px 0; font-size:12px; color:#7CFC00;'>{label}</p>"
+
+def card_columns(results, prediction_col):
+    # Plain column arrays, the card builders never touch rows one by one
+    return zip(
+        results["image_url"].to_numpy(),
+        results["cleaned_name"].to_numpy(),
+        results["store"].to_numpy(),
+        results["cleaned_price"].to_numpy(),
+        results["deal_label"].to_numpy(),
+        results[prediction_col].to_numpy(),
+        results["cheapest_label"].to_numpy()
+    )
+
 # ---------- Vertical Store Comparison ----------
-def build_vertical_store_comparison(results):
-    stores = sorted(results["store"].unique())
-    html = "<div style='display:flex; gap:30px; width:100%; background:black; padding:10px;'>"
-    for store in stores:
+def build_vertical_store_comparison(results, strategy="Best Model"):
+    prediction_col, prediction_label = PREDICTION_STRATEGIES[strategy]
+    columns = []
+    for store in sorted(results["store"].unique()):
         store_items = results[results["store"] == store]
-        html += f"<div style='flex:1; min-width:250px; border:2px solid white; border-radius:10px; padding:15px;'>"
-        html += f"<h2 style='text-align:center; color:white; margin-bottom:15px;'>{store}</h2>"
-        for _, row in store_items.iterrows():
-            img = row["image_url"]
-            name = row["cleaned_name"]
-            price = row["cleaned_price"]
-            html += f"""
+        cards = "".join(f"""
             <div style='margin-bottom:25px; border:1px solid white; border-radius:8px; padding:10px; background:black;'>
                 <img src="{img}" style="width:100%; height:160px; object-fit:contain; border-radius:8px;" />
                 <h4 style='font-size:14px; margin:8px 0; color:white;'>{name}</h4>
-                {f"<p style='color:red; font-size:14px; font-weight:bold;'>🏷️ {row['deal_label']}</p>" if row['deal_label'] else ""}
+                {deal_html(label)}
                 <p style='margin:4px 0; font-size:14px; color:white;'>Price: <b>Rs {price}</b></p>
-                <p style='margin:4px 0; font-size:14px; color:yellow;'>Best Prediction: <b>Rs {row['best_predicted_value']:.2f}</b></p>
+                <p style='margin:4px 0; font-size:14px; color:yellow;'>{prediction_label}: <b>Rs {best:.2f}</b></p>
+                {cheapest_html(cheapest)}
             </div>
-            """
-        html += "</div>"
-    html += "</div>"
-    return html
+            """ for img, name, _, price, label, best, cheapest in card_columns(store_items, prediction_col))
+        columns.append(
+            "<div style='flex:1; min-width:250px; border:2px solid white; border-radius:10px; padding:15px;'>"
+            f"<h2 style='text-align:center; color:white; margin-bottom:15px;'>{store}</h2>"
+            f"{cards}</div>"
+        )
+    return f"<div style='display:flex; gap:30px; width:100%; background:black; padding:10px;'>{''.join(columns)}</div>"
 
 # ---------- Normal Card Layout ----------
-def build_normal_cards(results):
-    html = "<div style='background:black; padding:10px;'>"
-    html += "<h2 style='color:white; margin-bottom:15px;'>Showing All Products</h2>"
-    html += "<div style='display:flex; flex-wrap:wrap; gap:20px;'>"
-    for _, row in results.iterrows():
-        img = row["image_url"]
-        name = row["cleaned_name"]
-        store = row["store"]
-        price = row["cleaned_price"]
-        html += f"""
+def build_normal_cards(results, strategy="Best Model"):
+    prediction_col, prediction_label = PREDICTION_STRATEGIES[strategy]
+    cards = "".join(f"""
         <div style='width:220px; border:1px solid white; border-radius:10px; padding:10px; background:black; box-shadow:0 2px 5px rgba(255,255,255,0.15); font-family:Arial;'>
             <img src="{img}" style="width:100%; height:180px; object-fit:contain; border-radius:8px;" />
             <h4 style='font-size:14px; margin:8px 0; height:40px; overflow:hidden; color:white;'>{name}</h4>
             <p style='margin:4px 0; font-size:12px; color:white;'>Store: {store}</p>
-            {f"<p style='color:red; font-size:14px; font-weight:bold;'>🏷️ {row['deal_label']}</p>" if row['deal_label'] else ""}
+            {deal_html(label)}
             <p style='margin:4px 0; font-size:14px; font-weight:bold; color:white;'>Rs {price}</p>
-            <p style='margin:4px 0; font-size:14px; color:yellow;'>Best Prediction: <b>Rs {row['best_predicted_value']:.2f}</b></p>
+            <p style='margin:4px 0; font-size:14px; color:yellow;'>{prediction_label}: <b>Rs {best:.2f}</b></p>
+            {cheapest_html(cheapest)}
         </div>
-        """
-    html += "</div></div>"
-    return html
+        """ for img, name, store, price, label, best, cheapest in card_columns(results, prediction_col))
+    return (
+        "<div style='background:black; padding:10px;'>"
+        "<h2 style='color:white; margin-bottom:15px;'>Showing All Products</h2>"
+        f"<div style='display:flex; flex-wrap:wrap; gap:20px;'>{cards}</div></div>"
+    )
+
+def render_page(catalogue, rows, page, vertical=False, best_deal=False, strategy="Best Model"):
+    """
+    Render one page of PAGE_SIZE cards out of the given row positions
+    Returns: (html, page actually shown, page info text)
+    """
+    n_pages = max(1, -(-len(rows) // PAGE_SIZE))
+    page = min(max(int(page or 1), 1), n_pages)
+    start = (page - 1) * PAGE_SIZE
+    page_rows = rows[start:start + PAGE_SIZE]
+    page_df = catalogue.rows(page_rows)
+
+    # The best deal is always the first result, so it is labelled on page 1 only
+    labels = [""] * len(page_df)
+    if best_deal and page == 1 and labels:
+        labels[0] = "BEST DEAL"
+    offers = catalogue.cheapest_offers(page_rows)
+    page_df = page_df.assign(deal_label=labels, cheapest_label=[cheapest_label(row, offers[row]) for row in page_rows])
+
+    if vertical:
+        html = build_vertical_store_comparison(page_df, strategy)
+    else:
+        html = build_normal_cards(page_df, strategy)
+
+    n_bytes = len(html.encode("utf-8"))
+    info = f"Page {page} of {n_pages} · {len(rows)} products · {n_bytes / 1024:.1f} KB rendered"
+    return html, page, info
 # ---------- Real time scraping ----------
-def run_realtime_scraper(keyword):
-    if not keyword.strip():
-        return "<p style='color:white;'>Please enter a product keyword.</p>"
-    
-    driver = create_stealth_driver()
-    try:
-        products = scrape_all_stores(driver, keyword)
-        if not products:
-            return "<p style='color:white;'>No products found.</p>"
-
-        html = "<div style='background:black; display:flex; flex-wrap:wrap; gap:20px;'>"
-        for p in products:
-            img = p.get("image_url", "")
-            name = p.get("name", "")
-            store = p.get("store", "")
-            price = p.get("price", "")
-            link = p.get("product-link", p.get("link", "#"))
-            html += f"""
+# Warm headless browsers shared by every "Scrape Now" click, stores run in parallel
+# Results are cached per (keyword, store) for 15 minutes, also on disk
+scrape_engine = create_engine(pool_size=3, store_timeout=90, cache_ttl=15 * 60, cache_db="scrape_cache.sqlite3")
+
+# Saved per-category models (train_models.py), loaded once, batches products across concurrent scrapes
+price_service = PriceService("models")
+LIVE_STRATEGY = "Weighted Ensemble"
+
+def clean_scraped(products):
+    """
+    Scraped products with numeric price, quantity / unit and category resolved the same way as the catalogue
+    Returns: list of products with cleaned_price, cleaned_name, cleaned_quantity, cleaned_unit
+             and cleaned_category added
+    """
+    if not products:
+        return []
+    names = [p.get("name", "") for p in products]
+    units = normalize_names(names)
+    prices = parse_prices([p.get("price") for p in products])
+    categories = default_resolver().resolve([p.get("store") for p in products], names=units["cleaned_name"])
+    return [
+        dict(p, cleaned_price=price, cleaned_name=name, cleaned_quantity=quantity, cleaned_unit=unit, cleaned_category=category)
+        for p, price, name, quantity, unit, category in zip(
+            products, prices["cleaned_price"], units["cleaned_name"], units["cleaned_quantity"],
+            units["cleaned_unit"], categories["cleaned_category"]
+        )
+    ]
+
+def predict_scraped(products):
+    """
+    Cleaned scraped products with the models' predictions
+    Returns: list of products with the prediction columns and aggregated values added
+    """
+    if not products:
+        return []
+    scored = price_service.predict(products).result()
+    return [dict(p, **row) for p, row in zip(products, scored.to_dict("records"))]
+
+def label_best_deal(products):
+    # Same rule as the catalogue: largest prediction - price gap is the best deal
+    prediction_col, _ = PREDICTION_STRATEGIES[LIVE_STRATEGY]
+    diff = np.array([p.get(prediction_col, np.nan) - p["cleaned_price"] for p in products], dtype=float)
+    best = int(np.nanargmax(diff)) if len(diff) and not np.isnan(diff).all() else None
+    return [dict(p, deal_label="BEST DEAL" if i == best else "") for i, p in enumerate(products)]
+
+def by_price(products):
+    # Cheapest first across all stores, unparsed prices last
+    return sorted(products, key=lambda p: (pd.isna(p["cleaned_price"]), p["cleaned_price"]))
+
+def price_label(product):
+    price = product.get("cleaned_price")
+    if price is None or pd.isna(price):
+        return product.get("price", "")
+    return f"Rs {price:g}"
+
+def size_label(product):
+    quantity = product.get("cleaned_quantity")
+    if quantity is None or pd.isna(quantity):
+        return ""
+    return f"{quantity:g} {product['cleaned_unit']}"
+
+def prediction_html(product):
+    prediction_col, prediction_label = PREDICTION_STRATEGIES[LIVE_STRATEGY]
+    value = product.get(prediction_col)
+    if value is None or pd.isna(value):
+        return ""
+    return f"<p style='color:yellow; font-size:14px;'>{prediction_label}: <b>Rs {value:.2f}</b></p>"
+
+def build_scraped_cards(products):
+    cards = "".join(f"""
             <div style='width:220px; border:1px solid white; border-radius:10px; padding:10px; background:black;'>
-                <img src="{img}" style="width:100%; height:180px; object-fit:contain; border-radius:8px;" />
-                <h4 style='color:white; font-size:14px; margin:5px 0; height:40px; overflow:hidden;'>{name}</h4>
-                <p style='color:white; font-size:12px;'>Store: {store}</p>
-                <p style='color:white; font-size:14px; font-weight:bold;'>Rs {price}</p>
-                <a href="{link}" target="_blank" style='color:yellow; font-size:12px;'>View Product</a>
+                <img src="{p.get("image_url", "")}" style="width:100%; height:180px; object-fit:contain; border-radius:8px;" />
+                <h4 style='color:white; font-size:14px; margin:5px 0; height:40px; overflow:hidden;'>{p.get("name", "")}</h4>
+                <p style='color:white; font-size:12px;'>Store: {p.get("store", "")}</p>
+                <p style='color:white; font-size:12px;'>Size: {size_label(p) or "-"}</p>
+                <p style='color:white; font-size:12px;'>Category: {p["cleaned_category"] if isinstance(p.get("cleaned_category"), str) else "-"}</p>
+                {deal_html(p.get("deal_label"))}
+                <p style='color:white; font-size:14px; font-weight:bold;'>{price_label(p)}</p>
+                {prediction_html(p)}
+                <a href="{p.get("product-link", p.get("link", "#"))}" target="_blank" style='color:yellow; font-size:12px;'>View Product</a>
             </div>
-            """
-        html += "</div>"
-        return html
+            """ for p in products)
+    return f"<div style='background:black; display:flex; flex-wrap:wrap; gap:20px;'>{cards}</div>"
+
+def fetched_ago(fetched_at):
+    minutes = int((time.time() - fetched_at) // 60)
+    if minutes < 1:
+        return "fetched just now"
+    return f"fetched {minutes} minute{'s' if minutes != 1 else ''} ago"
+
+def build_scrape_status(finished, pending):
+    parts = []
+    for result in finished:
+        if result.error:
+            parts.append(f"{result.store}: {result.error}")
+        else:
+            parts.append(f"{result.store}: {len(result.products)} products ({fetched_ago(result.fetched_at)})")
+    parts += [f"{store}: scraping..." for store in pending]
+    return f"<p style='color:white; font-size:12px;'>{' | '.join(parts)}</p>"
+
+def record_scraped(keyword, products):
+    # The SQLite backend keeps every live-scraped product, the in-memory one ignores them
+    catalogue_manager.current().record_scraped(keyword, products)
+    return products
+
+# Scrapes run on their own worker threads, never inside a Gradio worker:
+# 2 keywords at a time, at most 8 waiting, cleaning, predictions and storage done on the workers
+scrape_jobs = ScrapeJobQueue(
+    scrape_engine, workers=2, max_queued=8,
+    process=lambda keyword, products: record_scraped(keyword, predict_scraped(clean_scraped(products)))
+)
+SCRAPE_POLL_SECONDS = 0.25
+
+def build_queue_status(position):
+    stats = scrape_jobs.stats()
+    return (
+        f"<p style='color:white; font-size:12px;'>Queued: position {position}, "
+        f"{stats['running']} scrape{'s' if stats['running'] != 1 else ''} running</p>"
+    )
+
+async def run_realtime_scraper(keyword):
+    if not keyword.strip():
+        yield "<p style='color:white;'>Please enter a product keyword.</p>"
+        return
+    try:
+        job = scrape_jobs.submit(keyword)
+    except QueueFull as e:
+        yield f"<p style='color:white;'>Scraper is busy: {str(e)}</p>"
+        return
+
+    # Poll the job and stream the cards as each store finishes
+    seen = None
+    while True:
+        update = scrape_jobs.snapshot(job)
+        if (update.version, update.position) != seen:
+            seen = (update.version, update.position)
+            if update.state == "queued":
+                yield build_queue_status(update.position)
+            else:
+                finished_stores = {result.store for result in update.results}
+                pending = [] if update.state == "done" else [s for s in scrape_engine.stores if s not in finished_stores]
+                products = label_best_deal(by_price([p for result in update.results for p in result.products]))
+                status = build_scrape_status(update.results, pending)
+                if update.state == "done" and not products:
+                    yield status + "<p style='color:white;'>No products found.</p>"
+                else:
+                    yield status + build_scraped_cards(products)
+        if update.state == "done":
+            return
+        await asyncio.sleep(SCRAPE_POLL_SECONDS)
+
+# ---------- Cached Result Rows ----------
+def result_rows(catalogue, query, selected_stores, selected_categories, sort_by, strategy):
+    # Cached per combination of inputs by the catalogue version itself
+    return catalogue.result_rows(
+        query,
+        tuple(sorted(selected_stores or [])),
+        tuple(sorted(selected_categories or [])),
+        sort_by,
+        strategy
+    )
+
+def use_vertical_layout(catalogue, query, rows):
+    # Side by side store columns only for text searches that span several stores
+    return bool(query.strip()) and catalogue.n_stores(rows) > 1
 
-    finally:
-        driver.quit()
 # ---------- Main Function ----------
-def search_products(query, selected_stores, selected_categories, sort_by):
-    temp = df.copy()
-    if selected_stores:
-        temp = temp[temp["store"].isin(selected_stores)]
-    if selected_categories:
-        temp = temp[temp["cleaned_category"].isin(selected_categories)]
-    temp = apply_sorting(temp, sort_by)
-    if query.strip():
-        temp = temp[temp["cleaned_name"].str.contains(query, case=False, na=False)]
-    if temp.empty:
-        return go.Figure(), go.Figure(), go.Figure(), "<h3 style='color:white;'>No products found</h3>"
-
-    temp['diff_best'] = temp['best_predicted_value'] - temp['cleaned_price']
-
-    best_deal = temp.loc[[temp['diff_best'].idxmax()]]
-    best_deal["deal_label"] = "BEST DEAL"
-    others = temp.drop(best_deal.index)
-    others["deal_label"] = ""
-    temp = pd.concat([best_deal, others], ignore_index=True)
-
-    # Build visualizations
-    avg_price_fig = build_price_chart(temp)
-    store_pie_fig = build_store_pie_chart(temp)
-    best_pred_fig = build_actual_vs_best(temp)
-
-    # Layout
-    if query.strip() and temp["store"].nunique() > 1:
-        html = build_vertical_store_comparison(temp)
-    else:
-        html = build_normal_cards(temp)
+def search_products(query, selected_stores, selected_categories, sort_by, strategy):
+    catalogue = catalogue_manager.current()
+    rows = result_rows(catalogue, query, selected_stores, selected_categories, sort_by, strategy)
+    if len(rows) == 0:
+        return go.Figure(), go.Figure(), go.Figure(), "<h3 style='color:white;'>No products found</h3>", 1, ""
+
+    # Build visualizations, the catalogue aggregates instead of handing out the rows
+    selected_stores, selected_categories = selected_stores or [], selected_categories or []
+    store_stats = catalogue.store_stats(query, rows, selected_stores, selected_categories)
+    chart_rows, bounds = catalogue.chart_rows(query, rows, selected_stores, selected_categories)
+    avg_price_fig = build_price_chart(store_stats)
+    store_pie_fig = build_store_pie_chart(store_stats)
+    best_pred_fig = build_actual_vs_best(chart_rows, bounds)
+
+    # Layout, new searches always start on page 1
+    vertical = use_vertical_layout(catalogue, query, rows)
+    html, page, info = render_page(catalogue, rows, 1, vertical, best_deal=True, strategy=strategy)
+
+    return avg_price_fig, store_pie_fig, best_pred_fig, html, page, info
+
+def change_page(query, selected_stores, selected_categories, sort_by, strategy, page):
+    catalogue = catalogue_manager.current()
+    rows = result_rows(catalogue, query, selected_stores, selected_categories, sort_by, strategy)
+    if len(rows) == 0:
+        return "<h3 style='color:white;'>No products found</h3>", 1, ""
+    vertical = use_vertical_layout(catalogue, query, rows)
+    return render_page(catalogue, rows, page, vertical, best_deal=True, strategy=strategy)
+
+# ---------- Catalogue Version ----------
+RELOAD_CHECK_SECONDS = 10
+
+def catalogue_status(info):
+    return (
+        f"Catalogue v{info['version']} · {info['rows']} products · "
+        f"loaded {info['loaded_at']} in {info['load_seconds']:.2f}s ({info['backend']})"
+    )
+
+def initial_view():
+    """
+    First page of all products and the charts, from the version current when the page opens
+    Returns: values of the dashboard outputs, the filter choices, status and seen version
+    """
+    catalogue = catalogue_manager.current()
+    info = catalogue_manager.info
+    all_rows = np.arange(len(catalogue))
+    html, page, page_text = render_page(catalogue, all_rows, 1)
+    store_stats = catalogue.store_stats("", all_rows, [], [])
+    return (
+        build_price_chart(store_stats),
+        build_store_pie_chart(store_stats),
+        build_actual_vs_best(*catalogue.chart_rows("", all_rows, [], [])),
+        html, page, page_text,
+        gr.update(choices=catalogue.choices("store"), value=[]),
+        gr.update(choices=catalogue.choices("cleaned_category"), value=[]),
+        catalogue_status(info),
+        info["version"]
+    )
 
-    return avg_price_fig, store_pie_fig, best_pred_fig, html
+def refresh_choices(seen_version, selected_stores, selected_categories):
+    # Only sessions that still show an older version get new choice lists, selections are kept
+    info = catalogue_manager.info
+    if info["version"] == seen_version:
+        return gr.skip(), gr.skip(), gr.skip(), gr.skip()
+    catalogue = catalogue_manager.current()
+    stores = catalogue.choices("store")
+    categories = catalogue.choices("cleaned_category")
+    return (
+        gr.update(choices=stores, value=[s for s in selected_stores or [] if s in stores]),
+        gr.update(choices=categories, value=[c for c in selected_categories or [] if c in categories]),
+        catalogue_status(info) + " · new data, search again to refresh the results",
+        info["version"]
+    )
 
 # ---------- Gradio UI ----------
+# Dashboard queries share one pool of workers, scrapes are handled by scrape_jobs
+DASHBOARD_CONCURRENCY = 8
+
 with gr.Blocks() as demo:
 
     with gr.Tab("Dashboard"):
         gr.Markdown("<h2 style='color:white; text-align:center;'>🛒 Product Search Dashboard</h2>")
-        all_stores = sorted(df["store"].unique())
-        all_categories = sorted(df["cleaned_category"].unique())
+        catalogue_info = gr.Markdown()
+        seen_version = gr.State(0)
 
         with gr.Row():
             query = gr.Textbox(label="Search Product", placeholder="Search...")
             sort_by = gr.Dropdown(
-                ["Default", "Name A-Z", "Price Low-High", "Price High-Low",
-                "Predicted Low-High", "Predicted High-Low"],
+                ["Default"] + list(SORT_KEYS),
                 value="Default", label="Sort By"
             )
+            strategy = gr.Dropdown(
+                list(PREDICTION_STRATEGIES),
+                value="Best Model", label="Prediction Strategy"
+            )
 
         with gr.Row():
-            store_filter = gr.CheckboxGroup(all_stores, label="Filter by Store")
-            category_filter = gr.CheckboxGroup(all_categories, label="Filter by Category")
+            store_filter = gr.CheckboxGroup([], label="Filter by Store")
+            category_filter = gr.CheckboxGroup([], label="Filter by Category")
 
         # Charts row
         with gr.Row():
@@ -750,23 +527,39 @@ with gr.Blocks() as demo:
 
         results_html = gr.HTML()
 
-        # Show all products initially
-        results_html.value = build_normal_cards(df)
-        avg_price_chart.value = build_price_chart(df)
-        store_pie_chart.value = build_store_pie_chart(df)
-        best_pred_scatter.value = build_actual_vs_best(df)
+        with gr.Row():
+            page = gr.Number(value=1, label="Page", precision=0, minimum=1)
+            page_info = gr.Markdown()
 
-        inputs = [query, store_filter, category_filter, sort_by]
-        outputs = [avg_price_chart, store_pie_chart, best_pred_scatter, results_html]
+        inputs = [query, store_filter, category_filter, sort_by, strategy]
+        outputs = [avg_price_chart, store_pie_chart, best_pred_scatter, results_html, page, page_info]
+
+        # Every page load shows the first page of all products of the current version
+        demo.load(initial_view, outputs=outputs + [store_filter, category_filter, catalogue_info, seen_version],
+                  concurrency_limit=DASHBOARD_CONCURRENCY, concurrency_id="dashboard")
+
+        # Pick up a reloaded catalogue's stores / categories without a restart
+        reload_timer = gr.Timer(RELOAD_CHECK_SECONDS)
+        reload_timer.tick(refresh_choices, inputs=[seen_version, store_filter, category_filter],
+                          outputs=[store_filter, category_filter, catalogue_info, seen_version],
+                          concurrency_limit=DASHBOARD_CONCURRENCY, concurrency_id="dashboard")
 
         for inp in inputs:
-            inp.change(search_products, inputs=inputs, outputs=outputs)
+            inp.change(search_products, inputs=inputs, outputs=outputs,
+                       concurrency_limit=DASHBOARD_CONCURRENCY, concurrency_id="dashboard")
+
+        # .input (not .change) so resetting the page from a new search does not re-render
+        page.input(change_page, inputs=inputs + [page], outputs=[results_html, page, page_info],
+                   concurrency_limit=DASHBOARD_CONCURRENCY, concurrency_id="dashboard")
     
     with gr.Tab("Real-Time Scraper"):
         gr.Markdown("<h2 style='color:white; text-align:center;'>🛒 Real-Time Scraper</h2>")
         scraper_input = gr.Textbox(label="Enter Keyword", placeholder="e.g., pepsi")
         scraper_button = gr.Button("Scrape Now")
         scraper_output = gr.HTML()
-        scraper_button.click(run_realtime_scraper, inputs=[scraper_input], outputs=[scraper_output])
+        # Async handler that only polls the job queue, so it needs no limit of its own
+        scraper_button.click(run_realtime_scraper, inputs=[scraper_input], outputs=[scraper_output],
+                             concurrency_limit=None)
 
+demo.queue(max_size=128)
 demo.launch(server_name="127.0.0.1", server_port=2020)
\ No newline at end of file
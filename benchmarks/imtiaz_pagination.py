@@ -0,0 +1,105 @@
+"""
+Wall time per results page of scrape_imtiaz, fixed sleeps vs fast mode.
+
+Serves benchmarks/fixtures/imtiaz_search.html (Imtiaz's product card
+markup) and a paged JSON search endpoint from a local HTTP server, points
+STORE_URLS["Imtiaz"] at it and times:
+    sleeps       - the old fixed 5s / 10s waits (fast=False)
+    event waits  - readiness waits, Next clicks only (listing API hidden)
+    api          - readiness waits + remaining pages from the JSON endpoint
+
+Needs Chrome and chromedriver, like the scrapers themselves:
+    python benchmarks/imtiaz_pagination.py --pages 5 --latency 0.3
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrapers  # noqa: E402
+from scrapers import STORE_URLS, create_stealth_driver, scrape_imtiaz  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_SIZE = 20
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    pages = 5
+    latency = 0.3
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/api/search":
+            return self.search(parse_qs(parts.query))
+        if parts.path == "/search":
+            self.path = "/imtiaz_search.html"
+        return super().do_GET()
+
+    def search(self, params):
+        # Simulated network + backend time per listing request
+        time.sleep(self.latency)
+        q = params.get("q", [""])[0]
+        page = int(params.get("page", ["1"])[0])
+        items = []
+        if page <= self.pages:
+            items = [
+                {
+                    "id": f"{page}-{i}",
+                    "name": f"{q} product {page}-{i}",
+                    "price": 100 + page * PAGE_SIZE + i,
+                    "image": f"/img/{page}-{i}.png"
+                }
+                for i in range(PAGE_SIZE)
+            ]
+        body = json.dumps({"items": items, "page": page, "pages": self.pages}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_mode(driver, mode, keyword):
+    original_find_api = scrapers.find_listing_api
+    if mode == "event waits":
+        scrapers.find_listing_api = lambda *args: None
+    try:
+        start = time.perf_counter()
+        products = scrape_imtiaz(driver, keyword, wait_time=1, fast=(mode != "sleeps"))
+        return time.perf_counter() - start, len(products)
+    finally:
+        scrapers.find_listing_api = original_find_api
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per listing API request")
+    parser.add_argument("--keyword", default="pepsi")
+    args = parser.parse_args()
+
+    FixtureHandler.pages = args.pages
+    FixtureHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    STORE_URLS["Imtiaz"] = f"http://127.0.0.1:{server.server_port}/search?q={{query}}"
+
+    driver = create_stealth_driver(headless=True)
+    try:
+        print(f"{'mode':<12} {'total s':>8} {'s/page':>8} {'products':>9}")
+        for mode in ["sleeps", "event waits", "api"]:
+            seconds, n_products = run_mode(driver, mode, args.keyword)
+            print(f"{mode:<12} {seconds:>8.2f} {seconds / args.pages:>8.2f} {n_products:>9}")
+    finally:
+        driver.quit()
+        server.shutdown()
@@ -0,0 +1,79 @@
+"""
+Outlier removal on price per unit: the notebook's per-category loop vs
+outliers.remove_outliers.
+
+Tiles feature_enginered_products.csv --scale times (prices jittered so the
+copies are not identical), then times:
+    loop        - 5)modell.ipynb: quantiles per category, df.drop() per category
+    vectorized  - one grouped pass for the bounds, one boolean mask
+and checks both keep the same rows. The MAD and robust z-score rules are
+timed too.
+
+    python benchmarks/outlier_removal.py --scale 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outliers import OUTLIER_RULES, remove_outliers  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def notebook_loop(df):
+    # Cell 5 of 5)modell.ipynb, without the prints
+    for category, group in df.groupby("category"):
+        q1 = group["price_per_unit"].quantile(0.25)
+        q3 = group["price_per_unit"].quantile(0.75)
+        iqr = q3 - q1
+        lower_bound = q1 - 1.5 * iqr
+        upper_bound = q3 + 1.5 * iqr
+        outliers = group[(group["price_per_unit"] <= lower_bound) | (group["price_per_unit"] >= upper_bound)]
+        df = df.drop(outliers.index)
+    return df
+
+def scaled_frame(path, scale, seed=0):
+    df = pd.read_csv(path)
+    rng = np.random.default_rng(seed)
+    copies = [df] + [
+        df.assign(cleaned_price=df["cleaned_price"] * rng.uniform(0.9, 1.1, len(df)))
+        for _ in range(scale - 1)
+    ]
+    df = pd.concat(copies, ignore_index=True)
+    df["price_per_unit"] = df["cleaned_price"] / df["cleaned_quantity"]
+    return df
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-category outlier removal")
+    parser.add_argument("--csv", default=os.path.join(ROOT, "feature_enginered_products.csv"))
+    parser.add_argument("--scale", type=int, default=10, help="copies of the CSV to stack")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = scaled_frame(args.csv, args.scale)
+    print(f"[Bench] {len(df)} rows, {df['category'].nunique()} categories")
+
+    loop_seconds, loop_kept = timed(lambda: notebook_loop(df), args.repeat)
+    print(f"[Bench] loop:       {loop_seconds * 1000:8.1f} ms, kept {len(loop_kept)}")
+
+    for rule in OUTLIER_RULES:
+        seconds, (kept, report) = timed(lambda: remove_outliers(df, rule=rule, log=False), args.repeat)
+        print(f"[Bench] {rule + ':':11} {seconds * 1000:8.1f} ms, kept {len(kept)}, {len(report)} groups lost rows")
+        if rule == "iqr":
+            assert kept.index.equals(loop_kept.index), "vectorized IQR kept different rows than the loop"
+            print(f"[Bench] iqr matches the loop, {loop_seconds / seconds:.1f}x faster")
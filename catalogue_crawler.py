@@ -0,0 +1,543 @@
+"""
+Incremental, resumable crawler for the full store catalogues.
+
+Replaces the one-shot crawl in 2)grocery_products_scraper.ipynb. All crawl
+state lives in one SQLite file:
+    frontier  - every category listing page per store, with its status in
+                the current run, HTTP validators (ETag / Last-Modified) and
+                the hash of the products it listed last time
+    products  - the product store, one row per (store, listing URL, link),
+                upserted as categories are crawled. Rows belong to the
+                frontier URL that listed them, not to the category label,
+                since several URLs can share one label
+
+Each category is committed as soon as it is done, so a crash or Ctrl+C
+loses at most one category and the next run resumes with the ones still
+pending. A recrawl only renders categories that are due (older than
+--max-age). It skips any the server reports unchanged (304) for stores
+whose pages are rendered on the server, and only writes rows for
+categories whose products actually changed. The per-store
+CSVs read by 3)creating_canonicalized_categories.ipynb are exported from
+the product store for stores that changed.
+
+    python catalogue_crawler.py                      # crawl / resume all stores
+    python catalogue_crawler.py --stores Metro --max-age 12
+    python catalogue_crawler.py --rediscover         # refresh category lists first
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+
+import httpx
+import pandas as pd
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+from scrapers import (
+    CARD_SELECTORS, IMTIAZ_CARD, bulk_products, create_stealth_driver,
+    wait_for_page_change, wait_for_stable_count
+)
+
+CRAWL_DB = "crawl_state.sqlite3"
+PRODUCTS_COLUMNS = """
+    store TEXT, source_url TEXT, category TEXT, product_link TEXT,
+    name TEXT, price TEXT, image_url TEXT,
+    first_seen REAL, last_seen REAL, active INTEGER DEFAULT 1,
+    PRIMARY KEY (store, source_url, product_link)
+"""
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+
+
+# ---------- Crawl State ----------
+class CrawlState:
+    """
+    Frontier, checkpoints and product store in one SQLite file.
+    """
+
+    def __init__(self, db_path=CRAWL_DB):
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS frontier (
+                store TEXT, category TEXT, url TEXT,
+                status TEXT DEFAULT 'pending',  -- pending / done / failed / gone
+                etag TEXT, last_modified TEXT, content_hash TEXT,
+                n_products INTEGER, fetched_at REAL, verified_at REAL, error TEXT,
+                PRIMARY KEY (store, url)
+            );
+            CREATE TABLE IF NOT EXISTS products ({PRODUCTS_COLUMNS});
+        """)
+        self.db.commit()
+        self._migrate_products()
+
+    def _migrate_products(self):
+        # Product stores written before source_url existed: each row goes to a frontier URL of its category
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(products)")]
+        if "source_url" in columns:
+            return
+        with self.db:
+            self.db.execute("ALTER TABLE products RENAME TO products_v1")
+            self.db.execute(f"CREATE TABLE products ({PRODUCTS_COLUMNS})")
+            self.db.execute("""
+                INSERT INTO products
+                SELECT p.store, COALESCE(
+                    (SELECT MIN(f.url) FROM frontier f WHERE f.store = p.store AND f.category = p.category), ''
+                ), p.category, p.product_link, p.name, p.price, p.image_url, p.first_seen, p.last_seen, p.active
+                FROM products_v1 p
+            """)
+            self.db.execute("DROP TABLE products_v1")
+
+    def seed(self, store, categories):
+        """
+        Add newly discovered (category, url) pairs, mark vanished ones as gone
+        """
+        urls = [url for _, url in categories]
+        self.db.executemany(
+            "INSERT INTO frontier (store, category, url) VALUES (?, ?, ?) "
+            "ON CONFLICT (store, url) DO UPDATE SET category = excluded.category, "
+            "status = CASE WHEN status = 'gone' THEN 'pending' ELSE status END",
+            [(store, category, url) for category, url in categories]
+        )
+        placeholders = ",".join("?" * len(urls))
+        self.db.execute(
+            f"UPDATE frontier SET status = 'gone' WHERE store = ? AND url NOT IN ({placeholders})",
+            (store, *urls)
+        )
+        self.db.execute(
+            "UPDATE products SET active = 0 WHERE store = ? AND source_url NOT IN "
+            "(SELECT url FROM frontier WHERE store = ? AND status != 'gone')",
+            (store, store)
+        )
+        self.db.commit()
+
+    def has_frontier(self, store):
+        return self.db.execute("SELECT 1 FROM frontier WHERE store = ? LIMIT 1", (store,)).fetchone() is not None
+
+    def start_run(self, store, max_age):
+        """
+        Queue the categories that are due. Categories still pending from an
+        interrupted run stay queued, so the run resumes where it stopped
+        Returns: number of pending categories
+        """
+        self.db.execute(
+            "UPDATE frontier SET status = 'pending' WHERE store = ? AND status != 'gone' "
+            "AND (fetched_at IS NULL OR fetched_at < ? OR status = 'failed')",
+            (store, time.time() - max_age)
+        )
+        self.db.commit()
+        return self.db.execute(
+            "SELECT COUNT(*) FROM frontier WHERE store = ? AND status = 'pending'", (store,)
+        ).fetchone()[0]
+
+    def pending(self, store):
+        return self.db.execute(
+            "SELECT category, url, etag, last_modified, content_hash, verified_at FROM frontier "
+            "WHERE store = ? AND status = 'pending' ORDER BY fetched_at IS NOT NULL, fetched_at",
+            (store,)
+        ).fetchall()
+
+    def mark_unchanged(self, store, url, validators=None):
+        now = time.time()
+        self.db.execute(
+            "UPDATE frontier SET status = 'done', fetched_at = ?, error = NULL WHERE store = ? AND url = ?",
+            (now, store, url)
+        )
+        if validators is not None:
+            self.db.execute(
+                "UPDATE frontier SET etag = ?, last_modified = ?, verified_at = ? WHERE store = ? AND url = ?",
+                (*validators, now, store, url)
+            )
+        self.db.execute(
+            "UPDATE products SET last_seen = ? WHERE store = ? AND source_url = ? AND active = 1",
+            (now, store, url)
+        )
+        self.db.commit()
+
+    def mark_failed(self, store, url, error):
+        self.db.execute(
+            "UPDATE frontier SET status = 'failed', error = ? WHERE store = ? AND url = ?",
+            (error, store, url)
+        )
+        self.db.commit()
+
+    def upsert_category(self, store, category, url, products, content_hash, validators):
+        """
+        Upsert a category's products, deactivate the ones no longer listed and
+        checkpoint the frontier row, all in one transaction
+        """
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO products (store, source_url, category, product_link, name, price, image_url, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (store, source_url, product_link) DO UPDATE SET "
+                "category = excluded.category, name = excluded.name, price = excluded.price, "
+                "image_url = excluded.image_url, last_seen = excluded.last_seen, active = 1",
+                [
+                    (store, url, category, p["product-link"], p["name"], p["price"], p["image_url"], now, now)
+                    for p in products
+                ]
+            )
+            self.db.execute(
+                "UPDATE products SET active = 0 WHERE store = ? AND source_url = ? AND last_seen < ?",
+                (store, url, now)
+            )
+            self.db.execute(
+                "UPDATE frontier SET status = 'done', content_hash = ?, n_products = ?, fetched_at = ?, "
+                "verified_at = ?, etag = ?, last_modified = ?, error = NULL WHERE store = ? AND url = ?",
+                (content_hash, len(products), now, now, *validators, store, url)
+            )
+
+    def products(self, store):
+        # One row per (category, product) like the notebook's CSVs, even when two listing URLs share a category
+        return pd.read_sql_query(
+            "SELECT store, category, name, price, product_link AS \"product-link\", image_url "
+            "FROM products WHERE store = ? AND active = 1 ORDER BY first_seen, rowid",
+            self.db, params=(store,)
+        ).drop_duplicates(["category", "product-link"], ignore_index=True)
+
+    def close(self):
+        self.db.close()
+
+
+def products_hash(products):
+    # Order-insensitive, so a re-sorted listing with the same products counts as unchanged
+    rows = sorted((p["product-link"], p["name"], p["price"], p["image_url"]) for p in products)
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+
+
+# ---------- Change Detection ----------
+def check_validators(client, url, etag, last_modified):
+    """
+    Conditional GET with the validators saved last time
+    Returns: (unchanged, (etag, last_modified) sent by the server now)
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        response = client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        print(f"[Crawler] Conditional request failed for {url}: {str(e)}")
+        return False, (None, None)
+    validators = (response.headers.get("etag"), response.headers.get("last-modified"))
+    return response.status_code == 304 and bool(headers), validators
+
+
+# ---------- Listing Pages ----------
+def scroll_to_end(driver, locator, idle=2.0, max_rounds=200):
+    """
+    Scroll until no new cards load for `idle` seconds, instead of
+    infinite_scroll's fixed 2s sleep per PAGE_DOWN
+    Returns: list of the loaded cards
+    """
+    cards = wait_for_stable_count(driver, locator)
+    for _ in range(max_rounds):
+        count = len(cards)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, idle, poll_frequency=0.1).until(
+                lambda d: len(d.find_elements(*locator)) > count
+            )
+        except TimeoutException:
+            return cards
+        cards = wait_for_stable_count(driver, locator, settle=0.3)
+    return cards
+
+def crawl_scroll_listing(driver, store, spec, url):
+    driver.get(url)
+    scroll_to_end(driver, (By.CSS_SELECTOR, spec["card"]["card"]))
+    products = bulk_products(driver, store, spec["card"])
+    if products is None:
+        raise RuntimeError("could not extract product cards")
+    return products
+
+def crawl_paged_listing(driver, store, spec, url, max_pages=100):
+    driver.get(url)
+    products = []
+    for _ in range(max_pages):
+        cards = scroll_to_end(driver, IMTIAZ_CARD)
+        page_products = bulk_products(driver, store, spec["card"])
+        if page_products is None:
+            raise RuntimeError("could not extract product cards")
+        products.extend(page_products)
+        try:
+            button = driver.find_element(By.XPATH, "//button[normalize-space()='Next']")
+        except NoSuchElementException:
+            break
+        if button.get_attribute("disabled"):
+            break
+        button.click()
+        wait_for_page_change(driver, IMTIAZ_CARD, cards[0])
+    return products
+
+
+# ---------- Store Setup and Category Discovery ----------
+def discover_al_fateh(driver):
+    driver.get("https://alfatah.pk/pages/grocery-foods")
+    boxes = WebDriverWait(driver, 10).until(EC.presence_of_all_elements_located((By.CLASS_NAME, "box")))
+    return [(box.text.strip(), box.find_element(By.TAG_NAME, "a").get_attribute("href")) for box in boxes]
+
+def setup_jalal_sons(driver):
+    driver.get("https://jalalsons.com.pk/")
+    wait = WebDriverWait(driver, 20)
+    try:
+        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".cursor-pointer.ms-auto"))).click()
+    except TimeoutException:
+        print("[Jalal Sons] No banner appeared")
+    try:
+        select_object = Select(wait.until(EC.presence_of_element_located((By.ID, "selectDeliveryBranch"))))
+        enabled_options = [
+            opt for opt in select_object.options
+            if opt.is_enabled() and opt.get_attribute("value") != ""
+        ]
+        if enabled_options:
+            select_object.select_by_visible_text(random.choice(enabled_options).text)
+            driver.find_element(By.CLASS_NAME, "current_loc_pop_btn").click()
+    except Exception as e:
+        print(f"[Jalal Sons] No location box appeared: {str(e)}")
+
+def discover_jalal_sons(driver):
+    menu = driver.find_element(By.XPATH, "/html/body/header[3]/div/nav/div[1]/ul/li[8]")
+    ActionChains(driver).move_to_element(menu).perform()
+    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, "dropdown-content")))
+    links = menu.find_element(By.CLASS_NAME, "dropdown-content").find_elements(By.TAG_NAME, "a")
+    return [(link.get_attribute("textContent").strip(), link.get_attribute("href")) for link in links]
+
+def setup_imtiaz(driver):
+    driver.get("https://shop.imtiaz.com.pk/")
+    wait = WebDriverWait(driver, 10)
+    try:
+        area = wait.until(EC.presence_of_element_located(
+            (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/div[3]/div/div/input")
+        ))
+        for key in (Keys.ENTER, Keys.DOWN, Keys.DOWN, Keys.ENTER):
+            area.send_keys(key)
+        wait.until(EC.element_to_be_clickable(
+            (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/button")
+        )).click()
+    except TimeoutException:
+        print("[Imtiaz] No location box appeared")
+
+def discover_imtiaz(driver):
+    wait = WebDriverWait(driver, 10)
+    wait.until(EC.element_to_be_clickable(
+        (By.XPATH, "/html/body/div[1]/div[2]/div/div[1]/div[3]/div[1]")
+    )).click()
+    categories_list = wait.until(EC.presence_of_element_located(
+        (By.XPATH, "/html/body/div[1]/div[2]/div/div[1]/div[3]/div[3]/ul")
+    ))
+    category_links = [a.get_attribute("href") for a in categories_list.find_elements(By.TAG_NAME, "a")]
+
+    # Products are listed per sub-category
+    categories = []
+    for link in category_links:
+        try:
+            driver.get(link)
+            container = wait.until(EC.element_to_be_clickable(
+                (By.XPATH, "/html/body/div[1]/div[2]/div/div[2]/div/div")
+            ))
+            categories.extend(
+                (a.get_attribute("textContent").strip(), a.get_attribute("href"))
+                for a in container.find_elements(By.TAG_NAME, "a")
+            )
+        except Exception as e:
+            print(f"[Imtiaz] Error reading sub-categories of {link}: {str(e)}")
+    return categories
+
+def discover_metro(driver):
+    driver.get("https://www.metro-online.pk/")
+    wait = WebDriverWait(driver, 20)
+    wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "NewDesktopNav_menu_outlined_icon_container__8Lrtz"))).click()
+    container = wait.until(EC.presence_of_element_located(
+        (By.CLASS_NAME, "CategoryListingWeb_catergory_listing_Grocery_container__qM57p")
+    ))
+
+    # Leaf slugs: level-three items where a level-two category has them, else the level-two title
+    slugs = []
+    for category_box in container.find_elements(By.CLASS_NAME, "CategoryListingWeb_category_listing_container__wJJOm"):
+        try:
+            ActionChains(driver).move_to_element(category_box).perform()
+            for element in wait.until(EC.presence_of_all_elements_located(
+                (By.CLASS_NAME, "CategoryListingWeb_category_expanded_item_level_two__XkUxr")
+            )):
+                leaves = element.find_elements(By.CLASS_NAME, "CategoryListingWeb_category_expanded_level_three_item__jjFUX")
+                if not leaves:
+                    leaves = element.find_elements(By.CLASS_NAME, "CategoryListingWeb_category_expanded_item_level_two_title_container__Z5dTt")
+                slugs.extend(leaf.text.strip().lower().replace(" ", "-") for leaf in leaves)
+        except Exception as e:
+            print(f"[Metro] Error extracting categories for {category_box.text}: {str(e)}")
+    slugs = list(dict.fromkeys(s for s in slugs if s))
+    return [(slug, f"https://www.metro-online.pk/store/{slug}") for slug in slugs]
+
+
+# Per store: the CSV the notebooks read (and its column order), the card
+# selectors on category pages, how to prepare a session, find categories and
+# crawl one listing page, and whether HTTP validators say anything about the
+# listing. Metro and Imtiaz are Next.js apps whose HTML shell stays the same
+# while the products change, so they are always rendered and compared by
+# the hash of the extracted products instead
+CATALOGUE_STORES = {
+    "al-fateh": {
+        "csv": "al-fateh-products.csv",
+        "columns": ["store", "category", "name", "price", "product-link", "image_url"],
+        "card": dict(CARD_SELECTORS["Al-Fateh"], card=".col-6.col-sm-6.col-md-4.col-lg-2"),
+        "setup": None,
+        "discover": discover_al_fateh,
+        "crawl": crawl_scroll_listing,
+        "http_validators": True,
+    },
+    "Jalal Sons": {
+        "csv": "jalal-sons-products.csv",
+        "columns": ["store", "name", "product-link", "price", "category", "image_url"],
+        "card": CARD_SELECTORS["Jalal Sons"],
+        "setup": setup_jalal_sons,
+        "discover": discover_jalal_sons,
+        "crawl": crawl_scroll_listing,
+        "http_validators": True,
+    },
+    "Imtiaz": {
+        "csv": "Imtiaz-products.csv",
+        "columns": ["store", "name", "product-link", "price", "category", "image_url"],
+        "card": CARD_SELECTORS["Imtiaz"],
+        "setup": setup_imtiaz,
+        "discover": discover_imtiaz,
+        "crawl": crawl_paged_listing,
+        "http_validators": False,
+    },
+    "Metro": {
+        "csv": "Metro-products.csv",
+        "columns": ["store", "name", "product-link", "price", "category", "image_url"],
+        "card": CARD_SELECTORS["Metro"],
+        "setup": None,
+        "discover": discover_metro,
+        "crawl": crawl_scroll_listing,
+        "http_validators": False,
+    },
+}
+
+
+# ---------- Crawler ----------
+def export_csv(state, store, path):
+    """
+    Write the store's active products to its CSV (atomically), in the
+    column order the notebooks expect
+    Returns: number of rows written
+    """
+    df = state.products(store)[CATALOGUE_STORES[store]["columns"]]
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path)
+    os.replace(tmp_path, path)
+    return len(df)
+
+def crawl_store(driver, client, state, store, max_age=20 * 3600, revalidate_age=7 * 24 * 3600,
+                rediscover=False, delay=(1, 3)):
+    """
+    Crawl the due categories of one store, checkpointing after each one
+    A 304 is only trusted for revalidate_age, after that the page is rendered
+    again in case the server's validators ignore client-side content. Stores
+    without http_validators are always rendered and compared by content hash
+    Returns: dict of counts (rendered, unchanged, changed, failed)
+    """
+    spec = CATALOGUE_STORES[store]
+    if spec["setup"] is not None:
+        spec["setup"](driver)
+    if rediscover or not state.has_frontier(store):
+        categories = spec["discover"](driver)
+        if categories:
+            state.seed(store, categories)
+        print(f"[{store}] Discovered {len(categories)} categories")
+
+    n_pending = state.start_run(store, max_age)
+    print(f"[{store}] {n_pending} categories due")
+    counts = {"rendered": 0, "unchanged": 0, "changed": 0, "failed": 0}
+    for category, url, etag, last_modified, old_hash, verified_at in state.pending(store):
+        try:
+            if spec["http_validators"]:
+                trusted = verified_at is not None and time.time() - verified_at < revalidate_age
+                unchanged, validators = check_validators(client, url, etag, last_modified)
+            else:
+                trusted, unchanged, validators = False, False, (None, None)
+            if unchanged and trusted:
+                state.mark_unchanged(store, url)
+                counts["unchanged"] += 1
+                print(f"[{store}] '{category}' not modified")
+                continue
+
+            time.sleep(random.uniform(*delay))
+            products = spec["crawl"](driver, store, spec, url)
+            counts["rendered"] += 1
+            for product in products:
+                product["store"] = store
+            content_hash = products_hash(products)
+            if content_hash == old_hash:
+                state.mark_unchanged(store, url, validators)
+                counts["unchanged"] += 1
+                print(f"[{store}] '{category}': {len(products)} products, unchanged")
+            else:
+                state.upsert_category(store, category, url, products, content_hash, validators)
+                counts["changed"] += 1
+                print(f"[{store}] '{category}': {len(products)} products, updated")
+        except Exception as e:
+            state.mark_failed(store, url, str(e))
+            counts["failed"] += 1
+            print(f"[{store}] Error crawling '{category}': {str(e)}")
+    return counts
+
+def crawl(stores=None, db_path=CRAWL_DB, max_age=20 * 3600, rediscover=False, headless=True, export=True):
+    """
+    Crawl (or resume) every store, exporting the CSV of each store that changed
+    Returns: dict of store -> counts
+    """
+    state = CrawlState(db_path)
+    driver = create_stealth_driver(headless=headless)
+    client = httpx.Client(timeout=15, follow_redirects=True, headers={"User-Agent": USER_AGENT})
+    results = {}
+    try:
+        for store in stores or list(CATALOGUE_STORES):
+            start = time.perf_counter()
+            try:
+                counts = crawl_store(driver, client, state, store, max_age=max_age, rediscover=rediscover)
+            except Exception as e:
+                print(f"[{store}] Crawl stopped: {str(e)}")
+                driver.save_screenshot("error_screenshot.png")
+                continue
+            if export and counts["changed"]:
+                n_rows = export_csv(state, store, CATALOGUE_STORES[store]["csv"])
+                print(f"[{store}] Exported {n_rows} products to {CATALOGUE_STORES[store]['csv']}")
+            print(f"[{store}] {counts} in {time.perf_counter() - start:.1f}s")
+            results[store] = counts
+    finally:
+        client.close()
+        driver.quit()
+        state.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally crawl the full store catalogues")
+    parser.add_argument("--stores", nargs="+", choices=list(CATALOGUE_STORES))
+    parser.add_argument("--db", default=CRAWL_DB)
+    parser.add_argument("--max-age", type=float, default=20, help="hours before a category is due again")
+    parser.add_argument("--rediscover", action="store_true", help="refresh the category lists first")
+    parser.add_argument("--show-browser", action="store_true")
+    parser.add_argument("--no-export", action="store_true", help="only update the crawl database")
+    args = parser.parse_args()
+
+    crawl(
+        stores=args.stores,
+        db_path=args.db,
+        max_age=args.max_age * 3600,
+        rediscover=args.rediscover,
+        headless=not args.show_browser,
+        export=not args.no_export
+    )
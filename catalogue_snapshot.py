@@ -0,0 +1,220 @@
+"""
+Columnar snapshot of predicted_prices.csv for fast app startup.
+
+The snapshot is a folder of .npy files: numeric columns are stored as-is and
+memory-mapped on load, text columns are stored as int32 codes plus a
+fixed-width string dictionary. Derived dashboard columns (fixed image URLs,
+best model, aggregated predictions, deal label, cross-store product IDs) are
+computed once at build time.
+Every build writes its columns to a new version folder inside the snapshot
+folder; meta.json records the CSV's SHA-256 and points at that folder. It is
+written last, so a half-written snapshot is never loaded, and files other
+readers have memory-mapped are never overwritten. Older version folders are
+removed once nothing holds them open (on Windows a mapped file cannot be
+deleted, so removal is retried on the next build or load).
+
+Build it ahead of time with:
+    python catalogue_snapshot.py predicted_prices.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from predictions import aggregate_predictions
+from product_matching import match_products
+
+SNAPSHOT_DIR = ".catalogue_cache"
+SNAPSHOT_VERSION = 4  # bump whenever derived columns (e.g. product_id matching) change
+
+
+# ---------- Derived Columns ----------
+# Fix Shopify URLs
+def fix_url(url):
+    if isinstance(url, str) and url.startswith("/s/files"):
+        return "https://cdn.shopify.com" + url
+    return url
+
+def prepare_catalogue(df):
+    """
+    Add the columns the dashboard needs on top of the raw predictions
+    Returns: the same dataframe with derived columns
+    """
+    df["image_url"] = df["image_url"].apply(fix_url)
+
+    # Best model (closest to actual) plus median / mean / weighted ensembles
+    for col, values in aggregate_predictions(df).items():
+        df[col] = values
+
+    df["deal_label"] = ""
+
+    # Same item in different stores, unless the CSV already carries the IDs
+    if "product_id" not in df.columns:
+        df["product_id"] = match_products(df)
+    return df
+
+
+# ---------- Snapshot Files ----------
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_meta(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_meta(snapshot_dir, meta):
+    path = os.path.join(snapshot_dir, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def csv_stat(csv_path):
+    st = os.stat(csv_path)
+    return {"csv_size": st.st_size, "csv_mtime_ns": st.st_mtime_ns}
+
+def data_dir(snapshot_dir, meta):
+    # Version folder holding the columns (snapshots written before versioning keep them at the top)
+    return os.path.join(snapshot_dir, meta.get("data", ""))
+
+def remove_old_versions(snapshot_dir):
+    """
+    Delete version folders older than the one meta.json points at. Newer ones
+    may still be being written and are left alone. Folders that cannot be
+    deleted yet (memory-mapped on Windows) are kept for the next call
+    Returns: number of entries still waiting to be removed
+    """
+    meta = read_meta(snapshot_dir)
+    if meta is None or "data" not in meta:
+        return 0
+    waiting = 0
+    for name in os.listdir(snapshot_dir):
+        if name.startswith("meta.json") or name >= meta["data"]:
+            continue
+        path = os.path.join(snapshot_dir, name)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            waiting += 1
+            print(f"[Snapshot] Could not remove {path} yet, retrying later: {str(e)}")
+    return waiting
+
+def write_snapshot(df, snapshot_dir, csv_hash=None, stat=None):
+    """
+    Write every column of df as .npy files into a new version folder, then
+    point meta.json at it
+    Returns: the meta dictionary that was written
+    """
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(snapshot_dir, version)
+    os.makedirs(version_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            np.save(os.path.join(version_dir, f"{i}.values.npy"), values.to_numpy())
+            columns.append({"name": col, "kind": "numeric"})
+        else:
+            codes, uniques = pd.factorize(values.astype("object"))
+            dictionary = np.array([str(u) for u in uniques], dtype=str)
+            if len(dictionary) == 0:
+                dictionary = np.array([], dtype="<U1")
+            np.save(os.path.join(version_dir, f"{i}.codes.npy"), codes.astype(np.int32))
+            np.save(os.path.join(version_dir, f"{i}.dict.npy"), dictionary)
+            columns.append({"name": col, "kind": "string"})
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "csv_sha256": csv_hash,
+        **(stat or {}),
+        "n_rows": len(df),
+        "data": version,
+        "columns": columns
+    }
+    write_meta(snapshot_dir, meta)
+    remove_old_versions(snapshot_dir)
+    return meta
+
+def read_snapshot(snapshot_dir, meta, columns=None):
+    """
+    Load the snapshot columns (or only the named ones), numeric ones memory-mapped
+    Returns: dataframe
+    """
+    snapshot_dir = data_dir(snapshot_dir, meta)
+    data = {}
+    for i, column in enumerate(meta["columns"]):
+        if columns is not None and column["name"] not in columns:
+            continue
+        if column["kind"] == "numeric":
+            data[column["name"]] = np.load(os.path.join(snapshot_dir, f"{i}.values.npy"), mmap_mode="r")
+        else:
+            codes = np.load(os.path.join(snapshot_dir, f"{i}.codes.npy"), mmap_mode="r")
+            dictionary = np.load(os.path.join(snapshot_dir, f"{i}.dict.npy")).astype(object)
+            values = dictionary.take(codes, mode="clip") if len(dictionary) else np.empty(len(codes), dtype=object)
+            values[np.asarray(codes) < 0] = np.nan
+            data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+# ---------- Build / Load ----------
+def build_snapshot(csv_path, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Read the CSV, add derived columns and write the snapshot
+    Returns: the prepared dataframe
+    """
+    stat = csv_stat(csv_path)
+    csv_hash = file_sha256(csv_path)
+    df = prepare_catalogue(pd.read_csv(csv_path))
+    write_snapshot(df, snapshot_dir, csv_hash, stat)
+    return df
+
+def load_catalogue(csv_path, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Load the prepared catalogue from the snapshot, rebuilding it only when the CSV's hash changed
+    Returns: dataframe with derived columns
+    """
+    start = time.perf_counter()
+    meta = read_meta(snapshot_dir)
+    stat = csv_stat(csv_path)
+
+    fresh = meta is not None and meta.get("version") == SNAPSHOT_VERSION
+    if fresh and (meta["csv_size"], meta["csv_mtime_ns"]) != (stat["csv_size"], stat["csv_mtime_ns"]):
+        # Touched but maybe not changed, only the hash decides
+        fresh = meta["csv_sha256"] == file_sha256(csv_path)
+        if fresh:
+            write_meta(snapshot_dir, {**meta, **stat})
+
+    if fresh:
+        df = read_snapshot(snapshot_dir, meta)
+        remove_old_versions(snapshot_dir)
+        print(f"[Snapshot] Loaded {len(df)} rows from {snapshot_dir} in {time.perf_counter() - start:.3f}s")
+    else:
+        df = build_snapshot(csv_path, snapshot_dir)
+        print(f"[Snapshot] Rebuilt {snapshot_dir} from {csv_path} in {time.perf_counter() - start:.3f}s")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar snapshot of the predictions CSV")
+    parser.add_argument("csv_path", nargs="?", default="predicted_prices.csv")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = build_snapshot(args.csv_path, args.snapshot_dir)
+    print(f"[Snapshot] Wrote {len(df)} rows to {args.snapshot_dir} in {time.perf_counter() - start:.3f}s")
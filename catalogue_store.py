@@ -0,0 +1,532 @@
+"""
+Data access for the dashboard: one interface, two storage backends.
+
+    MemoryCatalogue  the prepared frame in memory plus the in-memory indexes
+                     (n-gram search, facet bitmaps, sort permutations, stats cube)
+    SQLiteCatalogue  an embedded SQLite file: products with indexes on store,
+                     cleaned_category, price and the sort keys, a trigram FTS5
+                     index on cleaned_name, the cheapest offer per product and
+                     the products of live scrapes
+
+Both speak in row positions. find_rows() returns the positions of a search
+in display order, and the other calls fetch only what a request shows: one
+page of rows, per-store aggregates, a bounded chart sample. With SQLite a
+request never holds more than that, whatever the catalogue size, and
+several app processes can share one file. CatalogueManager swaps in a new
+catalogue when the CSV changes.
+
+    python catalogue_store.py predicted_prices.csv    # builds catalogue.sqlite3
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from catalogue_snapshot import csv_stat, file_sha256, load_catalogue, prepare_catalogue
+from facet_index import FacetIndex
+from predictions import PREDICTION_STRATEGIES
+from product_matching import CheapestStoreIndex
+from search_index import REGEX_METACHARS, ProductSearchIndex
+from sort_index import SortIndex
+from stats_cube import StatsCube
+
+CATALOGUE_DB = "catalogue.sqlite3"
+DB_VERSION = 2  # bump with catalogue_snapshot.SNAPSHOT_VERSION
+INDEXED_COLUMNS = ["store", "cleaned_category", "cleaned_price", "cleaned_name", "predicted_price_elastic_net", "product_id"]
+
+# The scatter chart is downsampled to ~1500 points anyway, SQLite reads at most this many rows for it
+CHART_ROW_LIMIT = 50_000
+
+SCRAPED_COLUMNS = [
+    "keyword", "store", "name", "price", "product-link", "image_url", "cleaned_price", "cleaned_name",
+    "cleaned_quantity", "cleaned_unit", "cleaned_category", "weighted_predicted_value", "fetched_at"
+]
+
+
+# ---------- Shared ----------
+class Catalogue:
+    """
+    What both backends share: a per-catalogue cache of search results, so a
+    reloaded catalogue starts with an empty cache and the old one is freed with it.
+    """
+
+    def __init__(self):
+        self.result_rows = lru_cache(maxsize=256)(self._result_rows)
+
+    def _result_rows(self, query, stores, categories, sort_by, strategy):
+        """
+        find_rows for one combination of search inputs (stores / categories as sorted tuples)
+        Returns: read-only array of row positions in display order
+        """
+        rows = self.find_rows(query, stores, categories, sort_by, strategy)
+        rows.setflags(write=False)
+        return rows
+
+    def close(self):
+        pass
+
+
+# ---------- In Memory ----------
+class MemoryCatalogue(Catalogue):
+    """
+    The prepared catalogue frame and the indexes built over it at load time.
+    """
+
+    def __init__(self, df, sort_keys, value_cols):
+        super().__init__()
+        self.df = df
+        self.value_cols = list(value_cols)
+        self.prediction_values = {
+            strategy: df[col].to_numpy() for strategy, (col, _) in PREDICTION_STRATEGIES.items()
+        }
+        self.cleaned_prices = df["cleaned_price"].to_numpy()
+        self.value_arrays = {col: df[col].to_numpy() for col in self.value_cols}
+        self.search_index = ProductSearchIndex(df["cleaned_name"])
+        self.facet_index = FacetIndex(df, ["store", "cleaned_category"])
+        self.sort_index = SortIndex(df, sort_keys)
+        self.stats_cube = StatsCube(self.facet_index, df, self.value_cols)
+        self.cheapest_index = CheapestStoreIndex(df["product_id"], df["store"], self.cleaned_prices)
+
+    def __len__(self):
+        return len(self.df)
+
+    def choices(self, column):
+        return sorted(self.df[column].dropna().unique())
+
+    def find_rows(self, query, stores, categories, sort_by, strategy):
+        """
+        Row positions of a search, the best deal (largest prediction - price gap) first
+        Returns: array of row positions in display order
+        """
+        rows = self.search_index.search(query) if query.strip() else np.arange(len(self.df))
+        rows = self.facet_index.filter_rows(rows, {"store": stores, "cleaned_category": categories})
+        rows = self.sort_index.order(rows, sort_by)
+        return best_deal_first(rows, self.prediction_values[strategy][rows] - self.cleaned_prices[rows])
+
+    def rows(self, positions):
+        return self.df.iloc[positions]
+
+    def n_stores(self, positions):
+        return len(np.unique(self.facet_index.codes["store"][positions]))
+
+    def store_stats(self, query, positions, stores, categories):
+        """
+        Per store: count and mean of every value column, same as groupby("store").mean()
+        Returns: dataframe sorted by store
+        """
+        if not query.strip():
+            return self.stats_cube.store_stats(stores, categories)
+        grouped = self.df.iloc[positions].groupby("store")
+        stats = grouped[self.value_cols].mean()
+        stats.insert(0, "count", grouped.size())
+        return stats.reset_index()
+
+    def chart_rows(self, query, positions, stores, categories):
+        """
+        Value columns of the rows to plot, and fixed min-max bounds when the cube has them
+        Returns: (dataframe, bounds dict or None)
+        """
+        bounds = None if query.strip() else self.stats_cube.bounds(stores, categories)
+        return pd.DataFrame({col: values[positions] for col, values in self.value_arrays.items()}, index=positions), bounds
+
+    def cheapest_offers(self, positions):
+        # row -> cheapest offer of the row's product
+        return {row: self.cheapest_index.cheapest_for_row(row) for row in positions}
+
+    def record_scraped(self, keyword, products):
+        # Live-scraped products are only stored by the SQLite backend
+        pass
+
+
+def best_deal_first(rows, diff):
+    if len(diff) and not np.isnan(diff).all():
+        best = int(np.nanargmax(diff))
+        rows = np.r_[rows[best], rows[:best], rows[best + 1:]]
+    return rows
+
+
+# ---------- SQLite File ----------
+def build_catalogue_db(df, db_path=CATALOGUE_DB, csv_hash=None):
+    """
+    Write the prepared catalogue to a new SQLite file and swap it in atomically.
+    Scraped products of the previous file are carried over
+    Returns: db_path
+    """
+    start = time.perf_counter()
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    lock = None
+    try:
+        con.execute("PRAGMA journal_mode=OFF")
+        con.execute("PRAGMA synchronous=OFF")
+        products = df.reset_index(drop=True)
+        products.insert(0, "row", np.arange(len(products)))
+        products.to_sql("products", con, index=False, chunksize=50_000, dtype={"row": "INTEGER PRIMARY KEY"})
+        for col in INDEXED_COLUMNS:
+            con.execute(f'CREATE INDEX "idx_products_{col}" ON products ("{col}")')
+        con.execute(
+            "CREATE VIRTUAL TABLE products_fts USING fts5("
+            "cleaned_name, content='products', content_rowid='row', tokenize='trigram')"
+        )
+        con.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+        cheapest = CheapestStoreIndex(products["product_id"], products["store"], products["cleaned_price"])
+        con.execute("CREATE TABLE cheapest (product_id TEXT PRIMARY KEY, row INTEGER, store TEXT, price REAL, n_stores INTEGER)")
+        con.executemany(
+            "INSERT INTO cheapest VALUES (?, ?, ?, ?, ?)",
+            [(pid, o["row"], o["store"], o["price"], o["n_stores"]) for pid, o in cheapest.offers.items()]
+        )
+
+        columns = ", ".join(f'"{col}"' for col in SCRAPED_COLUMNS)
+        con.execute(f"CREATE TABLE scraped_products ({columns})")
+        con.execute("CREATE INDEX idx_scraped_keyword ON scraped_products (keyword, store)")
+        if os.path.exists(db_path):
+            # The old file's write lock is held from the copy to the swap, so no scrape recorded in
+            # between is lost. Writers waiting on it then fail as "readonly" and retry on the new file
+            lock = sqlite3.connect(db_path, timeout=30)
+            lock.execute("BEGIN IMMEDIATE")
+            con.execute("ATTACH DATABASE ? AS old", (db_path,))
+            has_scraped = con.execute(
+                "SELECT 1 FROM old.sqlite_master WHERE type='table' AND name='scraped_products'"
+            ).fetchone()
+            if has_scraped:
+                con.execute(f"INSERT INTO scraped_products SELECT {columns} FROM old.scraped_products")
+            con.commit()
+            con.execute("DETACH DATABASE old")
+
+        meta = {"version": DB_VERSION, "rows": len(products), "csv_sha256": csv_hash, "built_at": time.time()}
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        con.commit()
+        con.close()
+        os.replace(tmp_path, db_path)
+    finally:
+        con.close()
+        if lock is not None:
+            lock.close()
+    print(f"[Store] Built {db_path} ({len(df)} rows) in {time.perf_counter() - start:.2f}s")
+    return db_path
+
+def read_db_meta(db_path):
+    try:
+        con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return {k: json.loads(v) for k, v in con.execute("SELECT key, value FROM meta")}
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return None
+
+def _sql_value(value):
+    # NaN from pandas becomes NULL
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def _regexp(pattern, value):
+    return value is not None and re.search(pattern, value, re.IGNORECASE) is not None
+
+
+_pin_ids = itertools.count(1)
+
+def pin_file(path):
+    """
+    Hard link to the file currently at path. The link keeps reaching the same
+    data after path is replaced by a rebuild. Every call gets its own link
+    (pid and counter in the name), so closing one catalogue never removes the
+    link another catalogue, or another process, still reads through
+    Returns: path of the link
+    """
+    pinned = f"{path}.{os.getpid()}.{next(_pin_ids)}.pin"
+    if os.path.exists(pinned):
+        # Left behind by an earlier process with the same pid
+        os.remove(pinned)
+    os.link(path, pinned)
+    return pinned
+
+
+class SQLiteCatalogue(Catalogue):
+    """
+    Catalogue queries against the SQLite file. Every thread reads through its
+    own read-only connection to the version of the file that was current when
+    the catalogue was opened; scraped products go to the current file.
+    """
+
+    def __init__(self, db_path, sort_keys, value_cols):
+        super().__init__()
+        self.db_path = db_path
+        self.read_path = pin_file(db_path)
+        self.sort_keys = sort_keys
+        self.value_cols = list(value_cols)
+        self.local = threading.local()
+        self.connections = []  # every thread's read connection, closed with the catalogue
+        self.connections_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.n_rows = self._read("SELECT COUNT(*) FROM products")[0][0]
+
+    def _connection(self):
+        con = getattr(self.local, "con", None)
+        if con is None:
+            con = sqlite3.connect(f"file:{self.read_path}?mode=ro", uri=True, check_same_thread=False)
+            con.create_function("regexp", 2, _regexp, deterministic=True)
+            self.local.con = con
+            with self.connections_lock:
+                self.connections.append(con)
+        return con
+
+    def _read(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    def _frame(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connection(), params=params)
+
+    def __len__(self):
+        return self.n_rows
+
+    def choices(self, column):
+        return [value for (value,) in self._read(f'SELECT DISTINCT "{column}" FROM products WHERE "{column}" IS NOT NULL ORDER BY 1')]
+
+    def _where(self, query, stores, categories):
+        """
+        WHERE clause of a search, same matches as ProductSearchIndex.search
+        Returns: (sql, params)
+        """
+        clauses, params = [], []
+        if query.strip():
+            if REGEX_METACHARS.intersection(query):
+                clauses.append("cleaned_name REGEXP ?")
+                params.append(query)
+            elif len(query) >= 3:
+                clauses.append("row IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)")
+                params.append('"' + query.replace('"', '""') + '"')
+            else:
+                # Trigrams cannot index one or two characters
+                clauses.append("instr(lower(cleaned_name), ?) > 0")
+                params.append(query.lower())
+        for col, selected in [("store", stores), ("cleaned_category", categories)]:
+            if selected:
+                clauses.append(f'"{col}" IN ({", ".join("?" * len(selected))})')
+                params.extend(selected)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def find_rows(self, query, stores, categories, sort_by, strategy):
+        """
+        Row positions of a search, the best deal (largest prediction - price gap) first
+        Returns: array of row positions in display order
+        """
+        where, params = self._where(query, stores, categories)
+        prediction_col, _ = PREDICTION_STRATEGIES[strategy]
+        order = "row"
+        if sort_by in self.sort_keys:
+            col, ascending = self.sort_keys[sort_by]
+            order = f'"{col}" {"ASC" if ascending else "DESC"} NULLS LAST, row'
+        result = self._read(f'SELECT row, "{prediction_col}" - cleaned_price FROM products{where} ORDER BY {order}', params)
+        rows = np.fromiter((r for r, _ in result), dtype=np.int64, count=len(result))
+        diff = np.fromiter((np.nan if d is None else d for _, d in result), dtype=np.float64, count=len(result))
+        return best_deal_first(rows, diff)
+
+    def _select_rows(self, columns, positions):
+        # Row lists of any length are passed as one JSON parameter
+        return self._frame(
+            f"SELECT {columns} FROM products WHERE row IN (SELECT value FROM json_each(?))",
+            (json.dumps([int(p) for p in positions]),)
+        )
+
+    def rows(self, positions):
+        frame = self._select_rows("*", positions).set_index("row")
+        return frame.reindex(np.asarray(positions))
+
+    def n_stores(self, positions):
+        return self._read(
+            "SELECT COUNT(DISTINCT store) FROM products WHERE row IN (SELECT value FROM json_each(?))",
+            (json.dumps([int(p) for p in positions]),)
+        )[0][0]
+
+    def store_stats(self, query, positions, stores, categories):
+        """
+        Per store: count and mean of every value column, aggregated in SQL
+        Returns: dataframe sorted by store
+        """
+        where, params = self._where(query, stores, categories)
+        means = ", ".join(f'AVG("{col}") AS "{col}"' for col in self.value_cols)
+        clause = where + (" AND" if where else " WHERE") + " store IS NOT NULL"
+        return self._frame(f"SELECT store, COUNT(*) AS count, {means} FROM products{clause} GROUP BY store ORDER BY store", params)
+
+    def chart_rows(self, query, positions, stores, categories):
+        """
+        Value columns of at most CHART_ROW_LIMIT of the rows (evenly spread), and
+        min-max bounds over all of them
+        Returns: (dataframe, bounds dict)
+        """
+        where, params = self._where(query, stores, categories)
+        extremes = ", ".join(f'MIN("{col}"), MAX("{col}")' for col in self.value_cols)
+        values = self._read(f"SELECT {extremes} FROM products{where}", params)[0]
+        bounds = {
+            col: (np.nan, np.nan) if values[2 * i] is None else (values[2 * i], values[2 * i + 1])
+            for i, col in enumerate(self.value_cols)
+        }
+        if len(positions) > CHART_ROW_LIMIT:
+            positions = positions[np.linspace(0, len(positions) - 1, CHART_ROW_LIMIT).astype(np.int64)]
+        columns = ", ".join(["row"] + [f'"{col}"' for col in self.value_cols])
+        return self._select_rows(columns, positions).set_index("row").reindex(positions), bounds
+
+    def cheapest_offers(self, positions):
+        result = self._read(
+            "SELECT p.row, c.row, c.store, c.price, c.n_stores FROM products p JOIN cheapest c USING (product_id) "
+            "WHERE p.row IN (SELECT value FROM json_each(?))",
+            (json.dumps([int(p) for p in positions]),)
+        )
+        offers = {row: {"row": best, "store": store, "price": price, "n_stores": n} for row, best, store, price, n in result}
+        return {row: offers.get(row) for row in positions}
+
+    def close(self):
+        # Called after the reload grace period, when no request uses this version anymore
+        with self.connections_lock:
+            connections, self.connections = self.connections, []
+        for con in connections:
+            con.close()
+        if os.path.exists(self.read_path):
+            os.remove(self.read_path)
+
+    def record_scraped(self, keyword, products):
+        """
+        Append cleaned live-scraped products to scraped_products
+        """
+        if not products:
+            return
+        now = time.time()
+        records = [
+            tuple(keyword if col == "keyword" else now if col == "fetched_at" else _sql_value(p.get(col)) for col in SCRAPED_COLUMNS)
+            for p in products
+        ]
+        columns = ", ".join(f'"{col}"' for col in SCRAPED_COLUMNS)
+        with self.write_lock:
+            while True:
+                con = sqlite3.connect(self.db_path, timeout=30)
+                try:
+                    con.executemany(
+                        f"INSERT INTO scraped_products ({columns}) VALUES ({', '.join('?' * len(SCRAPED_COLUMNS))})",
+                        records
+                    )
+                    con.commit()
+                    return
+                except sqlite3.OperationalError as e:
+                    # build_catalogue_db swapped the file in while this write waited for its lock
+                    if "readonly" not in str(e):
+                        raise
+                finally:
+                    con.close()
+
+
+# ---------- Opening ----------
+def open_catalogue(csv_path, sort_keys, value_cols, backend="memory", db_path=CATALOGUE_DB):
+    """
+    Catalogue of csv_path on the chosen backend. The SQLite file is rebuilt
+    only when the CSV's hash changed
+    Returns: MemoryCatalogue or SQLiteCatalogue
+    """
+    if backend == "memory":
+        return MemoryCatalogue(load_catalogue(csv_path), sort_keys, value_cols)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown catalogue backend {backend!r}, expected 'memory' or 'sqlite'")
+
+    csv_hash = file_sha256(csv_path)
+    meta = read_db_meta(db_path)
+    if meta is None or meta.get("version") != DB_VERSION or meta.get("csv_sha256") != csv_hash:
+        build_catalogue_db(prepare_catalogue(pd.read_csv(csv_path)), db_path, csv_hash)
+    return SQLiteCatalogue(db_path, sort_keys, value_cols)
+
+
+# ---------- Hot Reload ----------
+class CatalogueManager:
+    """
+    Holds the active catalogue and replaces it when the CSV changes, without a restart.
+
+    A watcher thread checks the CSV's size and mtime every poll_seconds. When
+    its hash changed, the new catalogue (snapshot or SQLite file, indexes,
+    caches) is built on that thread while the old one keeps serving, then
+    swapped in with one assignment. Requests take current() once and use it
+    to the end, so a request in flight finishes on the version it started on.
+    The old version is closed grace_seconds after the swap.
+    """
+
+    def __init__(self, csv_path, sort_keys, value_cols, backend="memory", db_path=CATALOGUE_DB,
+                 poll_seconds=5.0, grace_seconds=60.0):
+        self.csv_path = csv_path
+        self.sort_keys = sort_keys
+        self.value_cols = value_cols
+        self.backend = backend
+        self.db_path = db_path
+        self.poll_seconds = poll_seconds
+        self.grace_seconds = grace_seconds
+        self.reload_lock = threading.Lock()
+        self.active = None
+        self.info = {"version": 0}
+        self.reload()
+        threading.Thread(target=self._watch, name="catalogue-watch", daemon=True).start()
+
+    def current(self):
+        return self.active
+
+    def reload(self, force=False):
+        """
+        Load the CSV again if its hash differs from the active version (or force)
+        Returns: True when a new version was swapped in
+        """
+        with self.reload_lock:
+            stat = csv_stat(self.csv_path)
+            if not force and stat == self.info.get("stat"):
+                return False
+            csv_hash = file_sha256(self.csv_path)
+            if not force and csv_hash == self.info.get("csv_sha256"):
+                self.info = {**self.info, "stat": stat}
+                return False
+
+            start = time.perf_counter()
+            catalogue = open_catalogue(self.csv_path, self.sort_keys, self.value_cols, self.backend, self.db_path)
+            old = self.active
+            self.info = {
+                "version": self.info["version"] + 1,
+                "csv_sha256": csv_hash,
+                "stat": stat,
+                "rows": len(catalogue),
+                "backend": self.backend,
+                "load_seconds": round(time.perf_counter() - start, 3),
+                "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self.active = catalogue
+        print(f"[Catalogue] Version {self.info['version']}: {self.info['rows']} rows "
+              f"loaded in {self.info['load_seconds']:.2f}s")
+        if old is not None:
+            timer = threading.Timer(self.grace_seconds, old.close)
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.reload()
+            except Exception as e:
+                # A half-written or broken CSV keeps the current version serving
+                print(f"[Catalogue] Reload failed, keeping version {self.info['version']}: {str(e)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the SQLite catalogue from the predictions CSV")
+    parser.add_argument("csv_path", nargs="?", default="predicted_prices.csv")
+    parser.add_argument("--db", default=CATALOGUE_DB)
+    args = parser.parse_args()
+
+    build_catalogue_db(prepare_catalogue(pd.read_csv(args.csv_path)), args.db, file_sha256(args.csv_path))
@@ -0,0 +1,173 @@
+"""
+Store categories to the common categories shared across stores.
+
+Category keys follow 3)creating_canonicalized_categories.ipynb: the store's
+category lowercased, runs of the store's separator replaced by "_", plus a
+"---<store>" suffix, e.g. "Baby Food" at Al-Fateh -> "baby_food---fateh".
+
+category_rules.json holds the key -> common category mapping plus keywords
+per common category: "keywords" name what a product is ("chips", "milk
+powder", brands such as "lactogen"), "weak_keywords" only describe it
+(flavours and ingredients: "cheese", "masala", "butter"). CategoryResolver
+compiles all keywords into one trie-shaped regex. When a text holds several,
+the most specific one decides: a product keyword beats a flavour word, then
+the longer keyword wins, then the later one ("cheese" in "popcorn cheddar
+cheese" is a flavour, "lactogen milk powder" is Baby Food, not Dairy).
+
+Each row is resolved in this order: its key through the mapping, then
+keywords in the store's category name (so new store categories still
+resolve), then keywords in the product name (for live scraper results,
+which have no category). tests/test_categories.py checks the name fallback
+against the labelled catalogue.
+"""
+import json
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# Store name -> (key suffix, separator pattern in its category names)
+STORE_CATEGORY_KEYS = {
+    "al-fateh": ("fateh", r" +"),
+    "Imtiaz": ("imtiaz", r" +"),
+    "Jalal Sons": ("jalalsons", r" +"),
+    "Metro": ("metro", r"-+"),
+}
+
+CATEGORY_RULES = "category_rules.json"
+
+
+# ---------- Category Keys ----------
+def category_keys(store, categories):
+    """
+    Slug keys of one store's category column
+    Returns: Series of keys like "baby_food---fateh" (NaN stays NaN)
+    """
+    suffix, separator = STORE_CATEGORY_KEYS[store]
+    categories = pd.Series(categories, dtype=object)
+    return categories.str.lower().str.replace(separator, "_", regex=True) + f"---{suffix}"
+
+def common_categories(keys):
+    """
+    Returns: Series of common categories, NaN for keys the mapping does not know
+    """
+    return pd.Series(keys, dtype=object).map(default_resolver().mapping)
+
+
+# ---------- Keyword Matcher ----------
+def trie_pattern(words):
+    """
+    One regex alternation for many words, shaped like a trie so shared
+    prefixes are tried once ("tea", "teas", "tea whitener" -> "tea(?: whitener|s)?")
+    Returns: pattern string (no anchors or boundaries)
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if "" not in node:
+            return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if len(branches) == 1 and len(branches[0]) == 1:
+            return branches[0] + "?"
+        return "(?:" + "|".join(branches) + ")?"
+
+    return build(trie)
+
+def normalize_text(texts):
+    # Lowercase, any run of non-alphanumerics becomes one space ("Butter_&_Margarine" -> "butter margarine")
+    return texts.str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+
+
+# ---------- Category Resolver ----------
+class CategoryResolver:
+    def __init__(self, rules_path=CATEGORY_RULES):
+        with open(rules_path) as f:
+            rules = json.load(f)
+        self.mapping = rules["mapping"]
+        self.keywords = {}
+        self.strength = {}
+        for strength, section in enumerate(["weak_keywords", "keywords"]):
+            for category, keywords in rules.get(section, {}).items():
+                for keyword in keywords:
+                    self.keywords[keyword] = category
+                    self.strength[keyword] = strength
+        self.pattern = re.compile(r"\b(" + trie_pattern(self.keywords) + r")\b")
+
+    def best_keyword(self, found):
+        # Product keyword over flavour word, then the longest, then the last one
+        if not found:
+            return None
+        return max(enumerate(found), key=lambda item: (self.strength[item[1]], len(item[1]), item[0]))[1]
+
+    def match_keywords(self, texts):
+        """
+        Category of the most specific keyword in each text, once per distinct text
+        Returns: Series of common categories, NaN where no keyword matched
+        """
+        texts = pd.Series(texts, dtype=object)
+        codes, uniques = pd.factorize(texts)
+        found = normalize_text(pd.Series(uniques, dtype=object)).str.findall(self.pattern)
+        categories = found.map(self.best_keyword).map(self.keywords).to_numpy(dtype=object)
+        categories = pd.Series(list(categories) + [float("nan")], dtype=object)
+        return pd.Series(categories.to_numpy()[codes], index=texts.index, dtype=object)
+
+    def resolve(self, stores, categories=None, names=None):
+        """
+        Common category of every row
+        Returns: DataFrame with cleaned_category and category_source
+                 ("mapping", "category_keywords", "name_keywords" or NaN if unresolved)
+        """
+        stores = pd.Series(stores, dtype=object)
+        cleaned = pd.Series(float("nan"), index=stores.index, dtype=object)
+        source = pd.Series(float("nan"), index=stores.index, dtype=object)
+
+        steps = []
+        if categories is not None:
+            categories = pd.Series(categories, index=stores.index, dtype=object)
+            keys = pd.Series(float("nan"), index=stores.index, dtype=object)
+            for store in stores.dropna().unique():
+                if store in STORE_CATEGORY_KEYS:
+                    rows = stores == store
+                    keys[rows] = category_keys(store, categories[rows])
+            steps.append(("mapping", lambda: keys.map(self.mapping)))
+            steps.append(("category_keywords", lambda: self.match_keywords(categories)))
+        if names is not None:
+            names = pd.Series(names, index=stores.index, dtype=object)
+            steps.append(("name_keywords", lambda: self.match_keywords(names)))
+
+        for step, resolve_step in steps:
+            missing = cleaned.isna()
+            if not missing.any():
+                break
+            found = resolve_step()[missing].dropna()
+            cleaned[found.index] = found
+            source[found.index] = step
+        return pd.DataFrame({"cleaned_category": cleaned, "category_source": source})
+
+    def coverage(self, resolved, categories=None):
+        """
+        Rows per resolution source (and the most common unresolved categories)
+        Returns: dict
+        """
+        counts = resolved["category_source"].fillna("unresolved").value_counts()
+        stats = {
+            "rows": int(len(resolved)),
+            "by_source": counts.astype(int).to_dict(),
+            "resolved_share": round(1 - counts.get("unresolved", 0) / max(len(resolved), 1), 4),
+        }
+        if categories is not None:
+            unresolved = pd.Series(categories, index=resolved.index)[resolved["cleaned_category"].isna()]
+            stats["top_unresolved"] = unresolved.value_counts().head(10).astype(int).to_dict()
+        return stats
+
+
+@lru_cache(maxsize=None)
+def default_resolver():
+    return CategoryResolver()
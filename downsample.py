@@ -0,0 +1,45 @@
+import numpy as np
+
+MAX_GRID_SIDE = 1 << 14
+
+
+# ---------- Scatter Downsampling ----------
+def grid_downsample(x, y, budget, outlier_share=0.2):
+    """
+    Pick at most budget points of a scatter for the browser.
+
+    The largest |y - x| residuals (the points worth spotting as deals or
+    mispricings) are always kept. The rest of the budget goes to one point
+    per occupied cell of a grid over the plot, sparse cells first, so the
+    shape of the cloud survives while dense clusters are thinned out.
+    Returns: sorted array of kept positions into x / y
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(valid) <= budget:
+        return valid
+
+    xv, yv = x[valid], y[valid]
+
+    # Outliers: largest distance from the y = x diagonal
+    n_outliers = min(int(budget * outlier_share), len(valid))
+    residual = np.abs(yv - xv)
+    outliers = np.argpartition(residual, -n_outliers)[-n_outliers:] if n_outliers else np.array([], dtype=np.int64)
+
+    # Grid over the remaining points, one representative per cell. Skewed
+    # prices crowd into a few cells, so refine the grid until the budget can be filled
+    remaining = budget - n_outliers
+    side = max(1, int(np.ceil(np.sqrt(remaining))))
+    span_x = np.ptp(xv) or 1.0
+    span_y = np.ptp(yv) or 1.0
+    while True:
+        gx = np.minimum(((xv - xv.min()) / span_x * side).astype(np.int64), side - 1)
+        gy = np.minimum(((yv - yv.min()) / span_y * side).astype(np.int64), side - 1)
+        _, first, counts = np.unique(gx * side + gy, return_index=True, return_counts=True)
+        if len(first) >= remaining or side >= MAX_GRID_SIDE:
+            break
+        side *= 2
+    representatives = first[np.argsort(counts, kind="stable")[:remaining]]
+
+    return valid[np.union1d(outliers, representatives)]
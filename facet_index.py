@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------- Facet Index ----------
+class FacetIndex:
+    """
+    Categorical codes and packed per-value bitmaps for the dashboard filters.
+
+    Each facet column (e.g. store, cleaned_category) is factorized once at
+    load time and every distinct value gets a bitmap of the rows holding it.
+    A filter is answered with bitwise OR inside a facet and bitwise AND
+    across facets, without touching the frame.
+    """
+
+    def __init__(self, df, columns):
+        self.n_rows = len(df)
+        self.codes = {}
+        self.values = {}
+        self.positions = {}
+        self.bitmaps = {}
+        for col in columns:
+            codes, values = pd.factorize(df[col], sort=True)
+            self.codes[col] = codes
+            self.values[col] = list(values)
+            self.positions[col] = {v: i for i, v in enumerate(values)}
+            self.bitmaps[col] = self.build_bitmaps(codes, len(values))
+
+    def build_bitmaps(self, codes, n_values):
+        """
+        Set each row's bit in the bitmap of its value only, so the temporary
+        memory is proportional to the rows, not values x rows
+        Returns: (n_values, n_rows / 8) packed uint8 bitmaps, same layout as np.packbits
+        """
+        bitmaps = np.zeros((n_values, (self.n_rows + 7) // 8), dtype=np.uint8)
+        rows = np.flatnonzero(codes >= 0)
+        bits = (0x80 >> (rows & 7)).astype(np.uint8)
+        np.bitwise_or.at(bitmaps, (codes[rows], rows >> 3), bits)
+        return bitmaps
+
+    def value_bitmap(self, col, selected):
+        """
+        OR together the bitmaps of the selected values of one facet
+        Returns: packed uint8 bitmap
+        """
+        positions = [self.positions[col][v] for v in selected if v in self.positions[col]]
+        if not positions:
+            return np.zeros(self.bitmaps[col].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[col][positions], axis=0)
+
+    def mask(self, selections):
+        """
+        Combine facet selections, e.g. {"store": [...], "cleaned_category": [...]}
+        Empty selections do not filter
+        Returns: boolean row mask, or None when nothing is selected
+        """
+        combined = None
+        for col, selected in selections.items():
+            if not selected:
+                continue
+            bitmap = self.value_bitmap(col, selected)
+            combined = bitmap if combined is None else combined & bitmap
+        if combined is None:
+            return None
+        return np.unpackbits(combined, count=self.n_rows).astype(bool)
+
+    def filter_rows(self, rows, selections):
+        """
+        Keep only the row positions that pass the facet selections
+        Returns: array of row positions, order preserved
+        """
+        mask = self.mask(selections)
+        if mask is None:
+            return rows
+        return rows[mask[rows]]
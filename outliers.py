@@ -0,0 +1,104 @@
+"""
+Grouped outlier filtering.
+
+Replaces the loop in 5)modell.ipynb that computed quantiles per category
+and called df.drop() once per category (a full copy each time). Bounds for
+every group come from one groupby pass, and the rows are filtered with a
+single boolean mask. Bounds and mask are separate steps, so a streaming
+caller can compute bounds from one narrow column and apply them chunk by
+chunk.
+
+Rules (k is the rule's threshold):
+    iqr       outside [Q1 - k*IQR, Q3 + k*IQR], k = 1.5 (the notebook's rule)
+    mad       |x - median| beyond k * MAD, k = 3
+    robust_z  |0.6745 * (x - median) / MAD| beyond k, k = 3.5
+
+Like the notebook, values on a bound count as outliers. Groups whose MAD is
+0 are left alone by the MAD based rules.
+"""
+import numpy as np
+import pandas as pd
+
+OUTLIER_RULES = {"iqr": 1.5, "mad": 3.0, "robust_z": 3.5}
+
+
+# ---------- Bounds ----------
+def outlier_bounds(values, groups, rule="iqr", k=None):
+    """
+    Lower / upper bound of every group under one rule
+    Returns: DataFrame indexed by group with lower, upper and n
+    """
+    if rule not in OUTLIER_RULES:
+        raise ValueError(f"Unknown outlier rule {rule!r}, expected one of {list(OUTLIER_RULES)}")
+    k = OUTLIER_RULES[rule] if k is None else k
+    frame = pd.DataFrame({"group": np.asarray(groups), "value": np.asarray(values, dtype=float)})
+    grouped = frame.groupby("group", sort=True)["value"]
+
+    if rule == "iqr":
+        quartiles = grouped.quantile([0.25, 0.75]).unstack()
+        spread = quartiles[0.75] - quartiles[0.25]
+        lower = quartiles[0.25] - k * spread
+        upper = quartiles[0.75] + k * spread
+    else:
+        median = grouped.median()
+        deviation = (frame["value"] - frame["group"].map(median)).abs()
+        mad = deviation.groupby(frame["group"], sort=True).median()
+        width = k * mad if rule == "mad" else k * mad / 0.6745
+        width = width.where(mad > 0, np.inf)
+        lower = median - width
+        upper = median + width
+
+    return pd.DataFrame({"lower": lower, "upper": upper, "n": grouped.size()})
+
+def outlier_mask(values, groups, bounds):
+    """
+    True where a value is on or outside its group's bounds. Values of groups
+    without bounds and NaN values are never outliers
+    Returns: boolean numpy array
+    """
+    groups = pd.Series(np.asarray(groups))
+    values = np.asarray(values, dtype=float)
+    lower = groups.map(bounds["lower"]).to_numpy(dtype=float)
+    upper = groups.map(bounds["upper"]).to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        return (values <= lower) | (values >= upper)
+
+
+# ---------- Filtering ----------
+def outlier_report(values, groups, bounds, mask):
+    """
+    Per group: the bounds used and how many rows fell below / above them
+    Returns: DataFrame indexed by group, only groups that lost rows
+    """
+    values = np.asarray(values, dtype=float)
+    lower = pd.Series(np.asarray(groups)).map(bounds["lower"]).to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        low = mask & (values <= lower)
+    frame = pd.DataFrame({"group": np.asarray(groups), "low": low, "high": mask & ~low})
+    counts = frame.groupby("group", sort=True)[["low", "high"]].sum()
+    report = bounds.join(counts, how="inner").rename(columns={"low": "removed_low", "high": "removed_high"})
+    report["removed"] = report["removed_low"] + report["removed_high"]
+    return report[report["removed"] > 0]
+
+def remove_outliers(df, value_col="price_per_unit", group_col="category", rule="iqr", k=None, log=True):
+    """
+    Drop the rows of df that are outliers within their group, in one pass
+    Returns: (filtered dataframe, report of removed rows per group)
+    """
+    values = df[value_col].to_numpy(dtype=float)
+    groups = df[group_col].to_numpy()
+    bounds = outlier_bounds(values, groups, rule, k)
+    mask = outlier_mask(values, groups, bounds)
+    report = outlier_report(values, groups, bounds, mask)
+    if log:
+        log_report(report, rule)
+    return df[~mask], report
+
+def log_report(report, rule):
+    # One line per group that lost rows: how many, on which side, and the bound
+    for group, row in report.iterrows():
+        print(
+            f"[Outliers] {group}: removed {int(row['removed'])} of {int(row['n'])} by {rule} "
+            f"({int(row['removed_low'])} <= {row['lower']:.4g}, {int(row['removed_high'])} >= {row['upper']:.4g})"
+        )
+    print(f"[Outliers] {int(report['removed'].sum())} rows removed by {rule} in {len(report)} groups")
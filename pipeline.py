@@ -0,0 +1,325 @@
+"""
+Chunked pipeline from the raw store CSVs to predicted_prices.csv.
+
+Runs the notebooks' stages end to end without holding the catalogue in
+memory:
+    canonicalize  store CSVs -> common categories shared by all stores (3)
+    features      quantity / unit / cleaned name / numeric price (4)
+    outliers      per-category outlier filter on price per unit (5), IQR by default
+    predict       per-category models (5), one category in memory at a time
+
+The raw CSVs are read in chunks of --chunk-rows. Every stage writes its
+output as typed columnar parts (the .npy format of catalogue_snapshot.py)
+under .pipeline/<stage>/ plus a manifest.json written last. The manifest
+records a fingerprint of the stage's inputs: input file hashes, the
+upstream stage's fingerprint, and the stage code. A stage whose
+fingerprint has not changed is skipped.
+
+    python pipeline.py
+    python pipeline.py --force predict
+    python pipeline.py --outlier-rule robust_z
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from catalogue_snapshot import csv_stat, file_sha256, read_meta, read_snapshot, write_snapshot
+from categories import category_keys, default_resolver
+from outliers import OUTLIER_RULES, log_report, outlier_bounds, outlier_mask, outlier_report
+from price_models import predict_category
+from prices import parse_prices, price_report
+from units import extract_units, standardize_units
+
+PIPELINE_DIR = ".pipeline"
+CHUNK_ROWS = 50_000
+
+STORE_CSVS = {
+    "al-fateh": "al-fateh-products.csv",
+    "Imtiaz": "Imtiaz-products.csv",
+    "Jalal Sons": "jalal-sons-products.csv",
+    "Metro": "Metro-products.csv",
+}
+
+CANONICAL_COLUMNS = ["store", "category", "name", "price", "product-link", "image_url", "common_category"]
+FEATURE_COLUMNS = [
+    "store", "category", "name", "product-link", "image_url", "cleaned_category",
+    "cleaned_name", "cleaned_quantity", "cleaned_unit", "cleaned_price"
+]
+
+
+# ---------- Stage Parts ----------
+class StageOutput:
+    """
+    Columnar parts of one stage run; the manifest is written by commit(), so an
+    interrupted run never looks complete.
+    """
+
+    def __init__(self, stage_dir):
+        self.stage_dir = stage_dir
+        if os.path.exists(stage_dir):
+            shutil.rmtree(stage_dir)
+        os.makedirs(stage_dir)
+        self.parts = []
+
+    def write(self, df, partition=None):
+        if df.empty:
+            return
+        name = f"part-{len(self.parts):05d}"
+        write_snapshot(df.reset_index(drop=True), os.path.join(self.stage_dir, name))
+        self.parts.append({"name": name, "rows": len(df), "partition": partition})
+
+    def commit(self, fingerprint, seconds, **stats):
+        manifest = {
+            "fingerprint": fingerprint,
+            "seconds": round(seconds, 3),
+            "rows": sum(part["rows"] for part in self.parts),
+            "parts": self.parts,
+            **stats
+        }
+        path = os.path.join(self.stage_dir, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        return manifest
+
+def read_manifest(stage_dir):
+    try:
+        with open(os.path.join(stage_dir, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def read_parts(stage_dir, columns=None, partition=None):
+    """
+    Yields: each part of a finished stage as a dataframe (numeric columns memory-mapped)
+    """
+    for part in read_manifest(stage_dir)["parts"]:
+        if partition is not None and part["partition"] != partition:
+            continue
+        part_dir = os.path.join(stage_dir, part["name"])
+        yield read_snapshot(part_dir, read_meta(part_dir), columns)
+
+
+# ---------- Fingerprints ----------
+def file_fingerprint(path, cache):
+    # Re-hash a file only when its size or mtime changed since the last run
+    stat = csv_stat(path)
+    entry = cache.get(path)
+    if entry is None or {k: entry[k] for k in stat} != stat:
+        entry = {**stat, "sha256": file_sha256(path)}
+        cache[path] = entry
+    return entry["sha256"]
+
+def stage_fingerprint(stage, upstream, file_cache):
+    parts = {
+        "stage": stage["name"],
+        "code": inspect.getsource(stage["run"]),
+        "code_files": {path: file_fingerprint(path, file_cache) for path in stage.get("code", [])},
+        "inputs": {path: file_fingerprint(path, file_cache) for path in stage.get("inputs", [])},
+        "upstream": upstream["fingerprint"] if upstream else None,
+        "params": stage.get("params", {}),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+# ---------- Stages ----------
+def run_canonicalize(out, upstream_dir, chunk_rows):
+    resolver = default_resolver()
+
+    def resolved_chunks(path, store, usecols=None):
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+            resolved = resolver.resolve(pd.Series(store, index=chunk.index), chunk["category"], chunk["name"])
+            yield chunk, resolved
+
+    # Pass 1: category and name only, to find the common categories every store has
+    present = []
+    sources = pd.Series(dtype=int)
+    for store, path in STORE_CSVS.items():
+        found = set()
+        for _, resolved in resolved_chunks(path, store, usecols=["category", "name"]):
+            found.update(resolved["cleaned_category"].dropna().unique())
+            sources = sources.add(resolved["category_source"].fillna("unresolved").value_counts(), fill_value=0)
+        present.append(found)
+    shared = set.intersection(*present)
+    sources = sources.astype(int).to_dict()
+    print(f"[Pipeline] Category coverage by source: {sources}")
+    print(f"[Pipeline] {len(shared)} categories shared by all stores: {sorted(shared)}")
+
+    # Pass 2: stream the rows of those categories
+    dropped = 0
+    for store, path in STORE_CSVS.items():
+        for chunk, resolved in resolved_chunks(path, store):
+            chunk["category"] = category_keys(store, chunk["category"])
+            chunk["common_category"] = resolved["cleaned_category"]
+            keep = chunk["common_category"].isin(shared)
+            dropped += int((~keep).sum())
+            out.write(chunk.loc[keep, CANONICAL_COLUMNS])
+    return {"dropped_rows": dropped, "shared_categories": sorted(shared), "category_sources": sources}
+
+def run_features(out, upstream_dir, chunk_rows):
+    no_unit = 0
+    price_reasons = pd.Series(dtype=int)
+    for chunk in read_parts(upstream_dir):
+        units = extract_units(chunk["name"])
+
+        # Loose dry fruits at Al-Fateh carry no quantity in the name, they are sold per kg
+        loose = (
+            (chunk["store"] == "al-fateh")
+            & (chunk["category"] == "dry_fruits_&_dates---fateh")
+            & units["standardized_unit"].isna()
+        )
+        units.loc[loose, "standardized_unit"] = "kg"
+        units.loc[loose, "quantity"] = 1.0
+
+        chunk["cleaned_name"] = units["cleaned_name"]
+        chunk["cleaned_quantity"], chunk["cleaned_unit"] = standardize_units(units["quantity"], units["standardized_unit"])
+        parsed = parse_prices(chunk["price"])
+        chunk["cleaned_price"] = parsed["cleaned_price"]
+        price_reasons = price_reasons.add(price_report(parsed), fill_value=0)
+
+        has_unit = chunk["cleaned_unit"].notna()
+        no_unit += int((~has_unit).sum())
+        keep = has_unit & chunk["cleaned_price"].notna()
+        out.write(chunk.loc[keep].rename(columns={"common_category": "cleaned_category"})[FEATURE_COLUMNS])
+    print(f"[Pipeline] Prices: {price_reasons.astype(int).to_dict()}, rows without unit: {no_unit}")
+    return {"rows_without_unit": no_unit, "price_reasons": price_reasons.astype(int).to_dict()}
+
+def run_outliers(out, upstream_dir, chunk_rows, rule="iqr"):
+    # Pass 1: per-category bounds of price per unit, from three columns only
+    columns = ["category", "cleaned_price", "cleaned_quantity"]
+    frames = [
+        pd.DataFrame({
+            "category": part["category"].astype("category"),
+            "price_per_unit": part["cleaned_price"] / part["cleaned_quantity"]
+        })
+        for part in read_parts(upstream_dir, columns)
+    ]
+    ppu = pd.concat(frames, ignore_index=True)
+    bounds = outlier_bounds(ppu["price_per_unit"], ppu["category"].astype(str), rule)
+    del frames, ppu
+
+    # Pass 2: one mask per part, rows written partitioned by cleaned_category for training
+    removed = pd.DataFrame(columns=["removed_low", "removed_high"], dtype=int)
+    for chunk in read_parts(upstream_dir):
+        chunk["price_per_unit"] = chunk["cleaned_price"] / chunk["cleaned_quantity"]
+        outlier = outlier_mask(chunk["price_per_unit"], chunk["category"], bounds)
+        report = outlier_report(chunk["price_per_unit"], chunk["category"], bounds, outlier)
+        removed = removed.add(report[["removed_low", "removed_high"]], fill_value=0)
+        for cleaned_category, rows in chunk.loc[~outlier].groupby("cleaned_category", sort=False):
+            out.write(rows, partition=cleaned_category)
+
+    report = bounds.join(removed.astype(int), how="inner")
+    report["removed"] = report["removed_low"] + report["removed_high"]
+    log_report(report, rule)
+    return {
+        "outlier_rule": rule,
+        "outliers_removed": report["removed"].to_dict(),
+        "outlier_bounds": report[["lower", "upper"]].to_dict(orient="index"),
+    }
+
+def run_predict(out, upstream_dir, chunk_rows):
+    manifest = read_manifest(upstream_dir)
+    scores = {}
+    for cleaned_category in sorted({part["partition"] for part in manifest["parts"]}):
+        start = time.perf_counter()
+        group = pd.concat(read_parts(upstream_dir, partition=cleaned_category), ignore_index=True)
+        predictions, scores[cleaned_category] = predict_category(group)
+        out.write(pd.concat([group, predictions], axis=1), partition=cleaned_category)
+        print(f"[Pipeline] Modelled {cleaned_category} ({len(group)} rows) in {time.perf_counter() - start:.1f}s")
+    return {"r2_train_cv_test": scores}
+
+STAGES = [
+    {"name": "canonicalize", "run": run_canonicalize, "inputs": list(STORE_CSVS.values()), "code": ["categories.py", "category_rules.json"]},
+    {"name": "features", "run": run_features, "code": ["units.py", "prices.py"]},
+    {"name": "outliers", "run": run_outliers, "code": ["outliers.py"], "params": {"rule": "iqr"}},
+    {"name": "predict", "run": run_predict, "code": ["price_models.py"]},
+]
+
+
+# ---------- Runner ----------
+def export_csv(stage_dir, csv_path):
+    """
+    Stream the final stage's parts into one CSV (atomically)
+    Returns: sha256 of the written file
+    """
+    tmp_path = csv_path + ".tmp"
+    header = True
+    with open(tmp_path, "w", newline="") as f:
+        for part in read_parts(stage_dir):
+            part.to_csv(f, header=header, index=False)
+            header = False
+    os.replace(tmp_path, csv_path)
+    return file_sha256(csv_path)
+
+def run_pipeline(output_csv="predicted_prices.csv", pipeline_dir=PIPELINE_DIR, chunk_rows=CHUNK_ROWS, force=(), params=None):
+    """
+    Run every stage whose inputs changed (or that is forced), then export the CSV.
+    params overrides stage parameters, e.g. {"outliers": {"rule": "mad"}}
+    Returns: dict of stage name -> "ran" / "skipped"
+    """
+    os.makedirs(pipeline_dir, exist_ok=True)
+    cache_path = os.path.join(pipeline_dir, "files.json")
+    try:
+        with open(cache_path) as f:
+            file_cache = json.load(f)
+    except (OSError, ValueError):
+        file_cache = {}
+
+    status = {}
+    upstream = None
+    upstream_dir = None
+    params = params or {}
+    for stage in STAGES:
+        stage = {**stage, "params": {**stage.get("params", {}), **params.get(stage["name"], {})}}
+        stage_dir = os.path.join(pipeline_dir, stage["name"])
+        fingerprint = stage_fingerprint(stage, upstream, file_cache)
+        manifest = read_manifest(stage_dir)
+        if manifest is not None and manifest["fingerprint"] == fingerprint and stage["name"] not in force:
+            print(f"[Pipeline] {stage['name']}: up to date ({manifest['rows']} rows)")
+            status[stage["name"]] = "skipped"
+        else:
+            start = time.perf_counter()
+            out = StageOutput(stage_dir)
+            stats = stage["run"](out, upstream_dir, chunk_rows, **stage["params"])
+            manifest = out.commit(fingerprint, time.perf_counter() - start, **stats)
+            print(f"[Pipeline] {stage['name']}: {manifest['rows']} rows in {manifest['seconds']:.2f}s")
+            status[stage["name"]] = "ran"
+        upstream, upstream_dir = manifest, stage_dir
+
+    # The CSV is re-exported whenever it is missing or not the one this run produced
+    export_path = os.path.join(pipeline_dir, "export.json")
+    try:
+        with open(export_path) as f:
+            exported = json.load(f)
+    except (OSError, ValueError):
+        exported = {}
+    current = file_fingerprint(output_csv, file_cache) if os.path.exists(output_csv) else None
+    if exported.get("fingerprint") != upstream["fingerprint"] or exported.get("sha256") != current:
+        exported = {"fingerprint": upstream["fingerprint"], "sha256": export_csv(upstream_dir, output_csv)}
+        with open(export_path, "w") as f:
+            json.dump(exported, f, indent=2)
+        print(f"[Pipeline] Wrote {upstream['rows']} rows to {output_csv}")
+
+    with open(cache_path, "w") as f:
+        json.dump(file_cache, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the store CSVs -> predicted_prices.csv pipeline")
+    parser.add_argument("--output", default="predicted_prices.csv")
+    parser.add_argument("--pipeline-dir", default=PIPELINE_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--force", nargs="*", default=[], choices=[stage["name"] for stage in STAGES],
+                        help="stages to rerun even if their inputs did not change")
+    parser.add_argument("--outlier-rule", default="iqr", choices=list(OUTLIER_RULES),
+                        help="rule used to drop price-per-unit outliers within each category")
+    args = parser.parse_args()
+
+    run_pipeline(args.output, args.pipeline_dir, args.chunk_rows, args.force, {"outliers": {"rule": args.outlier_rule}})
@@ -0,0 +1,75 @@
+import numpy as np
+
+PRED_COLS = [
+    "predicted_price_elastic_net",
+    "predicted_price_linear_regression",
+    "predicted_price_random_forest"
+]
+
+# Weights for the weighted ensemble, Random Forest fits our data best
+ENSEMBLE_WEIGHTS = {
+    "predicted_price_elastic_net": 0.25,
+    "predicted_price_linear_regression": 0.25,
+    "predicted_price_random_forest": 0.5
+}
+
+# strategy name -> (column, label shown on the product cards)
+PREDICTION_STRATEGIES = {
+    "Best Model": ("best_predicted_value", "Best Prediction"),
+    "Median": ("median_predicted_value", "Median Prediction"),
+    "Mean": ("mean_predicted_value", "Mean Prediction"),
+    "Weighted Ensemble": ("weighted_predicted_value", "Ensemble Prediction"),
+}
+
+
+# ---------- Prediction Aggregation ----------
+def aggregate_predictions(df, pred_cols=PRED_COLS, weights=None):
+    """
+    Combine the model predictions of every row in one pass over a stacked
+    (n_rows x n_models) array. Missing predictions are ignored.
+    Returns: dict of column name -> array (best model name, best, median, mean, weighted)
+    """
+    weights = ENSEMBLE_WEIGHTS if weights is None else weights
+    preds = df[pred_cols].to_numpy(dtype=np.float64)
+    actual = df["cleaned_price"].to_numpy(dtype=np.float64)
+    missing = np.isnan(preds)
+    all_missing = missing.all(axis=1)
+
+    # Best model = prediction closest to the actual price
+    error = np.abs(preds - actual[:, None])
+    error[np.isnan(error)] = np.inf
+    best_idx = error.argmin(axis=1)
+    no_best = np.isinf(error.min(axis=1))
+    best_value = np.take_along_axis(preds, best_idx[:, None], axis=1)[:, 0]
+    best_value[no_best] = np.nan
+    best_model = np.asarray(pred_cols, dtype=object)[best_idx]
+    best_model[no_best] = np.nan
+
+    w = np.array([weights.get(col, 0.0) for col in pred_cols], dtype=np.float64)
+    w_rows = np.where(missing, 0.0, w)
+    w_total = w_rows.sum(axis=1)
+    weighted = np.divide(
+        np.where(missing, 0.0, preds) @ w,
+        w_total,
+        out=np.full(len(preds), np.nan),
+        where=w_total > 0
+    )
+
+    counts = (~missing).sum(axis=1)
+    mean = np.divide(
+        np.where(missing, 0.0, preds).sum(axis=1),
+        counts,
+        out=np.full(len(preds), np.nan),
+        where=counts > 0
+    )
+    median = np.full(len(preds), np.nan)
+    if (~all_missing).any():
+        median[~all_missing] = np.nanmedian(preds[~all_missing], axis=1)
+
+    return {
+        "best_predicted_price": best_model,
+        "best_predicted_value": best_value,
+        "median_predicted_value": median,
+        "mean_predicted_value": mean,
+        "weighted_predicted_value": weighted
+    }
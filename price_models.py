@@ -0,0 +1,121 @@
+"""
+Per-category price models from 5)modell.ipynb, without the plots.
+
+Every cleaned_category gets its own ElasticNet (grid searched),
+LinearRegression and RandomForest (grid searched) on log1p prices. Each
+model returns its train / CV / test R2 and predictions for every row of
+the category, transformed back from log space.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import ElasticNet, LinearRegression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GridSearchCV, cross_validate, train_test_split
+
+ELASTIC_NET_GRID = {
+    "alpha": [0.001, 0.01, 0.1, 1, 10, 100],  # Regularization strength
+    "l1_ratio": [0.1, 0.3, 0.5, 0.7, 0.9, 0.95, 0.99],  # Mix of L1 and L2
+    "max_iter": [1000, 5000, 10000, 15000, 20000]
+}
+
+RANDOM_FOREST_GRID = {
+    "n_estimators": [100, 200],
+    "max_depth": [None, 10, 20],
+    "min_samples_leaf": [1, 2]
+}
+
+DUMMY_COLUMNS = ["category", "store", "cleaned_category", "cleaned_unit"]
+DROP_COLUMNS = ["name", "product-link", "image_url", "cleaned_name"]
+
+
+# ---------- Features ----------
+def model_frame(group):
+    """
+    One-hot + log1p features of one category's rows
+    Returns: (X, y) with y = log1p(cleaned_price)
+    """
+    model_df = pd.get_dummies(group, columns=DUMMY_COLUMNS, prefix=DUMMY_COLUMNS, drop_first=True)
+    model_df = model_df.drop(DROP_COLUMNS, axis=1)
+    model_df["cleaned_quantity"] = np.log1p(model_df["cleaned_quantity"])
+    model_df["price_per_unit"] = np.log1p(model_df["price_per_unit"])
+    model_df["cleaned_price"] = np.log1p(model_df["cleaned_price"])
+    return model_df.drop("cleaned_price", axis=1), model_df["cleaned_price"]
+
+def model_features(rows, feature_columns):
+    """
+    model_frame's features for new rows, aligned to a trained model's columns.
+    Levels the model never saw (and its dropped first levels) become all-zero dummies
+    Returns: float DataFrame with exactly feature_columns
+    """
+    features = pd.get_dummies(rows[DUMMY_COLUMNS], columns=DUMMY_COLUMNS, prefix=DUMMY_COLUMNS)
+    features["cleaned_quantity"] = np.log1p(rows["cleaned_quantity"])
+    features["price_per_unit"] = np.log1p(rows["price_per_unit"])
+    return features.reindex(columns=feature_columns, fill_value=0).astype(float)
+
+
+# ---------- Models ----------
+def evaluate(model, X, y, cv):
+    """
+    Cross-validate on the train split, refit, score on the test split
+    Returns: ([train_r2, cv_r2, test_r2], fitted model)
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    cv_scores = cross_validate(
+        model, X_train, y_train, cv=cv,
+        scoring=["neg_mean_squared_error", "r2"],
+        return_train_score=True
+    )
+    model.fit(X_train, y_train)
+    test_r2 = r2_score(y_test, model.predict(X_test))
+    return [cv_scores["train_r2"].mean(), cv_scores["test_r2"].mean(), test_r2], model
+
+def elastic_net_model(X, y, n_jobs=-1):
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    grid_search = GridSearchCV(
+        estimator=ElasticNet(random_state=42),
+        param_grid=ELASTIC_NET_GRID,
+        cv=5,
+        scoring="neg_mean_squared_error",
+        n_jobs=n_jobs
+    )
+    grid_search.fit(X_train, y_train)
+    model = ElasticNet(**grid_search.best_params_, random_state=42)
+    return evaluate(model, X, y, cv=2)
+
+def linear_regression_model(X, y, n_jobs=-1):
+    return evaluate(LinearRegression(), X, y, cv=3)
+
+def random_forest_model(X, y, n_jobs=-1):
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Parallel over grid candidates only: forests with their own n_jobs inside would run n_jobs x n_jobs threads
+    grid_search = GridSearchCV(
+        estimator=RandomForestRegressor(random_state=42, n_jobs=1),
+        param_grid=RANDOM_FOREST_GRID,
+        cv=3,
+        scoring="neg_mean_squared_error",
+        n_jobs=n_jobs
+    )
+    grid_search.fit(X_train, y_train)
+    return evaluate(grid_search.best_estimator_, X, y, cv=3)
+
+# Prediction column -> model function
+MODELS = {
+    "predicted_price_elastic_net": elastic_net_model,
+    "predicted_price_linear_regression": linear_regression_model,
+    "predicted_price_random_forest": random_forest_model,
+}
+
+
+def predict_category(group):
+    """
+    Train the three models on one category and predict every row of it
+    Returns: (DataFrame of prediction columns indexed like group, dict column -> R2 scores)
+    """
+    X, y = model_frame(group)
+    predictions = {}
+    scores = {}
+    for col, model_fn in MODELS.items():
+        scores[col], model = model_fn(X, y)
+        predictions[col] = np.expm1(model.predict(X))
+    return pd.DataFrame(predictions, index=group.index), scores
@@ -0,0 +1,142 @@
+"""
+Online price predictions for live-scraped products.
+
+Loads the models saved by train_models.py once and keeps them in memory.
+Callers hand over a list of cleaned products (app.clean_scraped) and get a
+Future back. One worker thread collects the requests that arrive within
+max_wait seconds (up to max_batch products), builds one feature frame per
+category and calls predict once per (category x model) for the whole
+batch, then splits the results back to the callers. Predictions are
+combined with predictions.aggregate_predictions, like the catalogue's.
+
+    service = PriceService("models")
+    predictions = service.predict(products).result()
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from predictions import PRED_COLS, aggregate_predictions
+from price_models import model_features
+
+# Store names of the live scrapers -> store names the models were trained on
+TRAINED_STORE_NAMES = {"Al-Fateh": "al-fateh"}
+
+PRODUCT_COLUMNS = ["store", "category", "cleaned_category", "cleaned_unit", "cleaned_quantity", "cleaned_price"]
+
+
+# ---------- Models ----------
+def load_models(model_dir):
+    """
+    Every artifact listed in model_dir/manifest.json
+    Returns: (dict category -> {prediction column -> artifact}, manifest or None)
+    """
+    try:
+        with open(os.path.join(model_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, None
+    models = {}
+    for record in manifest["models"]:
+        artifact = joblib.load(os.path.join(model_dir, record["path"]))
+        models.setdefault(record["category"], {})[record["prediction_column"]] = artifact
+    return models, manifest
+
+def product_frame(products):
+    """
+    Model input columns of cleaned products, price per unit computed as in the pipeline
+    Returns: DataFrame with one row per product
+    """
+    frame = pd.DataFrame(list(products)).reindex(columns=PRODUCT_COLUMNS)
+    frame["store"] = frame["store"].replace(TRAINED_STORE_NAMES)
+    for col in ["cleaned_quantity", "cleaned_price"]:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    frame["price_per_unit"] = frame["cleaned_price"] / frame["cleaned_quantity"]
+    return frame
+
+
+# ---------- Service ----------
+class PriceService:
+    """
+    Micro-batching predictor. predict() is thread safe and never blocks on
+    other callers' requests beyond max_wait.
+    """
+
+    def __init__(self, model_dir="models", max_batch=512, max_wait=0.005):
+        start = time.perf_counter()
+        self.models, self.manifest = load_models(model_dir)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        if self.models:
+            n_models = sum(len(m) for m in self.models.values())
+            print(f"[Predict] Loaded {n_models} models for {len(self.models)} categories "
+                  f"in {time.perf_counter() - start:.2f}s")
+        else:
+            print(f"[Predict] No trained models in {model_dir}, run train_models.py; live prices are not predicted")
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def predict(self, products):
+        """
+        Queue products for the next batch
+        Returns: Future of a DataFrame (one row per product, in order) with the
+                 prediction columns and the aggregated values
+        """
+        future = Future()
+        self.requests.put((list(products), future))
+        return future
+
+    def _worker(self):
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+
+            try:
+                scored = self.score([p for products, _ in batch for p in products])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for products, future in batch:
+                future.set_result(scored.iloc[offset:offset + len(products)].reset_index(drop=True))
+                offset += len(products)
+
+    def score(self, products):
+        """
+        Predict a batch directly: one predict call per (category x model).
+        Products without a known category, price or quantity get NaN
+        Returns: DataFrame like predict()'s
+        """
+        start = time.perf_counter()
+        frame = product_frame(products)
+        preds = pd.DataFrame(np.nan, index=frame.index, columns=PRED_COLS)
+        usable = frame["price_per_unit"].gt(0) & np.isfinite(frame["price_per_unit"])
+        for category, rows in frame[usable].groupby("cleaned_category", sort=False):
+            for col, artifact in self.models.get(category, {}).items():
+                X = model_features(rows, artifact["feature_columns"])
+                preds.loc[rows.index, col] = np.expm1(artifact["model"].predict(X))
+
+        aggregated = aggregate_predictions(preds.assign(cleaned_price=frame["cleaned_price"]))
+        scored = pd.concat([preds, pd.DataFrame(aggregated, index=frame.index)], axis=1)
+        if len(frame):
+            print(f"[Predict] Scored {len(frame)} products ({int(scored['mean_predicted_value'].notna().sum())} "
+                  f"predicted) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return scored
@@ -0,0 +1,62 @@
+"""
+Price strings to numbers.
+
+Store prices arrive as text in several shapes: "Rs.1,250", "Rs 348"
+(Jalal Sons' currency + value), "1,250.50 PKR" (Carrefour), ranges like
+"Rs.720 - Rs.2,880" and sale + regular pairs like "Rs.999Rs.1,199". The
+first number is the price, as in the feature-engineering notebook.
+parse_prices handles a whole column in one vectorized pass (once per
+distinct string). Unparseable prices become NaN with a reason code instead
+of raising.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Reason codes
+PRICE_OK = "ok"
+PRICE_MULTIPLE = "multiple"          # range or sale + regular price, the first one is used
+PRICE_MISSING = "missing"
+PRICE_NO_NUMBER = "no_number"
+PRICE_NOT_POSITIVE = "not_positive"
+
+NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+FIRST_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)")
+
+
+# ---------- Price Parsing ----------
+def parse_prices(prices):
+    """
+    Parse a column of price strings
+    Returns: DataFrame (same index as prices) with cleaned_price (float64,
+             NaN on failure) and price_reason (one of the PRICE_* codes)
+    """
+    prices = pd.Series(prices)
+    codes, uniques = pd.factorize(prices)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    values = pd.to_numeric(
+        text.str.extract(FIRST_NUMBER)[0].str.replace(",", "", regex=False),
+        errors="coerce"
+    ).astype(np.float64)
+    n_numbers = text.str.count(NUMBER_PATTERN)
+
+    reason = np.where(n_numbers > 1, PRICE_MULTIPLE, PRICE_OK).astype(object)
+    reason[(text == "").to_numpy()] = PRICE_MISSING
+    reason[values.isna().to_numpy() & (text != "").to_numpy()] = PRICE_NO_NUMBER
+    not_positive = (values <= 0).to_numpy()
+    reason[not_positive] = PRICE_NOT_POSITIVE
+    values[not_positive] = np.nan
+
+    # Missing prices have code -1, which picks this trailing row
+    values = np.append(values.to_numpy(), np.nan)
+    reason = np.append(reason, PRICE_MISSING)
+    return pd.DataFrame({"cleaned_price": values[codes], "price_reason": reason[codes]}, index=prices.index)
+
+def price_report(parsed):
+    """
+    Count of rows per reason code, for logging after a parse
+    Returns: Series reason -> count
+    """
+    return parsed["price_reason"].value_counts()
@@ -0,0 +1,229 @@
+"""
+Cross-store product matching.
+
+Links the same item sold by different stores ("nestle milkpak butter" 100 g
+at Jalal Sons, "nestle milkpak butter salted" 100 g at Al-Fateh) under one
+canonical product ID, so prices can be compared store against store.
+
+Matching never compares all pairs. Rows are blocked by unit, base quantity
+and brand (first word of the cleaned name); only rows of the same block and
+of different stores are compared. Names are TF-IDF vectors of character
+3-4 grams, so a block's similarities are one sparse matrix product, and
+every row keeps its top_k matches above the threshold. Character grams
+alone score "nurpur butter unsalted" close to "nurpur butter slightly
+salted", so a pair is only kept when the names' numbers are the same and
+one name's variant words (everything after the brand, minus packaging
+words) are all in the other name. Pairs are merged most similar first,
+and a product never gets two rows of the same store.
+
+CheapestStoreIndex answers "cheapest store for this product" with a dict
+lookup.
+"""
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+MATCH_THRESHOLD = 0.7
+TOP_K = 5
+BLOCK_CHUNK_ROWS = 2048
+
+BRAND_SEPARATORS = re.compile(r"[^a-z0-9]+")
+NAME_TOKENS = re.compile(r"\d+(?:\.\d+)?|[a-z]+")
+# Words that describe the pack, not the product ("pakola i c soda tin")
+PACKAGING_WORDS = frozenset({
+    "pack", "pcs", "pc", "tin", "can", "bottle", "jar", "pouch", "box", "bag", "sachet",
+    "carton", "new", "and", "of", "with", "the",
+})
+
+
+# ---------- Blocking ----------
+def brand_keys(names):
+    """
+    Normalised first word of every name ("k&n's" -> "kns")
+    Returns: Series of strings, "" for empty names
+    """
+    first = pd.Series(names, dtype=object).fillna("").str.lower().str.split(n=1).str[0].fillna("")
+    return first.str.replace(BRAND_SEPARATORS, "", regex=True)
+
+def block_codes(df):
+    """
+    Integer block of every row: same unit, base quantity and brand
+    Returns: int64 array, -1 for rows without a quantity or unit
+    """
+    keys = pd.DataFrame({
+        "unit": df["cleaned_unit"].to_numpy(),
+        "quantity": df["cleaned_quantity"].round(3).to_numpy(),
+        "brand": brand_keys(df["cleaned_name"]).to_numpy(),
+    })
+    codes = keys.groupby(["unit", "quantity", "brand"], sort=False, dropna=False).ngroup().to_numpy()
+    codes[keys["unit"].isna().to_numpy() | keys["quantity"].isna().to_numpy()] = -1
+    return codes
+
+
+# ---------- Candidate Pairs ----------
+def block_pairs(vectors, rows, stores, top_k, threshold):
+    """
+    Cross-store pairs of one block whose name similarity reaches the threshold,
+    at most top_k per row
+    Returns: (left rows, right rows, similarities) arrays
+    """
+    block = vectors[rows]
+    left, right, sims = [], [], []
+    for start in range(0, len(rows), BLOCK_CHUNK_ROWS):
+        chunk = slice(start, start + BLOCK_CHUNK_ROWS)
+        sim = (block[chunk] @ block.T).toarray()
+        sim[stores[rows][chunk, None] == stores[rows][None, :]] = 0
+        k = min(top_k, sim.shape[1])
+        top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        top_sim = np.take_along_axis(sim, top, axis=1)
+        i, j = np.nonzero(top_sim >= threshold)
+        left.append(rows[chunk][i])
+        right.append(rows[top[i, j]])
+        sims.append(top_sim[i, j])
+    return np.concatenate(left), np.concatenate(right), np.concatenate(sims)
+
+def candidate_pairs(df, top_k=TOP_K, threshold=MATCH_THRESHOLD, tokens=None):
+    """
+    Similar cross-store pairs of the whole catalogue, block by block, whose
+    variants agree
+    Returns: DataFrame of left, right, similarity (left < right, no duplicates)
+    """
+    if tokens is None:
+        tokens = name_tokens(df["cleaned_name"])
+    vectors = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 4)).fit_transform(
+        df["cleaned_name"].fillna("").astype(str)
+    ).tocsr()
+    stores = pd.factorize(df["store"])[0]
+    blocks = block_codes(df)
+
+    order = np.argsort(blocks, kind="stable")
+    bounds = np.flatnonzero(np.diff(blocks[order])) + 1
+    pairs = []
+    for rows in np.split(order, bounds):
+        if blocks[rows[0]] < 0 or len(np.unique(stores[rows])) < 2:
+            continue
+        pairs.append(block_pairs(vectors, rows, stores, top_k, threshold))
+    if not pairs:
+        return pd.DataFrame({"left": [], "right": [], "similarity": []})
+
+    left, right, sims = (np.concatenate(parts) for parts in zip(*pairs))
+    agree = variants_agree(left, right, tokens)
+    left, right, sims = left[agree], right[agree], sims[agree]
+    pairs = pd.DataFrame({"left": np.minimum(left, right), "right": np.maximum(left, right), "similarity": sims})
+    return pairs.drop_duplicates(["left", "right"]).sort_values("similarity", ascending=False, kind="stable")
+
+
+# ---------- Variant Check ----------
+def name_tokens(names):
+    """
+    Numbers and variant words of every name, brand (first word) and packaging words left out
+    Returns: list of (frozenset of numbers, frozenset of words)
+    """
+    tokens = []
+    for name in pd.Series(names, dtype=object).fillna("").astype(str).str.lower():
+        found = NAME_TOKENS.findall(name)[1:]
+        numbers = frozenset(t for t in found if t[0].isdigit())
+        words = frozenset(t for t in found if not t[0].isdigit() and t not in PACKAGING_WORDS)
+        tokens.append((numbers, words))
+    return tokens
+
+def variants_agree(left, right, tokens):
+    """
+    Pairs whose names have the same numbers and whose variant words are a
+    subset one way or the other ("lactogen 1" / "lactogen 2" and
+    "adams chilli cheese" / "adams cheddar cheese" do not agree)
+    Returns: bool array
+    """
+    agree = np.empty(len(left), dtype=bool)
+    for n, (i, j) in enumerate(zip(left, right)):
+        (numbers_a, words_a), (numbers_b, words_b) = tokens[i], tokens[j]
+        agree[n] = numbers_a == numbers_b and (words_a <= words_b or words_b <= words_a)
+    return agree
+
+
+# ---------- Canonical IDs ----------
+def cluster_pairs(n_rows, pairs, stores, tokens=None):
+    """
+    Merge pairs most similar first, never putting two rows of one store
+    together, nor (given name_tokens) two rows whose variants disagree:
+    "nurpur butter" may match both "... salted" and "... unsalted", but
+    those two never end up in one product
+    Returns: int array, the cluster root of every row
+    """
+    parent = np.arange(n_rows)
+    members = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for left, right in zip(pairs["left"].to_numpy(), pairs["right"].to_numpy()):
+        a, b = find(left), find(right)
+        if a == b:
+            continue
+        rows_a = members.get(a, [a])
+        rows_b = members.get(b, [b])
+        if {stores[i] for i in rows_a} & {stores[j] for j in rows_b}:
+            continue
+        if tokens is not None:
+            cross = [(i, j) for i in rows_a for j in rows_b]
+            if not variants_agree(*zip(*cross), tokens).all():
+                continue
+        parent[b] = a
+        members[a] = rows_a + rows_b
+        members.pop(b, None)
+    return np.array([find(i) for i in range(n_rows)])
+
+def match_products(df, top_k=TOP_K, threshold=MATCH_THRESHOLD):
+    """
+    Canonical product ID of every row. The ID is derived from the members'
+    store, name and size, so it is stable across rebuilds of the same data
+    Returns: Series of IDs aligned with df
+    """
+    stores = df["store"].astype(str).to_numpy()
+    tokens = name_tokens(df["cleaned_name"])
+    pairs = candidate_pairs(df, top_k, threshold, tokens)
+    roots = cluster_pairs(len(df), pairs, stores, tokens)
+
+    keys = (
+        df["store"].astype(str) + "|" + df["cleaned_name"].astype(str) + "|"
+        + df["cleaned_quantity"].astype(str) + df["cleaned_unit"].astype(str)
+    ).to_numpy()
+    first_key = pd.Series(keys).groupby(roots).transform("min").to_numpy()
+    ids = [f"P{hashlib.sha1(key.encode()).hexdigest()[:12]}" for key in first_key]
+    matched = int((pd.Series(roots).value_counts() > 1).sum())
+    print(f"[Match] {len(pairs)} candidate pairs, {matched} products found in several stores")
+    return pd.Series(ids, index=df.index, name="product_id")
+
+
+# ---------- Cheapest Store ----------
+class CheapestStoreIndex:
+    """
+    Cheapest offer of every matched product, precomputed once
+    """
+
+    def __init__(self, product_ids, stores, prices):
+        self.product_ids = np.asarray(product_ids)
+        stores = np.asarray(stores)
+        prices = np.asarray(prices, dtype=float)
+        priced = pd.DataFrame({"product_id": self.product_ids, "store": stores, "price": prices}).dropna(subset=["price"])
+        grouped = priced.groupby("product_id", sort=False)
+        n_stores = grouped["store"].nunique()
+        self.offers = {
+            product_id: {"row": int(row), "store": stores[row], "price": float(prices[row]), "n_stores": int(n_stores[product_id])}
+            for product_id, row in grouped["price"].idxmin().items()
+        }
+
+    def cheapest(self, product_id):
+        """
+        Returns: dict with row, store, price and n_stores, or None for unknown IDs
+        """
+        return self.offers.get(product_id)
+
+    def cheapest_for_row(self, row):
+        return self.offers.get(self.product_ids[row])
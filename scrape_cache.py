@@ -0,0 +1,91 @@
+"""
+TTL + LRU cache of real-time scrape results per (keyword, store).
+
+Entries live in memory (an OrderedDict in LRU order, capped at
+max_entries) and, when db_path is given, in a SQLite file so they survive a
+restart. Anything older than ttl seconds is treated as missing.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_keyword(keyword):
+    # "  Pepsi   1.5L " and "pepsi 1.5l" share one cache entry
+    return " ".join(keyword.lower().split())
+
+
+# ---------- Scrape Cache ----------
+class ScrapeCache:
+    def __init__(self, ttl=15 * 60, max_entries=1000, db_path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (keyword, store) -> (products, fetched_at)
+        self.lock = threading.Lock()
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS scrape_cache ("
+                "keyword TEXT, store TEXT, fetched_at REAL, products TEXT, "
+                "PRIMARY KEY (keyword, store))"
+            )
+            self.db.commit()
+
+    def get(self, keyword, store):
+        """
+        Fresh cached products for a keyword at one store
+        Returns: (products, fetched_at) or None
+        """
+        key = (normalize_keyword(keyword), store)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute(
+                    "SELECT products, fetched_at FROM scrape_cache WHERE keyword = ? AND store = ?", key
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl:
+                self.entries.pop(key, None)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, keyword, store, products, fetched_at=None):
+        key = (normalize_keyword(keyword), store)
+        entry = (products, fetched_at or time.time())
+        with self.lock:
+            self._remember(key, entry)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO scrape_cache VALUES (?, ?, ?, ?)",
+                    (*key, entry[1], json.dumps(products))
+                )
+                # Keep the file bounded too: expired rows and the oldest beyond max_entries
+                self.db.execute("DELETE FROM scrape_cache WHERE fetched_at < ?", (time.time() - self.ttl,))
+                self.db.execute(
+                    "DELETE FROM scrape_cache WHERE rowid NOT IN "
+                    "(SELECT rowid FROM scrape_cache ORDER BY fetched_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                self.db.commit()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM scrape_cache")
+                self.db.commit()
@@ -0,0 +1,137 @@
+"""
+Bounded job queue for real-time scrapes.
+
+Scrapes take tens of seconds, dashboard queries milliseconds. So scrapes
+never run inside a UI handler. ScrapeJobQueue keeps them on their own few
+worker threads, at most `workers` keywords at a time, with at most
+`max_queued` keywords waiting. Anything beyond that is refused straight away
+with QueueFull (admission control). A keyword that is already queued or
+running is not scraped twice; the second caller follows the same job.
+
+A job collects one StoreResult per store as the engine streams them.
+Handlers poll job.snapshot(), which never blocks, and render whatever
+changed. They do not hold a thread while a scrape runs.
+"""
+import itertools
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from scrape_cache import normalize_keyword
+
+# state is "queued", "running" or "done"; position is 1 for the next job to start, 0 once started
+JobUpdate = namedtuple("JobUpdate", ["state", "position", "results", "version"])
+
+
+class QueueFull(Exception):
+    pass
+
+
+# ---------- Jobs ----------
+class ScrapeJob:
+    def __init__(self, job_id, keyword):
+        self.id = job_id
+        self.keyword = keyword
+        self.state = "queued"
+        self.results = []
+        self.version = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+
+    def _update(self, state=None, result=None):
+        with self.lock:
+            if state is not None:
+                self.state = state
+            if result is not None:
+                self.results = self.results + [result]
+            self.version += 1
+
+    def snapshot(self, position=0):
+        with self.lock:
+            return JobUpdate(self.state, position, self.results, self.version)
+
+
+# ---------- Queue ----------
+class ScrapeJobQueue:
+    """
+    Runs ScrapeJobs on `workers` threads. process(keyword, products) is applied
+    to each store's products on the worker, so handlers only render
+    """
+
+    def __init__(self, engine, workers=2, max_queued=8, process=None):
+        self.engine = engine
+        self.max_queued = max_queued
+        self.process = process
+        self.jobs = queue.Queue()
+        self.waiting = []  # queued jobs, oldest first
+        self.active = {}  # keyword -> queued or running job
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"scrape-job-{i}", daemon=True).start()
+
+    def submit(self, keyword):
+        """
+        Queue a scrape of keyword, or join the job already scraping it
+        Returns: ScrapeJob
+        Raises: QueueFull when max_queued jobs are already waiting
+        """
+        keyword = normalize_keyword(keyword)
+        with self.lock:
+            job = self.active.get(keyword)
+            if job is not None:
+                return job
+            if len(self.waiting) >= self.max_queued:
+                raise QueueFull(f"{len(self.waiting)} scrapes are already waiting, please try again shortly")
+            job = ScrapeJob(next(self.ids), keyword)
+            self.active[keyword] = job
+            self.waiting.append(job)
+        print(f"[Jobs] Queued #{job.id} '{keyword}' ({len(self.waiting)} waiting)")
+        self.jobs.put(job)
+        return job
+
+    def snapshot(self, job):
+        """
+        Returns: JobUpdate of job, including its current queue position
+        """
+        with self.lock:
+            position = self.waiting.index(job) + 1 if job in self.waiting else 0
+        return job.snapshot(position)
+
+    def stats(self):
+        with self.lock:
+            running = sum(job.state == "running" for job in self.active.values())
+            return {"running": running, "queued": len(self.waiting)}
+
+    def _process(self, job, result):
+        # A failure on one store's products becomes that store's error, the other stores keep streaming
+        if self.process is None or not result.products:
+            return result
+        try:
+            return result._replace(products=self.process(job.keyword, result.products))
+        except Exception as e:
+            print(f"[Jobs] #{job.id} '{job.keyword}' {result.store} failed: {str(e)}")
+            return result._replace(products=[], error=str(e))
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            with self.lock:
+                self.waiting.remove(job)
+            job.started_at = time.time()
+            job._update(state="running")
+            try:
+                for result in self.engine.stream(job.keyword):
+                    job._update(result=self._process(job, result))
+            except Exception as e:
+                print(f"[Jobs] #{job.id} '{job.keyword}' failed: {str(e)}")
+            finally:
+                with self.lock:
+                    self.active.pop(job.keyword, None)
+                job.finished_at = time.time()
+                job._update(state="done")
+                print(f"[Jobs] Finished #{job.id} '{job.keyword}' in {job.finished_at - job.started_at:.1f}s "
+                      f"(waited {job.started_at - job.created_at:.1f}s)")
@@ -0,0 +1,239 @@
+"""
+Scraper backends: how one store's search results are fetched.
+
+Every backend has scrape(store, keyword, abandoned, started) returning
+products in the scraper format ({"store", "name", "product-link", "price",
+"image_url"}). started() is called once the store's request actually begins
+(a browser is free, a connection is open), so time spent queueing for a
+pooled browser does not count against the store's timeout.
+
+SeleniumBackend runs the browser scrapers from scrapers.py on a pool of warm
+drivers. HttpBackend is for stores whose search page is rendered on the
+server: it fetches the result pages with one pooled async HTTP client
+(keep-alive, gzip), following the page numbers until a short page, and
+reads the product cards with selectolax using the browser scrapers' own
+CARD_SELECTORS, so both backends return the same products. Parsers are
+plain functions of the response body and are checked against saved pages
+without any network or browser (tests/fixtures). A search page without any
+product cards (no results, or markup the parser does not know) raises
+NoProductCards and the engine moves on to the store's browser backend.
+"""
+import asyncio
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote_plus, urljoin
+
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+from scrapers import CARD_SELECTORS, STORE_SCRAPERS, create_stealth_driver, get_filtered_products, products_from_records
+
+
+def headless_driver():
+    return create_stealth_driver(headless=True)
+
+
+# ---------- Driver Pool ----------
+class DriverPool:
+    """
+    Bounded pool of reusable browser drivers, created lazily on first use.
+    """
+
+    def __init__(self, size=3, factory=headless_driver, page_load_timeout=30):
+        self.size = size
+        self.factory = factory
+        self.page_load_timeout = page_load_timeout
+        self.idle = queue.LifoQueue()  # most recently used (warmest) first
+        self.slots = threading.BoundedSemaphore(size)
+        self.closed = False
+
+    def acquire(self, timeout=None):
+        """
+        Take an idle driver, or start a new one while the pool is below size
+        Returns: driver
+        """
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("No free browser in the pool")
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = self.factory()
+            if self.page_load_timeout:
+                driver.set_page_load_timeout(self.page_load_timeout)
+            return driver
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """
+        Give a driver back; broken drivers (or any driver after close) are quit
+        """
+        try:
+            if broken or self.closed:
+                quit_driver(driver)
+            else:
+                self.idle.put(driver)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                quit_driver(self.idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"[DriverPool] Error quitting driver: {str(e)}")
+
+
+# ---------- Selenium Backend ----------
+class SeleniumBackend:
+    name = "selenium"
+
+    def __init__(self, pool, scrapers=STORE_SCRAPERS, acquire_timeout=90):
+        self.pool = pool
+        self.scrapers = dict(scrapers)
+        self.acquire_timeout = acquire_timeout
+
+    def scrape(self, store, keyword, abandoned=None, started=None):
+        driver = self.pool.acquire(timeout=self.acquire_timeout)
+        broken = False
+        try:
+            if started is not None:
+                started()
+            return self.scrapers[store](driver, keyword)
+        except Exception:
+            broken = True
+            raise
+        finally:
+            # A driver whose result nobody waits for anymore may be mid-page, don't reuse it
+            self.pool.release(driver, broken or (abandoned is not None and abandoned.is_set()))
+
+    def close(self):
+        self.pool.close()
+
+
+# ---------- HTTP Backend ----------
+def read_card(card, fields, base_url):
+    # The fields of one card as EXTRACT_CARDS_JS reads them, None if any is missing
+    record = {}
+    for key, (selector, prop) in fields.items():
+        node = card if selector == ":scope" else card.css_first(selector)
+        if node is None:
+            return None
+        value = node.text(separator=" ", strip=True) if prop == "text" else node.attributes.get(prop)
+        if value is None:
+            return None
+        if prop == "text":
+            value = " ".join(value.split())
+        elif prop in ("href", "src"):
+            # Absolute, like the browser's DOM properties (relative and protocol-relative URLs)
+            value = urljoin(base_url, value)
+        record[key] = value
+    return record
+
+def parse_search_html(html, store_name, base_url, spec=None):
+    """
+    Products from a server-rendered search page, read with the browser
+    scrapers' card selectors (spec defaults to CARD_SELECTORS[store_name])
+    Returns: list of products with store name
+    """
+    spec = spec or CARD_SELECTORS[store_name]
+    cards = LexborHTMLParser(html).css(spec["card"])
+    return products_from_records([read_card(card, spec["fields"], base_url) for card in cards], store_name, spec)
+
+# Stores that can be scraped without a browser: search page URL ({query} is
+# URL-encoded, {page} counts from 1), the parser for the HTML body and how many
+# result pages to read at most.
+HTTP_STORES = {
+    "Al-Fateh": {
+        "url": "https://alfatah.pk/search?q={query}&type=product&page={page}",
+        "parse": lambda html: parse_search_html(html, "Al-Fateh", "https://alfatah.pk/search"),
+        "max_pages": 5,
+    },
+}
+
+class NoProductCards(Exception):
+    pass
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+
+class HttpBackend:
+    """
+    One pooled httpx.AsyncClient on a background event loop, shared by all requests.
+    """
+    name = "http"
+
+    def __init__(self, stores=HTTP_STORES, timeout=10, max_connections=20):
+        self.stores = dict(stores)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="http-backend", daemon=True)
+        self.thread.start()
+        self.client = self.run(self._create_client(timeout, max_connections))
+
+    async def _create_client(self, timeout, max_connections):
+        return httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html", "Accept-Encoding": "gzip, deflate"},
+            follow_redirects=True
+        )
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def fetch(self, store, keyword):
+        spec = self.stores[store]
+        products_details = []
+        seen = set()
+        page_size = None
+        for page in range(1, spec.get("max_pages", 1) + 1):
+            response = await self.client.get(spec["url"].format(query=quote_plus(keyword), page=page))
+            response.raise_for_status()
+            page_products = [p for p in spec["parse"](response.text) if p["product-link"] not in seen]
+            if page == 1 and not page_products:
+                # No results, or markup the parser does not know: let the browser decide
+                raise NoProductCards("no product cards on the search page")
+            seen.update(p["product-link"] for p in page_products)
+            products_details += page_products
+            page_size = page_size or len(page_products)
+            # A short (or repeated) page is the last one
+            if len(page_products) < page_size:
+                break
+        else:
+            print(f"[{store}] Stopped after {page} result pages")
+        filtered_products = get_filtered_products(products_details, keyword)
+        print(f"[{store}] Found {len(filtered_products)} products over HTTP")
+        return filtered_products
+
+    def scrape(self, store, keyword, abandoned=None, started=None):
+        if started is not None:
+            started()
+        return self.run(self.fetch(store, keyword))
+
+    def close(self):
+        if self.loop.is_running():
+            self.run(self.client.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
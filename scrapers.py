@@ -0,0 +1,749 @@
+# ---------- Live time scarper ----------
+import random
+import time
+from urllib.parse import parse_qsl, quote, quote_plus, urlencode, urlsplit, urlunsplit
+from selenium_stealth import stealth
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.keys import Keys
+
+# Search page per store, {query} is the keyword. Kept in one place so the
+# scrapers can be pointed at local fixture pages.
+STORE_URLS = {
+    "Al-Fateh": "https://alfatah.pk/search?q={query}",
+    "Metro": "https://www.metro-online.pk/search/{query}?searchText={query}",
+    "Jalal Sons": "https://jalalsons.com.pk/shop?query={query}",
+    "Carrefour": "https://www.carrefour.pk/mafpak/en/search?keyword={query}",
+    "Imtiaz": "https://shop.imtiaz.com.pk/search?q={query}",
+}
+
+def create_stealth_driver(headless=False):
+    USER_AGENTS = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
+    ]
+    ua = random.choice(USER_AGENTS)
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument(f"--user-agent={ua}")
+    chrome_options.add_argument("--start-maximized")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--window-size=1920,1080")  # ensures elements are visible in headless
+
+    if headless:
+        chrome_options.add_argument("--headless=new")  # modern Chrome headless
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")  # ensures full page renders
+
+    driver = webdriver.Chrome(options=chrome_options)
+
+    stealth(driver,
+            languages=["en-US", "en"],
+            vendor="Google Inc.",
+            platform="Win32",
+            webgl_vendor="Intel Inc.",
+            renderer="Intel Iris OpenGL Engine",
+            fix_hairline=True,
+    )
+    return driver
+
+# ---------- Bulk Card Extraction ----------
+# Per store: the product card selector, the fields read from each card as
+# (CSS selector inside the card, "text" or a DOM property) and how the fields
+# make up the product record. ":scope" means the card element itself.
+CARD_SELECTORS = {
+    "Al-Fateh": {
+        "card": ".col-6.col-sm-4.col-md-3.col-lg-2",
+        "fields": {
+            "name": ("a[class='product-title-ellipsis']", "text"),
+            "link": ("a[class='product-title-ellipsis']", "href"),
+            "price": (".product-price", "text"),
+            "image": (".image img", "src"),
+        },
+        "product": {"name": "{name}", "product-link": "{link}", "price": "{price}", "image_url": "{image}"},
+    },
+    "Metro": {
+        "card": ".CategoryGrid_product_card__FUMXW",
+        "fields": {
+            "link": ("a", "href"),
+            "name": (".CategoryGrid_product_name__3nYsN", "text"),
+            "price": (".CategoryGrid_product_price__Svf8T", "text"),
+            "image": (".CategoryGrid_productImg_container__Ga1ll img", "src"),
+        },
+        "product": {"name": "{name}", "product-link": "{link}", "price": "{price}", "image_url": "{image}"},
+    },
+    "Jalal Sons": {
+        "card": ".single_product_theme",
+        "fields": {
+            "link": ("a", "href"),
+            "name": (".product_name_theme", "text"),
+            "currency": (".item-currency", "text"),
+            "value": (".price-value", "text"),
+            "image": ("img", "src"),
+        },
+        "product": {"name": "{name}", "product-link": "{link}", "price": "{currency} {value}", "image_url": "{image}"},
+    },
+    "Carrefour": {
+        "card": "div.relative",
+        "fields": {
+            "link": ("a[href*='/p/']", "href"),
+            "image": ("img", "src"),
+            "name": ("div.line-clamp-2 span", "text"),
+            "price_int": ("div.text-lg.font-bold", "text"),
+            "price_frac": ("div.text-2xs.font-bold", "text"),
+        },
+        "product": {"name": "{name}", "product-link": "{link}", "price": "{price_int}.{price_frac} PKR", "image_url": "{image}"},
+    },
+    "Imtiaz": {
+        "card": ".hazle-product-item_product_item__FSm1N",
+        "fields": {
+            "name": (".hazle-product-item_product_item_text_container__Apuq1 .hazle-product-item_product_item_description__ejRDa", "text"),
+            "price": (".hazle-product-item_product_item_text_container__Apuq1 .hazle-product-item_product_item_price_label__ET_we", "text"),
+            "id": (":scope", "id"),
+            "image": ("img", "src"),
+        },
+        "product": {"name": "{name}", "product-link": "https://shop.imtiaz.com.pk/product/{id}", "price": "{price}", "image_url": "{image}"},
+    },
+}
+
+# Reads every card in the page at once; a card missing any field comes back as null
+EXTRACT_CARDS_JS = """
+const cardSelector = arguments[0];
+const fields = arguments[1];
+return Array.from(document.querySelectorAll(cardSelector)).map(card => {
+    const record = {};
+    for (const [key, [selector, prop]] of Object.entries(fields)) {
+        const el = selector === ':scope' ? card : card.querySelector(selector);
+        if (!el) return null;
+        const value = prop === 'text' ? el.innerText : (el[prop] ?? el.getAttribute(prop));
+        if (value === null || value === undefined) return null;
+        record[key] = prop === 'text' ? value.trim() : String(value);
+    }
+    return record;
+});
+"""
+
+def bulk_products(driver, store_name, spec=None):
+    """
+    Extract every product card of the current page with a single execute_script call
+    spec defaults to CARD_SELECTORS[store_name]
+    Returns: list of products with store name, or None if the bulk path failed
+             (the caller then falls back to per-element extraction)
+    """
+    spec = spec or CARD_SELECTORS[store_name]
+    try:
+        records = driver.execute_script(EXTRACT_CARDS_JS, spec["card"], spec["fields"])
+    except Exception as e:
+        print(f"[{store_name}] Bulk extraction failed, reading cards one by one: {str(e)}")
+        return None
+    if not isinstance(records, list):
+        return None
+    return products_from_records(records, store_name, spec)
+
+def products_from_records(records, store_name, spec):
+    """
+    Product records from the card fields read per card (None for a card missing a field)
+    Returns: list of products with store name
+    """
+    products_details = []
+    for record in records:
+        if record is None:
+            continue
+        product = {"store": store_name}
+        product.update({key: template.format(**record) for key, template in spec["product"].items()})
+        products_details.append(product)
+
+    skipped = len(records) - len(products_details)
+    if skipped:
+        print(f"[{store_name}] Skipped {skipped} cards with missing fields")
+    return products_details
+
+def scrape_al_fateh(driver, word_to_search, wait_time=10):
+    """
+    Scrape Al-Fatah store for products
+    Returns: list of products with store name, or empty list on error
+    """
+    try:
+        store_name = "Al-Fateh"
+        AL_FATEH_GROCERY_URL = STORE_URLS["Al-Fateh"].format(query=word_to_search)
+        
+        driver.get(AL_FATEH_GROCERY_URL)
+        wait = WebDriverWait(driver, wait_time)
+        
+        product_cards = wait.until(EC.presence_of_all_elements_located(
+            (By.CSS_SELECTOR, ".col-6.col-sm-4.col-md-3.col-lg-2")
+        ))
+        
+        # One execute_script call for every card, per-element lookups only as a fallback
+        products_details = bulk_products(driver, store_name)
+        if products_details is None:
+            products_details = []
+            for product in product_cards:
+                try:
+                    a_element = product.find_element(By.CSS_SELECTOR, "a[class='product-title-ellipsis']")
+                    product_link = a_element.get_attribute("href")
+                    product_name = a_element.text
+                    product_price= product.find_element(By.CLASS_NAME, "product-price").text
+                    image_container=product.find_element(By.CLASS_NAME, "image")
+                    image_url=image_container.find_element(By.TAG_NAME, "img").get_attribute("src")
+
+                
+                    products_details.append({
+                        "store": store_name,
+                        "name": product_name,
+                        "product-link": product_link,
+                        "price": product_price,
+                        "image_url": image_url
+                    })
+                except Exception as e:
+                    print(f"[{store_name}] Error extracting product: {str(e)}")
+                    continue
+        
+        # Filter for relevance
+        filtered_products = get_filtered_products(products_details, word_to_search)
+        
+        print(f"[{store_name}] Found {len(filtered_products)} relevant products")
+        return filtered_products
+        
+    except Exception as e:
+        print(f"[Al-Fateh] Error during scraping: {str(e)}")
+        return []
+
+
+def scrape_metro(driver, word_to_search, wait_time=10):
+    try:
+        store_name = "Metro"
+        METRO_GROCERY_URL = STORE_URLS["Metro"].format(query=word_to_search)
+        
+        driver.get(METRO_GROCERY_URL)
+        wait = WebDriverWait(driver, wait_time)
+        
+        product_cards = wait.until(EC.presence_of_all_elements_located(
+            (By.CLASS_NAME, "CategoryGrid_product_card__FUMXW")
+        ))
+
+        # One execute_script call for every card, per-element lookups only as a fallback
+        products_details = bulk_products(driver, store_name)
+        if products_details is None:
+            products_details = []
+
+            for product_card in product_cards:
+                try:
+                    product_link=product_card.find_element(By.TAG_NAME, "a").get_attribute("href")
+                    name = product_card.find_element(By.CLASS_NAME, "CategoryGrid_product_name__3nYsN").text
+                    price = product_card.find_element(By.CLASS_NAME, "CategoryGrid_product_price__Svf8T").text
+                
+                    image_container=product_card.find_element(By.CLASS_NAME, "CategoryGrid_productImg_container__Ga1ll")
+                    image_url=image_container.find_element(By.TAG_NAME, "img").get_attribute("src")
+                    products_details.append({
+                            "store": store_name,
+                            "name": name,
+                            "product-link": product_link,
+                            "price": price,
+                            "image_url": image_url
+                        })
+                except Exception as e:
+                    print(f"[{store_name}] Error extracting product details: {str(e)}")
+                    continue
+        
+        
+        # Filter for relevance
+        filtered_products = get_filtered_products(products_details, word_to_search)
+
+        print(f"[{store_name}] Found {len(filtered_products)} products")
+        return filtered_products
+
+    except Exception as e:
+        print(f"[Metro] Error during scraping: {str(e)}")
+        return []
+
+
+def scrape_jalalsons(driver, word_to_search, wait_time=10):
+    """
+    Scrape Jalal Sons store for products with name and price
+    Returns: list of products with store name, or empty list on error
+    """
+    try:
+        store_name = "Jalal Sons"
+        JALALSONS_GROCERY_URL = STORE_URLS["Jalal Sons"].format(query=word_to_search)
+        
+        driver.get(JALALSONS_GROCERY_URL)
+        wait = WebDriverWait(driver, wait_time)
+        
+        # Close banner if present
+        try:
+            banner_close_button = wait.until(EC.element_to_be_clickable(
+                (By.CSS_SELECTOR, ".cursor-pointer.ms-auto")
+            ))
+            banner_close_button.click()
+        except TimeoutException:
+            print(f"[{store_name}] No banner appeared")
+        
+        # Select location from dropdown
+        try:
+            from selenium.webdriver.support.ui import Select
+            location_dropdown = wait.until(EC.presence_of_element_located(
+                (By.ID, "selectDeliveryBranch")
+            ))
+            select_object = Select(location_dropdown)
+            all_options = select_object.options
+            
+            enabled_options = [
+                opt for opt in all_options
+                if opt.is_enabled() and opt.get_attribute('value') != ""
+            ]
+            
+            if enabled_options:
+                random_option = random.choice(enabled_options)
+                select_object.select_by_visible_text(random_option.text)
+                
+                try:
+                    submit_button = driver.find_element(By.CLASS_NAME, "current_loc_pop_btn")
+                    submit_button.click()
+                except Exception as e:
+                    print(f"[{store_name}] No button to confirm location selection: {str(e)}")
+        except:
+            print(f"[{store_name}] location box removed or not found")
+        
+        # Get products
+        product_cards = wait.until(EC.presence_of_all_elements_located(
+            (By.CLASS_NAME, "single_product_theme")
+        ))
+
+        # One execute_script call for every card, per-element lookups only as a fallback
+        products_details = bulk_products(driver, store_name)
+        if products_details is None:
+            products_details = []
+
+            for product_card in product_cards:
+                try:
+                    product_link = product_card.find_element(By.TAG_NAME, "a").get_attribute("href")
+                    name = product_card.find_element(By.CLASS_NAME, "product_name_theme").text
+                
+                    currency = product_card.find_element(By.CLASS_NAME, "item-currency").text
+                    value = product_card.find_element(By.CLASS_NAME, "price-value").text
+                    price = f"{currency} {value.strip()}"
+                    image_url=product_card.find_element(By.TAG_NAME, "img").get_attribute("src")
+                
+                    products_details.append({
+                        "store": store_name,
+                        "name": name,
+                        "product-link": product_link,
+                        "price": price,
+                        "image_url":image_url
+                    })
+                except Exception as e:
+                    print(f"[{store_name}] Error extracting product details: {str(e)}")
+                    continue
+        
+        
+        filtered_products = get_filtered_products(products_details, word_to_search)
+        print(f"[{store_name}] Found {len(filtered_products)} products")
+        return filtered_products
+
+    except Exception as e:
+        print(f"[Jalal Sons] Error during scraping: {str(e)}")
+        return []
+
+
+def scrape_carrefour(driver, word_to_search, wait_time=10):
+    """
+    Scrape Carrefour store for products with name, price, and image
+    Returns: list of products with store name, or empty list on error
+    """
+    store_name = "Carrefour"
+    CAREFOUR_GROCERY_URL = STORE_URLS["Carrefour"].format(query=word_to_search)
+    
+    try:
+        driver.get(CAREFOUR_GROCERY_URL)
+        wait = WebDriverWait(driver, 15)
+        
+        # Wait until product grid is visible
+        wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "div.relative")))
+        
+        # Find all product cards
+        product_cards = driver.find_elements(By.CSS_SELECTOR, "div.relative")
+        # One execute_script call for every card, per-element lookups only as a fallback
+        products_details = bulk_products(driver, store_name)
+        if products_details is None:
+            products_details = []
+        
+            for card in product_cards:
+                try:
+                    # Product link
+                    link_tag = card.find_element(By.CSS_SELECTOR, "a[href*='/p/']")
+                    link_href = link_tag.get_attribute("href")
+                    if link_href.startswith("/"):
+                        link = "https://www.carrefour.pk" + link_href
+                    else:
+                        link = link_href
+                
+                    # Image
+                    img_tag = card.find_element(By.TAG_NAME, "img")
+                    image_url = img_tag.get_attribute("src")
+                
+                    # Name
+                    name_span = card.find_element(By.CSS_SELECTOR, "div.line-clamp-2 span")
+                    name = name_span.text.strip()
+                
+                    # Price (PKR)
+                    price_int = card.find_element(By.CSS_SELECTOR, "div.text-lg.font-bold").text
+                    price_frac = card.find_element(By.CSS_SELECTOR, "div.text-2xs.font-bold").text
+                    price = f"{price_int}.{price_frac} PKR"
+                
+                    products_details.append({
+                        "store": store_name,
+                        "name": name,
+                        "product-link": link,
+                        "price": price,
+                        "image_url": image_url
+                    })
+                except Exception as e:
+                    continue
+        
+        # Filter products for relevance
+        filtered_products = get_filtered_products(products_details, word_to_search)
+        print(f"[{store_name}] Found {len(filtered_products)} products")
+        return filtered_products
+        
+    except Exception as e:
+        print(f"[{store_name}] Error during scraping: {str(e)}")
+        return []
+
+
+# ---------- Page Readiness ----------
+IMTIAZ_CARD = (By.CLASS_NAME, "hazle-product-item_product_item__FSm1N")
+
+def wait_for_stable_count(driver, locator, timeout=20, settle=0.5):
+    """
+    Wait until the document is loaded and the number of matching elements has
+    not changed for `settle` seconds, instead of sleeping a fixed time
+    Returns: list of the matching elements
+    """
+    state = {"count": -1, "since": time.monotonic()}
+
+    def settled(d):
+        if d.execute_script("return document.readyState") != "complete":
+            return False
+        elements = d.find_elements(*locator)
+        now = time.monotonic()
+        if len(elements) != state["count"]:
+            state["count"] = len(elements)
+            state["since"] = now
+            return False
+        return elements if elements and now - state["since"] >= settle else False
+
+    return WebDriverWait(driver, timeout, poll_frequency=0.1).until(settled)
+
+def wait_for_page_change(driver, locator, old_first, timeout=20):
+    """
+    After clicking Next, wait until the old first card is gone or replaced
+    """
+    old_id = old_first.get_attribute("id")
+
+    def changed(d):
+        try:
+            if old_first.get_attribute("id") != old_id:
+                return True
+        except StaleElementReferenceException:
+            return True
+        elements = d.find_elements(*locator)
+        return bool(elements) and elements[0].get_attribute("id") != old_id
+
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(changed)
+
+# ---------- Listing APIs ----------
+PAGE_PARAMS = ("page", "page_no", "pageno", "pagenumber", "p")
+API_BATCH = 4
+MAX_API_PAGES = 50
+
+FIND_API_JS = """
+return performance.getEntriesByType('resource')
+    .filter(e => e.initiatorType === 'fetch' || e.initiatorType === 'xmlhttprequest')
+    .map(e => e.name);
+"""
+
+FETCH_JSON_JS = """
+const urls = arguments[0];
+const done = arguments[arguments.length - 1];
+Promise.all(urls.map(u =>
+    fetch(u, {credentials: 'include'}).then(r => r.ok ? r.json() : null).catch(() => null)
+)).then(done);
+"""
+
+def find_listing_api(driver, word_to_search):
+    """
+    Look through the requests the page made for a paged search endpoint
+    Returns: (url, page parameter name) or None
+    """
+    keyword_forms = {word_to_search.lower(), quote(word_to_search).lower(), quote_plus(word_to_search).lower()}
+    for url in reversed(driver.execute_script(FIND_API_JS) or []):
+        if not any(k in url.lower() for k in keyword_forms):
+            continue
+        for key, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+            if key.lower() in PAGE_PARAMS:
+                return url, key
+    return None
+
+def with_page(url, page_key, page):
+    parts = urlsplit(url)
+    params = [(k, str(page) if k == page_key else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+def fetch_json_in_browser(driver, urls, timeout=20):
+    """
+    Fetch several JSON URLs concurrently from inside the page, so the
+    store's cookies and selected location are sent along
+    Returns: list of decoded JSON documents (None for failed ones)
+    """
+    driver.set_script_timeout(timeout)
+    return driver.execute_async_script(FETCH_JSON_JS, urls)
+
+def extract_json_products(data, store_name, link_template):
+    """
+    Find product-like records (a name and a price) anywhere in a JSON document
+    Returns: list of product dictionaries in the scraper format
+    """
+    products = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            name = next((node[k] for k in ("name", "title", "product_name") if isinstance(node.get(k), str)), None)
+            price = next((node[k] for k in ("price", "sale_price", "final_price") if node.get(k) not in (None, "")), None)
+            if name is not None and price is not None and not isinstance(price, (dict, list)):
+                product_id = next((node[k] for k in ("id", "product_id", "sku") if node.get(k) is not None), "")
+                image = next((node[k] for k in ("image", "image_url", "img", "thumbnail") if isinstance(node.get(k), str)), "")
+                products.append({
+                    "store": store_name,
+                    "name": name.strip(),
+                    "product-link": link_template.format(id=product_id),
+                    "price": str(price),
+                    "image_url": image
+                })
+                continue
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return products
+
+def fetch_imtiaz_api_pages(driver, word_to_search, known_names, timeout=20):
+    """
+    Fetch every page after the current one from Imtiaz's search API, API_BATCH at a time
+    known_names are the product names already read from the page, the API
+    is only trusted if its current page returns some of them
+    Returns: list of products, or None when no usable API was found
+    """
+    link_template = "https://shop.imtiaz.com.pk/product/{id}"
+    store_name = "Imtiaz"
+    try:
+        found = find_listing_api(driver, word_to_search)
+        if found is None:
+            return None
+        api_url, page_key = found
+        current = dict(parse_qsl(urlsplit(api_url).query)).get(page_key, "1")
+        page = int(current) + 1 if current.isdigit() else 2
+
+        sample = extract_json_products(fetch_json_in_browser(driver, [api_url], timeout)[0], store_name, link_template)
+        if not any(p["name"].lower() in known_names for p in sample):
+            return None
+
+        products = []
+        seen = {(p["name"], p["product-link"]) for p in sample}
+        while page <= MAX_API_PAGES:
+            urls = [with_page(api_url, page_key, p) for p in range(page, page + API_BATCH)]
+            documents = fetch_json_in_browser(driver, urls, timeout)
+            for data in documents:
+                # Stop at the first empty page, or one that repeats what we already have
+                new = [
+                    p for p in extract_json_products(data, store_name, link_template)
+                    if (p["name"], p["product-link"]) not in seen
+                ]
+                if data is None or not new:
+                    return products
+                seen.update((p["name"], p["product-link"]) for p in new)
+                products.extend(new)
+            page += API_BATCH
+        return products
+    except Exception as e:
+        print(f"[{store_name}] Listing API not usable, paging in the browser: {str(e)}")
+        return None
+
+def scrape_imtiaz(driver, word_to_search, wait_time=5, fast=True, page_timeout=20):
+    """
+    Scrape Imtiaz store for products with pagination
+    fast=True waits for the product list to settle instead of fixed sleeps and
+    fetches the remaining pages from the listing API when the page exposes one;
+    fast=False keeps the old fixed 5s / 10s sleeps
+    Returns: list of products with store name, or empty list on error
+    """
+    try:
+        store_name = "Imtiaz"
+        IMTIAZ_GROCERY_URL = STORE_URLS["Imtiaz"].format(query=word_to_search)
+        driver.get(IMTIAZ_GROCERY_URL)
+        wait = WebDriverWait(driver, wait_time)
+
+        products_details = []
+        
+        # Select location
+        try:
+            area = wait.until(EC.presence_of_element_located(
+                (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/div[3]/div/div/input")
+            ))
+            area.send_keys(Keys.ENTER)
+            area.send_keys(Keys.DOWN)
+            area.send_keys(Keys.DOWN)
+            area.send_keys(Keys.ENTER)
+            
+            submit_button = wait.until(EC.presence_of_element_located(
+                (By.XPATH, "/html/body/div[2]/div[3]/div/div/div/div/div[3]/button")
+            ))
+            submit_button.click()
+        except TimeoutException:
+            print(f"[{store_name}] No location box appeared")
+        
+        # Get initial products
+        try:
+            products = wait.until(EC.presence_of_all_elements_located(IMTIAZ_CARD))
+            api_tried = False
+
+            # Extract products and handle pagination
+            while True:
+                try:
+                    # Wait for products to load
+                    if fast:
+                        products = wait_for_stable_count(driver, IMTIAZ_CARD, timeout=page_timeout)
+                    else:
+                        products = wait.until(EC.presence_of_all_elements_located(IMTIAZ_CARD))
+                        time.sleep(5)  # Extra wait to ensure full load
+                    # Extract all products on current page, in one execute_script call when possible
+                    page_products = bulk_products(driver, store_name)
+                    if page_products is not None:
+                        products_details.extend(page_products)
+                    else:
+                        for product in products:
+                            try:
+                                product_text_container = product.find_element(By.CLASS_NAME, "hazle-product-item_product_item_text_container__Apuq1")
+                            
+                                product_name = product_text_container.find_element(By.CLASS_NAME, "hazle-product-item_product_item_description__ejRDa").text.strip()
+                                product_price = product_text_container.find_element(By.CLASS_NAME, "hazle-product-item_product_item_price_label__ET_we").text.strip()
+                            
+                                product_link_id = product.get_attribute("id")
+                                product_link = f"https://shop.imtiaz.com.pk/product/{product_link_id}"
+                            
+                                image_url = product.find_element(By.TAG_NAME, "img").get_attribute("src")
+                            
+                                products_details.append({
+                                    "store": store_name,
+                                    "name": product_name,
+                                    "product-link": product_link,
+                                    "price": product_price,
+                                    "image_url": image_url
+                                })
+                            except Exception as e:
+                                print(f"[{store_name}] Error extracting product info: {str(e)}")
+                                continue
+
+                    # Remaining pages straight from the listing API, if the page used one
+                    if fast and not api_tried:
+                        api_tried = True
+                        known_names = {p["name"].lower() for p in products_details}
+                        api_products = fetch_imtiaz_api_pages(driver, word_to_search, known_names, page_timeout)
+                        if api_products is not None:
+                            products_details.extend(api_products)
+                            print(f"[{store_name}] Fetched {len(api_products)} more products from the listing API")
+                            break
+                    
+                    # Try to find and click Next button
+                    try:
+                        button = driver.find_element(By.XPATH, "//button[normalize-space()='Next']")
+                        
+                        if button.get_attribute("disabled"):
+                            print(f"[{store_name}] Reached last page")
+                            break
+                        else:
+                            first_card = products[0]
+                            button.click()
+                            if fast:
+                                wait_for_page_change(driver, IMTIAZ_CARD, first_card, timeout=page_timeout)
+                            else:
+                                time.sleep(10)  # Wait for page to load
+                    except NoSuchElementException:
+                        print(f"[{store_name}] Last page reached")
+                        break
+                        
+                except Exception as e:
+                    print(f"[{store_name}] Error in pagination loop: {str(e)}")
+                    break
+            
+            filtered_products = get_filtered_products(products_details, word_to_search)
+            print(f"[{store_name}] Found {len(filtered_products)} products")
+            return filtered_products
+            
+        except TimeoutException:
+            print(f"[{store_name}] No products found")
+            return []
+        
+    except Exception as e:
+        print(f"[{store_name}] Error during scraping: {str(e)}")
+        return []
+
+
+# ===== MAIN SCRAPING FUNCTION =====
+STORE_SCRAPERS = [
+    ("Al-Fateh", scrape_al_fateh),
+    ("Metro", scrape_metro),
+    ("Jalal Sons", scrape_jalalsons),
+    ("Carrefour", scrape_carrefour),
+    ("Imtiaz", scrape_imtiaz),
+]
+
+def scrape_all_stores(driver, word_to_search):
+    """
+    Scrape all 5 stores and combine results into a single list
+    Returns: list of all products from all stores with store names
+    """
+    all_products = []
+    
+    print(f"\n{'='*60}")
+    print(f"Starting scraping for: '{word_to_search}'")
+    print(f"{'='*60}\n")
+    
+    # Scrape each store
+    for store_label, scraper_func in STORE_SCRAPERS:
+        print(f"\n[SCRAPING {store_label.upper()}]")
+        try:
+            products = scraper_func(driver, word_to_search)
+            all_products.extend(products)
+        except Exception as e:
+            print(f"FATAL ERROR for {store_label}: {str(e)}")
+            continue
+    
+    print(f"\n{'='*60}")
+    print(f"Scraping Complete!")
+    print(f"Total products collected: {len(all_products)}")
+    print(f"{'='*60}\n")
+    
+    return all_products
+
+
+def get_filtered_products(products_details, word_to_search):
+    """
+    Filter products for relevance based on search term
+    Returns: list of relevant products
+    """
+    filtered = []
+    search_term_lower = word_to_search.lower()
+    
+    for p in products_details:
+        title_lower = p["name"].lower()
+        if search_term_lower in title_lower:
+            filtered.append(p)
+            
+    return filtered
@@ -0,0 +1,185 @@
+"""
+Concurrent real-time scraping over pluggable backends.
+
+ScrapeEngine runs every store in its own thread on that store's backends
+(scraper_backends.py: pooled headless browsers, or plain HTTP for stores
+that do not need JavaScript, falling back to the browser) and yields each
+store's result as soon as it finishes. Every store has its own timeout,
+counted from the moment it gets a browser (or connection), not from the
+start of the request, so stores queueing for a free browser are not
+penalised. A store still running when its timeout hits is reported as
+timed out and its browser is thrown away once the scraper returns, so one
+slow site cannot hold up the rest.
+
+With a ScrapeCache attached, fresh (keyword, store) results are answered
+from the cache, and identical requests arriving while a scrape is running
+share that one in-flight scrape instead of starting their own.
+
+Backends, the driver factory and the scraper list can all be swapped out,
+and the URLs in scrapers.STORE_URLS can point at a local HTTP server, which
+is how tests/test_scraping_engine.py runs the engine against the saved
+pages in tests/fixtures/stores.
+"""
+import atexit
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from scrape_cache import ScrapeCache, normalize_keyword
+from scraper_backends import HTTP_STORES, DriverPool, HttpBackend, SeleniumBackend
+from scrapers import STORE_SCRAPERS
+
+# fetched_at is the time.time() the products were scraped (older for cache hits)
+StoreResult = namedtuple("StoreResult", ["store", "products", "error", "seconds", "fetched_at"])
+
+
+# ---------- Scrape Engine ----------
+class ScrapeEngine:
+    """
+    Runs the stores in parallel, each on its list of backends (tried in order).
+    """
+
+    def __init__(self, backends, store_timeout=90, max_workers=None, cache=None):
+        self.backends = dict(backends)  # store -> [backend, ...]
+        self.stores = list(self.backends)
+        self.store_timeout = store_timeout
+        self.cache = cache
+        self.in_flight = {}  # (keyword, store) -> future shared by identical requests
+        self.lock = threading.RLock()  # done callbacks may run inside _submit
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or 2 * len(self.stores),
+            thread_name_prefix="scrape"
+        )
+
+    def _run(self, store, keyword, abandoned, started):
+        error = None
+        for backend in self.backends[store]:
+            try:
+                return backend.scrape(store, keyword, abandoned, started)
+            except Exception as e:
+                print(f"[{store}] {backend.name} backend failed: {str(e)}")
+                error = e
+        raise error
+
+    def _submit(self, store, keyword, abandoned):
+        key = (keyword, store)
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is None:
+                started_at = []  # perf_counter() of the first backend start, the store's clock
+
+                def started():
+                    if not started_at:
+                        started_at.append(time.perf_counter())
+
+                future = self.executor.submit(self._run, store, keyword, abandoned, started)
+                future.started_at = started_at
+                future.fetched_at = None
+                self.in_flight[key] = future
+                future.add_done_callback(lambda f: self._finished(key, f))
+        return future
+
+    def _finished(self, key, future):
+        future.fetched_at = time.time()
+        with self.lock:
+            self.in_flight.pop(key, None)
+        # Empty lists are not cached, the scrapers return [] on errors too
+        if self.cache is not None and not future.cancelled() and future.exception() is None and future.result():
+            self.cache.put(key[0], key[1], future.result(), future.fetched_at)
+
+    def stream(self, keyword, stores=None):
+        """
+        Scrape every store (or only the given store names) concurrently
+        Yields: StoreResult per store, cache hits first, then in the order the stores finish
+        """
+        keyword = normalize_keyword(keyword)
+        start = time.perf_counter()
+
+        cached = []
+        futures = {}
+        abandoned = {}  # store -> set once nobody waits for its result anymore
+        for store in self.stores:
+            if stores is not None and store not in stores:
+                continue
+            hit = self.cache.get(keyword, store) if self.cache is not None else None
+            if hit is not None:
+                cached.append(StoreResult(store, hit[0], None, 0.0, hit[1]))
+            else:
+                abandoned[store] = threading.Event()
+                futures[self._submit(store, keyword, abandoned[store])] = store
+        pending = set(futures)
+
+        try:
+            yield from cached
+            while pending:
+                # A store that has not started yet cannot expire before now + store_timeout
+                now = time.perf_counter()
+                deadlines = {
+                    future: future.started_at[0] + self.store_timeout if future.started_at else now + self.store_timeout
+                    for future in pending
+                }
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, min(deadlines.values()) - now),
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    store = futures[future]
+                    seconds = time.perf_counter() - start
+                    try:
+                        products = future.result() or []
+                    except Exception as e:
+                        print(f"FATAL ERROR for {store}: {str(e)}")
+                        yield StoreResult(store, [], str(e), seconds, None)
+                        continue
+                    yield StoreResult(store, products, None, seconds, future.fetched_at or time.time())
+
+                now = time.perf_counter()
+                for future in [f for f in pending if f.started_at and f.started_at[0] + self.store_timeout <= now]:
+                    pending.discard(future)
+                    store = futures[future]
+                    # Finishes in the background and fills the cache, but its driver is not reused
+                    abandoned[store].set()
+                    print(f"[{store}] Timed out after {self.store_timeout}s")
+                    yield StoreResult(store, [], f"timed out after {self.store_timeout}s", now - start, None)
+        finally:
+            # Scrapes the caller stopped waiting for are treated like timed-out ones
+            for future in pending:
+                abandoned[futures[future]].set()
+
+    def scrape(self, keyword, stores=None):
+        """
+        Blocking version of stream()
+        Returns: list of all products from all stores
+        """
+        products = []
+        for result in self.stream(keyword, stores):
+            products.extend(result.products)
+        return products
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for backend in {b for backends in self.backends.values() for b in backends}:
+            backend.close()
+
+
+def create_engine(pool_size=3, store_timeout=90, cache_ttl=15 * 60, cache_size=1000, cache_db=None, http_stores=HTTP_STORES):
+    """
+    Engine with its own browser pool, HTTP client and result cache, closed automatically at exit
+    Stores in http_stores are fetched over HTTP first and fall back to the browser
+    cache_ttl=None turns the cache off, cache_db adds on-disk persistence
+    Returns: ScrapeEngine
+    """
+    # A store may queue behind every other store for a browser before its own clock starts
+    queue_rounds = -(-len(STORE_SCRAPERS) // pool_size)
+    selenium = SeleniumBackend(DriverPool(size=pool_size), acquire_timeout=store_timeout * queue_rounds)
+    http = HttpBackend(http_stores) if http_stores else None
+    backends = {
+        store: ([http] if http is not None and store in http_stores else []) + [selenium]
+        for store, _ in STORE_SCRAPERS
+    }
+    cache = ScrapeCache(ttl=cache_ttl, max_entries=cache_size, db_path=cache_db) if cache_ttl else None
+    engine = ScrapeEngine(backends, store_timeout=store_timeout, cache=cache)
+    atexit.register(engine.close)
+    return engine
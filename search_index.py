@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+# Characters that make str.contains treat the query as a real regex
+REGEX_METACHARS = set(".^$*+?{}[]\\|()")
+
+
+# ---------- N-gram Postings ----------
+def build_postings(codes, rows):
+    """
+    Group (code, row) pairs into CSR-style postings lists
+    Returns: (sorted unique codes, offsets, sorted row ids per code)
+    """
+    order = np.lexsort((rows, codes))
+    codes = codes[order]
+    rows = rows[order]
+
+    # Drop duplicate (code, row) pairs so every postings list is unique
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    codes = codes[keep]
+    rows = rows[keep]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+    offsets = np.r_[starts, len(codes)].astype(np.int64)
+    return codes[starts], offsets, rows.astype(np.int32)
+
+
+def lookup_postings(postings, code):
+    """
+    Find the postings list for a single code
+    Returns: sorted int32 array of row ids (empty if the code is unknown)
+    """
+    keys, offsets, rows = postings
+    i = np.searchsorted(keys, code)
+    if i >= len(keys) or keys[i] != code:
+        return rows[:0]
+    return rows[offsets[i]:offsets[i + 1]]
+
+
+def intersect_all(arrays):
+    """
+    Intersect sorted unique row arrays, smallest first
+    Returns: sorted int32 array of row ids
+    """
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for arr in arrays[1:]:
+        if len(result) == 0:
+            break
+        result = np.intersect1d(result, arr, assume_unique=True)
+    return result
+
+
+# ---------- Product Search Index ----------
+class ProductSearchIndex:
+    """
+    Inverted index over product names, built once at load time.
+
+    Holds whitespace-token postings and 1/2/3-gram postings as sorted
+    integer arrays. search() returns the row positions whose name contains
+    the query (case-insensitive), the same rows as
+    names.str.contains(query, case=False, na=False) without scanning
+    every row.
+    """
+
+    MAX_GRAM = 3
+
+    def __init__(self, names):
+        names = pd.Series(names).reset_index(drop=True)
+        self.names = names
+        self.lower = names.fillna("").astype(str).str.lower()
+        self.n_rows = len(names)
+
+        self._build_alphabet()
+        self.gram_postings = {
+            n: self._build_gram_postings(n) for n in range(1, self.MAX_GRAM + 1)
+        }
+        self._build_token_postings()
+
+    def _build_alphabet(self):
+        joined = "".join(self.lower.tolist())
+        code_points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        self.alphabet, self.char_ids = np.unique(code_points, return_inverse=True)
+        self.char_ids = self.char_ids.astype(np.int64)
+
+        lengths = self.lower.str.len().to_numpy(dtype=np.int64)
+        self.char_rows = np.repeat(np.arange(self.n_rows, dtype=np.int64), lengths)
+
+    def _build_gram_postings(self, n):
+        total = len(self.char_ids)
+        if total < n:
+            return build_postings(np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+
+        base = len(self.alphabet)
+        codes = np.zeros(total - n + 1, dtype=np.int64)
+        for k in range(n):
+            codes = codes * base + self.char_ids[k:total - n + 1 + k]
+
+        # Only keep grams that start and end inside the same product name
+        rows = self.char_rows[:total - n + 1]
+        same_row = rows == self.char_rows[n - 1:]
+        return build_postings(codes[same_row], rows[same_row])
+
+    def _build_token_postings(self):
+        tokens = self.lower.str.split().explode().dropna()
+        codes, self.token_vocab = pd.factorize(tokens, sort=True)
+        self.token_postings = build_postings(
+            codes.astype(np.int64), tokens.index.to_numpy(dtype=np.int64)
+        )
+
+    def _encode(self, text):
+        """
+        Map characters to alphabet ids
+        Returns: int64 array of ids, or None if a character never occurs in the index
+        """
+        if len(self.alphabet) == 0:
+            return None
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        ids = np.searchsorted(self.alphabet, code_points)
+        found = self.alphabet[np.minimum(ids, len(self.alphabet) - 1)]
+        if (found != code_points).any():
+            return None
+        return ids.astype(np.int64)
+
+    def lookup_token(self, token):
+        """
+        Rows whose name contains token as a whole whitespace-delimited word
+        Returns: sorted int32 array of row positions
+        """
+        token = token.lower()
+        i = self.token_vocab.searchsorted(token)
+        if i >= len(self.token_vocab) or self.token_vocab[i] != token:
+            return self.token_postings[2][:0]
+        return lookup_postings(self.token_postings, i)
+
+    def candidates(self, text):
+        """
+        Rows that contain every n-gram (and every inner whole token) of text
+        Returns: sorted int32 array of row positions (a superset of the matches)
+        """
+        ids = self._encode(text)
+        if ids is None:
+            return np.array([], dtype=np.int32)
+
+        n = min(self.MAX_GRAM, len(ids))
+        base = len(self.alphabet)
+        grams = set()
+        for start in range(len(ids) - n + 1):
+            code = 0
+            for k in range(n):
+                code = code * base + int(ids[start + k])
+            grams.add(code)
+        postings = [lookup_postings(self.gram_postings[n], code) for code in grams]
+
+        # Words fully surrounded by whitespace in the query must be whole tokens in the name
+        words = text.split()
+        if words and not text[0].isspace():
+            words = words[1:]
+        if words and not text[-1].isspace():
+            words = words[:-1]
+        postings.extend(self.lookup_token(w) for w in set(words))
+
+        return intersect_all(postings)
+
+    def search(self, query):
+        """
+        Case-insensitive substring search over product names
+        Returns: sorted array of matching row positions
+        """
+        if query == "":
+            return np.arange(self.n_rows)
+
+        # Real regex queries keep the old str.contains behaviour
+        if REGEX_METACHARS.intersection(query):
+            mask = self.names.str.contains(query, case=False, na=False)
+            return np.flatnonzero(mask.to_numpy())
+
+        text = query.lower()
+        rows = self.candidates(text)
+        if len(text) <= self.MAX_GRAM or len(rows) == 0:
+            return rows
+
+        # Verify the candidates, only they are touched
+        matches = self.lower.iloc[rows].str.contains(text, regex=False).to_numpy()
+        return rows[matches]
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+# ---------- Sort Index ----------
+class SortIndex:
+    """
+    One precomputed permutation per sort mode.
+
+    Every sort key is sorted once at load time (stable, NaN last, like
+    sort_values). A filtered set of rows is then put in order either by
+    walking the permutation with a row mask (O(n)) or, for small result
+    sets, by ordering the rows on their integer rank - never by comparing
+    the key values again.
+    """
+
+    def __init__(self, df, sort_keys):
+        self.n_rows = len(df)
+        self.perms = {}
+        self.ranks = {}
+        for sort_by, (col, ascending) in sort_keys.items():
+            perm = df[col].reset_index(drop=True).sort_values(
+                ascending=ascending, kind="stable", na_position="last"
+            ).index.to_numpy()
+            rank = np.empty(self.n_rows, dtype=np.int64)
+            rank[perm] = np.arange(self.n_rows)
+            self.perms[sort_by] = perm
+            self.ranks[sort_by] = rank
+
+    def order(self, rows, sort_by):
+        """
+        Put row positions in the order of the given sort mode
+        Unknown modes (e.g. "Default") keep the original row order
+        Returns: array of row positions
+        """
+        if sort_by not in self.perms:
+            return rows
+        if len(rows) == 0:
+            return rows
+
+        # Few rows: order them by rank, otherwise walk the full permutation once
+        if len(rows) * np.log2(len(rows) + 1) < self.n_rows:
+            return rows[np.argsort(self.ranks[sort_by][rows], kind="stable")]
+        perm = self.perms[sort_by]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return perm[mask[perm]]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------- Statistics Cube ----------
+class StatsCube:
+    """
+    Sums, counts, min and max per (store, category) cell, built once at load time.
+
+    Any store/category filter is answered by adding up the selected cells,
+    so the dashboard charts never group the full frame. Rows with a missing
+    store or category live in an extra cell that only counts when that
+    facet is not filtered.
+    """
+
+    def __init__(self, facet_index, df, value_cols, store_col="store", category_col="cleaned_category"):
+        self.store_col = store_col
+        self.category_col = category_col
+        self.value_cols = list(value_cols)
+        self.stores = facet_index.values[store_col]
+        self.categories = facet_index.values[category_col]
+
+        # -1 (missing) goes to the extra last slot
+        n_s = len(self.stores) + 1
+        n_c = len(self.categories) + 1
+        store_codes = np.where(facet_index.codes[store_col] < 0, n_s - 1, facet_index.codes[store_col])
+        category_codes = np.where(facet_index.codes[category_col] < 0, n_c - 1, facet_index.codes[category_col])
+        cell = store_codes * n_c + category_codes
+        shape = (n_s, n_c)
+
+        self.rows = np.bincount(cell, minlength=n_s * n_c).reshape(shape)
+        self.sums = {}
+        self.counts = {}
+        self.mins = {}
+        self.maxs = {}
+        for col in self.value_cols:
+            values = df[col].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(values)
+            self.sums[col] = np.bincount(cell[valid], weights=values[valid], minlength=n_s * n_c).reshape(shape)
+            self.counts[col] = np.bincount(cell[valid], minlength=n_s * n_c).reshape(shape)
+            mins = np.full(n_s * n_c, np.inf)
+            maxs = np.full(n_s * n_c, -np.inf)
+            np.minimum.at(mins, cell[valid], values[valid])
+            np.maximum.at(maxs, cell[valid], values[valid])
+            self.mins[col] = mins.reshape(shape)
+            self.maxs[col] = maxs.reshape(shape)
+
+    def _selection(self, values, selected):
+        # No selection = every value plus the missing slot
+        if not selected:
+            return np.arange(len(values) + 1)
+        lookup = {v: i for i, v in enumerate(values)}
+        return np.array(sorted(lookup[v] for v in selected if v in lookup), dtype=np.int64)
+
+    def store_stats(self, selected_stores, selected_categories):
+        """
+        Per-store row counts and column means for the selected cells
+        Returns: dataframe with a store column, a count column and one mean per value column,
+                 sorted by store (same as groupby("store").mean())
+        """
+        s = self._selection(self.stores, selected_stores)
+        c = self._selection(self.categories, selected_categories)
+        s = s[s < len(self.stores)]  # groupby("store") drops missing stores
+
+        stats = {self.store_col: np.asarray(self.stores, dtype=object)[s]}
+        stats["count"] = self.rows[np.ix_(s, c)].sum(axis=1)
+        for col in self.value_cols:
+            sums = self.sums[col][np.ix_(s, c)].sum(axis=1)
+            counts = self.counts[col][np.ix_(s, c)].sum(axis=1)
+            stats[col] = np.divide(sums, counts, out=np.full(len(s), np.nan), where=counts > 0)
+
+        result = pd.DataFrame(stats)
+        return result[result["count"] > 0].reset_index(drop=True)
+
+    def bounds(self, selected_stores, selected_categories):
+        """
+        Min and max of every value column over the selected cells
+        Returns: dict of column -> (min, max), NaN when the selection has no values
+        """
+        s = self._selection(self.stores, selected_stores)
+        c = self._selection(self.categories, selected_categories)
+        result = {}
+        for col in self.value_cols:
+            lo = self.mins[col][np.ix_(s, c)].min() if len(s) and len(c) else np.inf
+            hi = self.maxs[col][np.ix_(s, c)].max() if len(s) and len(c) else -np.inf
+            result[col] = (lo, hi) if np.isfinite(lo) else (np.nan, np.nan)
+        return result
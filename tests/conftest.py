@@ -0,0 +1,40 @@
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    # Serves tests/fixtures, a ?delay=<seconds> parameter holds the response back
+
+    def do_GET(self):
+        delay = parse_qs(urlsplit(self.path).query).get("delay")
+        if delay:
+            time.sleep(float(delay[0]))
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def fixture_server():
+    """
+    Local HTTP server for the saved fixture pages
+    Returns: base URL, e.g. "http://127.0.0.1:8123"
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=FIXTURES))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+import pytest
+
+from categories import CategoryResolver
+
+LABELLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "grocery_products_canonicalized_categories.csv")
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return CategoryResolver()
+
+
+# ---------- Keyword Choice ----------
+@pytest.mark.parametrize("name, category", [
+    ("Lays Masala Chips 60g", "Snacks"),
+    ("Popcorn Cheddar Cheese 70 GM", "Snacks"),
+    ("Cadbury Dairy Milk Chocolate 90 Gram", "Confectionery"),
+    ("Nestle Lactogen 1 Milk Powder 400 GM", "Baby Food"),
+    ("Nestle Everyday Milk Powder Pouch 850 GM", "Dairy"),
+    ("Everyday Tea Whitener 850GM", "Beverages"),
+    ("Nurpur Butter Unsalted 200 Gram", "Dairy"),
+    ("National Salt 800 GM", "Spices & Seasonings"),
+    ("Pepsi 1.5L", "Beverages"),
+])
+def test_product_keywords_beat_flavour_words(resolver, name, category):
+    assert resolver.match_keywords([name]).iloc[0] == category
+
+def test_unmatched_names_stay_unresolved(resolver):
+    assert resolver.match_keywords(["Gurr 1 KG"]).isna().all()
+
+
+# ---------- Labelled Catalogue ----------
+def test_name_keywords_against_labelled_catalogue(resolver):
+    # Only the product names, as for live scraper results
+    labelled = pd.read_csv(LABELLED, usecols=["store", "name", "common_category"])
+    resolved = resolver.resolve(labelled["store"], names=labelled["name"])["cleaned_category"]
+    matched = resolved.notna()
+
+    assert matched.mean() >= 0.8
+    assert (resolved[matched] == labelled.loc[matched, "common_category"]).mean() >= 0.85
@@ -0,0 +1,162 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from scraper_backends import HttpBackend, NoProductCards, parse_search_html
+from scraping_engine import ScrapeEngine
+
+
+def load_search_page(page):
+    with open(os.path.join(FIXTURES, f"alfatah_search_{page}.html")) as f:
+        return f.read()
+
+def search_store(base_url, max_pages=5, page_url="/alfatah_search_{page}.html"):
+    return {
+        "Al-Fateh": {
+            "url": base_url + page_url + "?q={query}",
+            "parse": lambda html: parse_search_html(html, "Al-Fateh", base_url + "/search"),
+            "max_pages": max_pages,
+        }
+    }
+
+
+class StaticBackend:
+    # Stands in for the browser backend
+    name = "static"
+
+    def __init__(self, products):
+        self.products = products
+        self.calls = 0
+
+    def scrape(self, store, keyword, abandoned=None, started=None):
+        self.calls += 1
+        return [dict(p, store=store) for p in self.products]
+
+    def close(self):
+        pass
+
+
+# ---------- Parser ----------
+def test_parse_search_html():
+    products = parse_search_html(load_search_page(1), "Al-Fateh", "https://alfatah.pk/search")
+
+    assert [p["name"] for p in products] == [
+        "Nestle Milkpak UHT Milk 1 Litre",
+        "Olpers Full Cream Milk 1500 ML",
+        "Cadbury Dairy Milk Chocolate 90 Gram",
+        "Nurpur Butter Unsalted 200 Gram",
+    ]
+    assert all(p["store"] == "Al-Fateh" for p in products)
+    # Links and images come out absolute, text as it reads on the page
+    assert products[0]["product-link"] == "https://alfatah.pk/products/nestle-milkpak-uht-milk-1-litre"
+    assert products[0]["price"] == "Rs. 340.00"
+    assert products[0]["image_url"] == "https://alfatah.pk/cdn/shop/files/milkpak-1l.jpg?v=1712345678"
+    assert products[1]["image_url"] == "https://alfatah.pk/cdn/shop/files/olpers-1500ml.jpg?v=1709876543"
+    assert products[2]["image_url"] == "https://alfatah.pk/cdn/shop/files/dairy-milk-90g.jpg"
+
+def test_parse_search_html_skips_incomplete_cards():
+    # The sold out card has no price
+    products = parse_search_html(load_search_page(2), "Al-Fateh", "https://alfatah.pk/search")
+    assert [p["name"] for p in products] == ["Haleeb Milk 1 Litre"]
+
+def test_parse_search_html_without_cards():
+    assert parse_search_html("<html><body><p>No results</p></body></html>", "Al-Fateh", "https://alfatah.pk/search") == []
+
+
+# ---------- HTTP Backend ----------
+def test_http_backend_pages_through_results(fixture_server):
+    backend = HttpBackend(search_store(fixture_server))
+    try:
+        products = backend.scrape("Al-Fateh", "milk")
+    finally:
+        backend.close()
+
+    # Page 2 is short, so there is no request for page 3 (which would 404)
+    assert [p["name"] for p in products] == [
+        "Nestle Milkpak UHT Milk 1 Litre",
+        "Olpers Full Cream Milk 1500 ML",
+        "Cadbury Dairy Milk Chocolate 90 Gram",
+        "Haleeb Milk 1 Litre",
+    ]
+
+def test_http_backend_stops_at_max_pages(fixture_server):
+    backend = HttpBackend(search_store(fixture_server, max_pages=1))
+    try:
+        products = backend.scrape("Al-Fateh", "milk")
+    finally:
+        backend.close()
+
+    assert len(products) == 3
+
+def test_http_backend_stops_on_a_repeated_page(fixture_server):
+    # A site that serves its last page for any page number beyond it
+    backend = HttpBackend(search_store(fixture_server, page_url="/alfatah_search_1.html"))
+    try:
+        products = backend.scrape("Al-Fateh", "milk")
+    finally:
+        backend.close()
+
+    assert len(products) == 3
+
+def test_http_backend_refuses_a_page_without_cards(fixture_server):
+    # A page in markup the parser does not know
+    backend = HttpBackend(search_store(fixture_server, page_url="/stores/al_fateh.html"))
+    try:
+        with pytest.raises(NoProductCards):
+            backend.scrape("Al-Fateh", "milk")
+    finally:
+        backend.close()
+
+
+# ---------- Backend Fallback ----------
+def test_engine_uses_http_results(fixture_server):
+    http = HttpBackend(search_store(fixture_server))
+    browser = StaticBackend([{"name": "Browser Milk", "price": "Rs. 1"}])
+    engine = ScrapeEngine({"Al-Fateh": [http, browser]}, store_timeout=10)
+    try:
+        results = list(engine.stream("milk"))
+    finally:
+        engine.close()
+
+    assert len(results) == 1 and results[0].error is None
+    assert len(results[0].products) == 4
+    assert browser.calls == 0
+
+def test_engine_falls_back_to_browser_without_cards(fixture_server):
+    http = HttpBackend(search_store(fixture_server, page_url="/stores/al_fateh.html"))
+    browser = StaticBackend([{"name": "Browser Milk", "price": "Rs. 1"}])
+    engine = ScrapeEngine({"Al-Fateh": [http, browser]}, store_timeout=10)
+    try:
+        results = list(engine.stream("milk"))
+    finally:
+        engine.close()
+
+    assert results[0].error is None
+    assert [p["name"] for p in results[0].products] == ["Browser Milk"]
+    assert browser.calls == 1
+
+def test_engine_falls_back_when_the_endpoint_fails(fixture_server):
+    http = HttpBackend(search_store(fixture_server, page_url="/missing_{page}.html"))
+    browser = StaticBackend([{"name": "Browser Milk", "price": "Rs. 1"}])
+    engine = ScrapeEngine({"Al-Fateh": [http, browser]}, store_timeout=10)
+    try:
+        results = list(engine.stream("milk"))
+    finally:
+        engine.close()
+
+    assert [p["name"] for p in results[0].products] == ["Browser Milk"]
+
+def test_engine_reports_the_last_backend_error():
+    class FailingBackend(StaticBackend):
+        def scrape(self, store, keyword, abandoned=None, started=None):
+            raise RuntimeError(f"{self.products} down")
+
+    engine = ScrapeEngine({"Al-Fateh": [FailingBackend("http"), FailingBackend("browser")]}, store_timeout=10)
+    try:
+        results = list(engine.stream("milk"))
+    finally:
+        engine.close()
+
+    assert results[0].products == []
+    assert results[0].error == "browser down"
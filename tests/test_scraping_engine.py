@@ -0,0 +1,176 @@
+import re
+import threading
+import time
+from urllib.parse import quote_plus, urljoin
+from urllib.request import urlopen
+
+import pytest
+
+import scrapers
+from scraper_backends import DriverPool, SeleniumBackend
+from scrapers import get_filtered_products
+from scraping_engine import ScrapeEngine
+
+CARD = re.compile(
+    r'<a class="product-title" href="([^"]+)">([^<]+)</a>\s*'
+    r'<span class="product-price">([^<]+)</span>\s*<img src="([^"]+)">'
+)
+
+# Seconds each store's fixture page is held back by the server
+DELAYS = {"Al-Fateh": 0.6, "Metro": 0.0, "Jalal Sons": 0.3}
+PAGES = {"Al-Fateh": "al_fateh.html", "Metro": "metro.html", "Jalal Sons": "jalal_sons.html"}
+
+
+class FixtureDriver:
+    """
+    The part of a webdriver the fixture scrapers use, loading pages with urllib
+    """
+
+    def __init__(self):
+        self.urls = []
+        self.page_source = ""
+        self.quit_called = threading.Event()
+
+    def set_page_load_timeout(self, seconds):
+        self.timeout = seconds
+
+    def get(self, url):
+        self.urls.append(url)
+        with urlopen(url, timeout=self.timeout) as response:
+            self.page_source = response.read().decode()
+
+    def quit(self):
+        self.quit_called.set()
+
+
+def fixture_scraper(store):
+    # Same contract as the scrapers in scrapers.py: load the search page, read the cards, filter
+    def scrape(driver, word_to_search):
+        url = scrapers.STORE_URLS[store].format(query=quote_plus(word_to_search))
+        driver.get(url)
+        products_details = [
+            {"store": store, "name": name, "product-link": urljoin(url, link), "price": price, "image_url": urljoin(url, image)}
+            for link, name, price, image in CARD.findall(driver.page_source)
+        ]
+        return get_filtered_products(products_details, word_to_search)
+    return scrape
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+@pytest.fixture
+def make_engine(fixture_server, drivers, monkeypatch):
+    """
+    ScrapeEngine on a DriverPool of FixtureDrivers, the stores' URLs pointing at the fixture server
+    Returns: function(delays, store_timeout, pool_size) -> (engine, pool)
+    """
+    engines = []
+
+    def factory():
+        driver = FixtureDriver()
+        drivers.append(driver)
+        return driver
+
+    def make(delays=DELAYS, store_timeout=10, pool_size=len(PAGES)):
+        for store, page in PAGES.items():
+            monkeypatch.setitem(scrapers.STORE_URLS, store, f"{fixture_server}/stores/{page}?q={{query}}&delay={delays[store]}")
+        pool = DriverPool(size=pool_size, factory=factory, page_load_timeout=10)
+        selenium = SeleniumBackend(pool, [(store, fixture_scraper(store)) for store in PAGES])
+        engine = ScrapeEngine({store: [selenium] for store in PAGES}, store_timeout=store_timeout)
+        engines.append(engine)
+        return engine, pool
+
+    yield make
+    for engine in engines:
+        engine.close()
+
+def driver_for(drivers, page):
+    return next(d for d in drivers if any(page in url for url in d.urls))
+
+
+# ---------- Streaming ----------
+def test_results_stream_in_completion_order(make_engine):
+    engine, _ = make_engine()
+    results = list(engine.stream("milk"))
+
+    assert [r.store for r in results] == ["Metro", "Jalal Sons", "Al-Fateh"]
+    assert all(r.error is None for r in results)
+    assert [r.seconds for r in results] == sorted(r.seconds for r in results)
+    assert [p["name"] for p in results[0].products] == ["Nestle Milkpak UHT Milk 1 Litre", "Haleeb Milk 1 Litre"]
+    assert results[0].products[0]["product-link"].endswith("/products/nestle-milkpak-uht-milk-1-litre")
+    # The Al-Fateh butter card does not mention the keyword
+    assert len(results[2].products) == 2
+
+def test_stores_run_in_parallel(make_engine):
+    engine, _ = make_engine()
+    start = time.perf_counter()
+    list(engine.stream("milk"))
+
+    # One after another would take the sum of the delays
+    assert time.perf_counter() - start < sum(DELAYS.values())
+
+def test_drivers_are_reused(make_engine, drivers):
+    engine, pool = make_engine()
+    list(engine.stream("milk"))
+    list(engine.stream("butter"))
+
+    assert len(drivers) == len(PAGES)
+    assert pool.idle.qsize() == len(PAGES)
+    assert not any(d.quit_called.is_set() for d in drivers)
+
+def test_only_requested_stores(make_engine):
+    engine, _ = make_engine()
+    results = list(engine.stream("milk", stores=["Metro"]))
+
+    assert [r.store for r in results] == ["Metro"]
+
+
+# ---------- Timeouts ----------
+def test_slow_store_times_out_without_holding_up_the_rest(make_engine):
+    engine, _ = make_engine(dict(DELAYS, **{"Jalal Sons": 3.0}), store_timeout=1.0)
+    start = time.perf_counter()
+    results = list(engine.stream("milk"))
+
+    assert time.perf_counter() - start < 2.0
+    assert [r.store for r in results] == ["Metro", "Al-Fateh", "Jalal Sons"]
+    assert results[-1].products == []
+    assert results[-1].error == "timed out after 1.0s"
+    assert results[0].error is None and results[1].error is None
+
+def test_timed_out_driver_is_discarded(make_engine, drivers, fixture_server, monkeypatch):
+    engine, pool = make_engine(dict(DELAYS, **{"Jalal Sons": 3.0}), store_timeout=1.0)
+    list(engine.stream("milk"))
+
+    # The slow scrape still finishes in the background, then its driver is quit instead of returned
+    slow = driver_for(drivers, PAGES["Jalal Sons"])
+    assert slow.quit_called.wait(timeout=5)
+    idle = list(pool.idle.queue)
+    assert slow not in idle
+    assert len(idle) == 2 and not any(d.quit_called.is_set() for d in idle)
+
+    # Its slot is free again and the next scrape runs on a healthy driver
+    monkeypatch.setitem(scrapers.STORE_URLS, "Jalal Sons", f"{fixture_server}/stores/{PAGES['Jalal Sons']}?q={{query}}")
+    results = list(engine.stream("butter", stores=["Jalal Sons"]))
+    assert results[0].error is None
+    assert len(slow.urls) == 1
+    assert len(drivers) == len(PAGES)
+
+def test_waiting_for_a_browser_does_not_count_against_the_timeout(make_engine, drivers):
+    # One browser for three stores: each store waits for the others, but gets its full timeout once it runs
+    engine, _ = make_engine({store: 0.4 for store in PAGES}, store_timeout=0.8, pool_size=1)
+    start = time.perf_counter()
+    results = list(engine.stream("milk"))
+
+    assert time.perf_counter() - start >= 1.2
+    assert sorted(r.store for r in results) == sorted(PAGES)
+    assert all(r.error is None and r.products for r in results)
+    assert len(drivers) == 1
+
+def test_timeout_still_applies_with_a_small_pool(make_engine):
+    engine, _ = make_engine(dict({store: 0.2 for store in PAGES}, **{"Metro": 3.0}), store_timeout=1.0, pool_size=2)
+    results = {r.store: r for r in engine.stream("milk")}
+
+    assert results["Metro"].error == "timed out after 1.0s"
+    assert results["Al-Fateh"].error is None and results["Jalal Sons"].error is None
@@ -0,0 +1,195 @@
+"""
+Headless, parallel training of the per-category price models.
+
+Every (cleaned_category x model) pair of the pipeline's outliers stage is
+one job. Jobs run on a process pool, biggest first, and each worker reads
+its own category partition from .pipeline/outliers/, so the parent never
+holds the catalogue. Workers split the CPUs between them: with P processes
+every job gets n_jobs = cpus // P and BLAS / OpenMP threads are capped to
+the same number, so nothing is oversubscribed.
+
+Each fitted model is saved with joblib to models/<category>/<model>.joblib
+together with its one-hot column schema. models/manifest.json lists every
+artifact with its R2 scores and training time; a run limited with
+--categories or --models replaces only its own entries.
+
+    python pipeline.py            # builds .pipeline/outliers
+    python train_models.py --processes 4
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import pandas as pd
+import sklearn
+from threadpoolctl import threadpool_limits
+
+from pipeline import PIPELINE_DIR, read_manifest, read_parts
+from price_models import DUMMY_COLUMNS, MODELS, model_frame
+
+MODEL_DIR = "models"
+
+# Rough relative cost of each model, to start the slow jobs first
+MODEL_COSTS = {
+    "predicted_price_elastic_net": 3,
+    "predicted_price_linear_regression": 1,
+    "predicted_price_random_forest": 10,
+}
+
+
+# ---------- Jobs ----------
+def category_slug(category):
+    return re.sub(r"[^a-z0-9]+", "_", str(category).lower()).strip("_")
+
+def artifact_path(model_dir, category, model_col):
+    return os.path.join(model_dir, category_slug(category), f"{model_col}.joblib")
+
+def cpu_allocation(n_jobs, processes=None):
+    """
+    Split the CPUs between worker processes and the jobs inside them
+    Returns: (processes, n_jobs per job)
+    """
+    cpus = os.cpu_count() or 1
+    processes = max(1, min(processes or cpus, n_jobs))
+    return processes, max(1, cpus // processes)
+
+def training_jobs(stage_dir, categories=None, models=None):
+    """
+    (category, model column, rows) of every job, most expensive first
+    Returns: list of tuples
+    """
+    rows = {}
+    for part in read_manifest(stage_dir)["parts"]:
+        rows[part["partition"]] = rows.get(part["partition"], 0) + part["rows"]
+    jobs = [
+        (category, model_col, n)
+        for category, n in rows.items() if categories is None or category in categories
+        for model_col in (models or MODELS)
+    ]
+    return sorted(jobs, key=lambda job: job[2] * MODEL_COSTS.get(job[1], 1), reverse=True)
+
+def _init_worker(n_jobs):
+    # Cap BLAS / OpenMP threads of this worker to its share of the CPUs
+    threadpool_limits(limits=n_jobs)
+
+def train_job(stage_dir, category, model_col, n_jobs, model_dir):
+    """
+    Fit one model on one category and save it with its schema
+    Returns: manifest record of the saved artifact
+    """
+    start = time.perf_counter()
+    group = pd.concat(read_parts(stage_dir, partition=category), ignore_index=True)
+    X, y = model_frame(group)
+    scores, model = MODELS[model_col](X, y, n_jobs=n_jobs)
+    seconds = time.perf_counter() - start
+
+    path = artifact_path(model_dir, category, model_col)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump({
+        "model": model,
+        "category": category,
+        "prediction_column": model_col,
+        "dummy_columns": DUMMY_COLUMNS,
+        "feature_columns": list(X.columns),
+        "scores": scores,
+    }, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return {
+        "category": category,
+        "prediction_column": model_col,
+        "path": os.path.relpath(path, model_dir),
+        "rows": len(group),
+        "features": X.shape[1],
+        "r2_train_cv_test": [round(float(s), 4) for s in scores],
+        "seconds": round(seconds, 3),
+    }
+
+
+# ---------- Runner ----------
+def train_all(pipeline_dir=PIPELINE_DIR, model_dir=MODEL_DIR, processes=None, categories=None, models=None):
+    """
+    Train every (category x model) job of the outliers stage and write models/manifest.json
+    Returns: the manifest dict
+    """
+    stage_dir = os.path.join(pipeline_dir, "outliers")
+    stage = read_manifest(stage_dir)
+    if stage is None:
+        raise FileNotFoundError(f"No finished outliers stage in {stage_dir}, run pipeline.py first")
+
+    jobs = training_jobs(stage_dir, categories, models)
+    processes, n_jobs = cpu_allocation(len(jobs), processes)
+    print(f"[Train] {len(jobs)} jobs on {processes} processes, n_jobs={n_jobs} each")
+
+    start = time.perf_counter()
+    records = []
+    if processes == 1:
+        _init_worker(n_jobs)
+        for category, model_col, _ in jobs:
+            records.append(train_job(stage_dir, category, model_col, n_jobs, model_dir))
+            log_record(records[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(n_jobs,)) as executor:
+            futures = [
+                executor.submit(train_job, stage_dir, category, model_col, n_jobs, model_dir)
+                for category, model_col, _ in jobs
+            ]
+            for future in as_completed(futures):
+                records.append(future.result())
+                log_record(records[-1])
+    wall = time.perf_counter() - start
+
+    job_seconds = sum(record["seconds"] for record in records)
+    saved = records
+    if categories is not None or models is not None:
+        saved = merge_records(model_dir, records)
+    manifest = {
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source_fingerprint": stage["fingerprint"],
+        "sklearn_version": sklearn.__version__,
+        "processes": processes,
+        "n_jobs": n_jobs,
+        "wall_seconds": round(wall, 3),
+        "job_seconds": round(job_seconds, 3),
+        "models": sorted(saved, key=lambda r: (r["category"], r["prediction_column"])),
+    }
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+    print(f"[Train] {len(records)} models in {wall:.1f}s wall ({job_seconds:.1f}s of training, "
+          f"{job_seconds / max(wall, 1e-9):.1f}x)")
+    return manifest
+
+def merge_records(model_dir, records):
+    """
+    The new records plus every record of the existing manifest they do not replace
+    Returns: list of manifest records
+    """
+    try:
+        with open(os.path.join(model_dir, "manifest.json")) as f:
+            previous = json.load(f)["models"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return records
+    trained = {(r["category"], r["prediction_column"]) for r in records}
+    return records + [r for r in previous if (r["category"], r["prediction_column"]) not in trained]
+
+def log_record(record):
+    print(f"[Train] {record['category']} / {record['prediction_column']}: {record['rows']} rows in "
+          f"{record['seconds']:.1f}s, test R2 {record['r2_train_cv_test'][2]:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and save the per-category price models")
+    parser.add_argument("--pipeline-dir", default=PIPELINE_DIR)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--categories", nargs="*", default=None, help="only these cleaned categories")
+    parser.add_argument("--models", nargs="*", default=None, choices=list(MODELS))
+    args = parser.parse_args()
+
+    train_all(args.pipeline_dir, args.model_dir, args.processes, args.categories, args.models)
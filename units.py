@@ -0,0 +1,139 @@
+"""
+Quantity / unit extraction from product names.
+
+Packages the unit handling of 4)feature_engineering.ipynb so the batch
+pipeline and the live scraper parse names the same way. One precompiled
+pattern finds "number + unit" in a name. str.extract reads quantity and
+unit from the first match, and str.replace removes all matches for the
+cleaned name. Both run once per distinct name, so repeated names cost
+nothing. Conversion to base units (g / ml / pieces) is a lookup-and-multiply
+over the conversion tables instead of a row-wise apply.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Units seen in product names and their standard spelling
+UNIT_STANDARDIZATION = {
+    # Weight
+    "kg": "kg", "kgx": "kg", "k": "kg",
+    "g": "g", "gm": "g", "gms": "g", "grm": "g", "gmx": "g",
+    "oz": "oz",
+
+    # Volume
+    "l": "L", "ltr": "L", "lt": "L", "liter": "L",
+    "litre": "L", "litter": "L",
+    "ml": "ml", "mlx": "ml", "m": "ml",  # Ambiguous - could be meter
+    "cl": "cl",
+
+    # Count
+    "pcs": "pieces", "pc": "pieces", "p": "pieces",
+    "pack": "pack", "packs": "pack",
+    "portions": "portions",
+    "slices": "slices",
+}
+
+# Conversion factors to base units
+WEIGHT_CONVERSIONS = {
+    "kg": 1000,      # to grams
+    "g": 1,
+    "mg": 0.001,
+    "oz": 28.3495,   # ounces to grams
+    "lb": 453.592,   # pounds to grams
+}
+
+VOLUME_CONVERSIONS = {
+    "L": 1000,       # to ml
+    "l": 1000,       # to ml
+    "ml": 1,
+    "cl": 10,        # centiliters to ml
+    "dl": 100,       # deciliters to ml
+    "fl oz": 29.5735 # fluid ounces to ml
+}
+
+COUNT_UNITS = ["pieces", "slices", "portions", "pack", "items"]
+
+# Longer units first to avoid partial matches
+UNITS_PATTERN = "|".join(re.escape(unit) for unit in sorted(UNIT_STANDARDIZATION, key=len, reverse=True))
+NAME_PATTERN = re.compile(rf"(\d+\.?\d*)\s*({UNITS_PATTERN})\b", re.IGNORECASE)
+SEPARATORS = re.compile(r"[\s()]+")
+
+# unit (lowercase) -> (factor, base unit)
+UNIT_CONVERSIONS = pd.DataFrame(
+    [(unit.lower(), factor, "g") for unit, factor in WEIGHT_CONVERSIONS.items()]
+    + [(unit.lower(), factor, "ml") for unit, factor in VOLUME_CONVERSIONS.items()]
+    + [(unit, 1.0, "pieces") for unit in COUNT_UNITS],
+    columns=["unit", "factor", "base"]
+).drop_duplicates("unit").set_index("unit")
+
+PARALLEL_MIN_ROWS = 200_000
+
+
+# ---------- Extraction ----------
+def extract_units(names):
+    """
+    Quantity, unit and cleaned name of every product name
+    Returns: DataFrame (same index as names) with quantity, standardized_unit
+             and cleaned_name; NaN where a name has no quantity + unit
+    """
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names)
+    lower = pd.Series(uniques, dtype=object).astype(str).str.lower()
+
+    parts = lower.str.extract(NAME_PATTERN)
+    cleaned = lower.str.replace(NAME_PATTERN, "", regex=True).str.replace(SEPARATORS, " ", regex=True).str.strip()
+    table = pd.DataFrame({
+        "quantity": pd.to_numeric(parts[0]),
+        "standardized_unit": parts[1].map(UNIT_STANDARDIZATION),
+        "cleaned_name": cleaned,
+    })
+
+    # Missing names have code -1, which picks this trailing all-NaN row
+    table.loc[len(table)] = [np.nan, np.nan, np.nan]
+    result = table.iloc[codes]
+    result.index = names.index
+    return result
+
+def standardize_units(quantity, unit):
+    """
+    Convert quantities to base units: weights to g, volumes to ml, counts to pieces.
+    Unknown units keep their quantity and lowercased unit
+    Returns: (cleaned_quantity, cleaned_unit) Series
+    """
+    quantity = pd.Series(quantity, dtype=float)
+    unit_lower = pd.Series(unit, index=quantity.index, dtype=object).str.lower().str.strip()
+
+    factor = unit_lower.map(UNIT_CONVERSIONS["factor"]).fillna(1.0)
+    base = unit_lower.map(UNIT_CONVERSIONS["base"])
+    base = base.where(base.notna(), unit_lower)
+
+    missing = quantity.isna() | unit_lower.isna()
+    cleaned_quantity = (quantity * factor).where(~missing)
+    cleaned_unit = base.where(~missing)
+    return cleaned_quantity, cleaned_unit
+
+def _normalize_chunk(names):
+    result = extract_units(names)
+    result["cleaned_quantity"], result["cleaned_unit"] = standardize_units(
+        result["quantity"], result["standardized_unit"]
+    )
+    return result
+
+def normalize_names(names, processes=None):
+    """
+    extract_units + standardize_units in one call. Inputs of PARALLEL_MIN_ROWS
+    names or more are split across a process pool (processes=1 disables it)
+    Returns: DataFrame with quantity, standardized_unit, cleaned_name,
+             cleaned_quantity and cleaned_unit
+    """
+    names = pd.Series(names)
+    if len(names) < PARALLEL_MIN_ROWS or processes == 1:
+        return _normalize_chunk(names)
+
+    processes = processes or os.cpu_count() or 1
+    chunks = np.array_split(np.arange(len(names)), processes * 4)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return pd.concat(executor.map(_normalize_chunk, [names.iloc[c] for c in chunks if len(c)]))